@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+from collections import deque
+from sqlalchemy import Table, Column, MetaData, DateTime, Float, Integer, String, text
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from typing import Dict, List
+
+# --- Table Definition ---
+metadata = MetaData()
+
+# Rolling metrics per symbol, upserted after every evaluation pass
+lasso_evaluation = Table(
+    'lasso_evaluation', metadata,
+    Column('order_symbol', String(20), primary_key=True),
+    Column('window_size', Integer, nullable=False),
+    Column('n', Integer, nullable=False),
+    Column('hit_rate', Float),
+    Column('mae', Float),
+    Column('rolling_pnl', Float),
+    Column('cumulative_pnl', Float),
+    Column('total_predictions', Integer, nullable=False),
+    Column('last_time', DateTime),
+    Column('updated_at', DateTime),
+)
+
+# --- Rolling State ---
+class SymbolEvaluation:
+    """Rolling hit-rate, MAE and PnL over the last `window` realized predictions of a symbol."""
+    def __init__(self, window: int = 500):
+        self.window = window
+        self.items = deque()
+        self.hits = 0
+        self.abs_error = 0.0
+        self.pnl = 0.0
+        self.cumulative_pnl = 0.0
+        self.total = 0
+        self.last_time = None
+
+    def update(self, time, prediction: float, last_close: float, realized_close: float):
+        """Add one realized prediction and evict the oldest if the window is full (O(1))."""
+        direction = np.sign(prediction - last_close)
+        hit = int(direction == np.sign(realized_close - last_close))
+        abs_error = abs(prediction - realized_close)
+        pnl = float(direction * (realized_close / last_close - 1))
+
+        self.items.append((hit, abs_error, pnl))
+        self.hits += hit
+        self.abs_error += abs_error
+        self.pnl += pnl
+        if len(self.items) > self.window:
+            old_hit, old_error, old_pnl = self.items.popleft()
+            self.hits -= old_hit
+            self.abs_error -= old_error
+            self.pnl -= old_pnl
+
+        self.cumulative_pnl += pnl
+        self.total += 1
+        self.last_time = time
+
+    def metrics(self) -> dict:
+        n = len(self.items)
+        return {
+            'window_size': self.window,
+            'n': n,
+            'hit_rate': self.hits / n if n else None,
+            'mae': self.abs_error / n if n else None,
+            'rolling_pnl': self.pnl,
+            'cumulative_pnl': self.cumulative_pnl,
+            'total_predictions': self.total,
+            'last_time': self.last_time,
+        }
+
+# --- Evaluator ---
+class OnlineEvaluator:
+    """
+    Joins realized predictions from lasso_orders into per-symbol rolling metrics.
+
+    Each pass only reads rows newer than the symbol's watermark (the time of the last evaluated
+    prediction), using the (order_symbol, time) primary key, and upserts lasso_evaluation.
+    """
+    def __init__(self, engine, window: int = 500):
+        self.window = window
+        self.states: Dict[str, SymbolEvaluation] = {}
+        metadata.create_all(engine, [lasso_evaluation])
+
+    def _fetch_realized(self, session, symbol: str, since=None, limit=None) -> List:
+        condition = "AND time > :since" if since is not None else ""
+        query = f"""
+            SELECT time, prediction, last_close, realized_close FROM lasso_orders
+            WHERE order_symbol = :symbol AND realized_close IS NOT NULL {condition}
+            ORDER BY time {'DESC LIMIT :limit' if limit else 'ASC'}
+        """
+        rows = session.execute(text(query), {"symbol": symbol, "since": since, "limit": limit}).fetchall()
+        return rows[::-1] if limit else rows
+
+    def _restore(self, session, symbol: str) -> SymbolEvaluation:
+        """Rebuild a symbol's state from its summary row and its last `window` realized predictions."""
+        state = SymbolEvaluation(self.window)
+        summary = session.execute(
+            text("SELECT cumulative_pnl, total_predictions, last_time FROM lasso_evaluation WHERE order_symbol = :symbol"),
+            {"symbol": symbol}
+        ).fetchone()
+        if summary is None:
+            return state
+
+        rows = self._fetch_realized(session, symbol, limit=self.window)
+        for row in rows:
+            if row.time <= summary.last_time:
+                state.update(row.time, row.prediction, row.last_close, row.realized_close)
+        state.cumulative_pnl = summary.cumulative_pnl
+        state.total = summary.total_predictions
+        state.last_time = summary.last_time
+        return state
+
+    def update(self, session, symbols: List[str]) -> int:
+        """Evaluate newly realized predictions of `symbols` and upsert their metrics."""
+        evaluated = 0
+        now = pd.Timestamp.utcnow().tz_localize(None).to_pydatetime()
+        for symbol in symbols:
+            if symbol not in self.states:
+                self.states[symbol] = self._restore(session, symbol)
+            state = self.states[symbol]
+
+            rows = self._fetch_realized(session, symbol, since=state.last_time)
+            if not rows:
+                continue
+            for row in rows:
+                state.update(row.time, row.prediction, row.last_close, row.realized_close)
+            evaluated += len(rows)
+
+            values = {'order_symbol': symbol, 'updated_at': now, **state.metrics()}
+            stmt = mysql_insert(lasso_evaluation).values(**values)
+            stmt = stmt.on_duplicate_key_update({k: stmt.inserted[k] for k in values if k != 'order_symbol'})
+            session.execute(stmt)
+
+        session.commit()
+        return evaluated
+
+    def summary(self) -> pd.DataFrame:
+        """Current metrics of every tracked symbol."""
+        return pd.DataFrame([
+            {'order_symbol': symbol, **state.metrics()} for symbol, state in self.states.items()
+        ])
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, List, Optional, Tuple
+
+# --- Ring Buffer ---
+class SymbolFeatureBuffer:
+    """
+    Fixed-size ring buffer of base features (close, optional return and volume) for one symbol.
+
+    Every row is written twice, at `i` and `i + capacity`, so the latest `capacity` rows are
+    always one contiguous slice of the buffer and lag windows can be taken as strided views
+    without copying. Appending a bar is O(1).
+    """
+    def __init__(self, capacity: int = 1440, lags: int = 3, returns: bool = False, volume: bool = False):
+        if capacity <= lags:
+            raise ValueError(f"capacity ({capacity}) must be larger than lags ({lags}).")
+        self.capacity = capacity
+        self.lags = lags
+        self.returns = returns
+        self.volume = volume
+        self.columns = ["close"] + (["return"] if returns else []) + (["volume"] if volume else [])
+        self.buffer = np.full((2 * capacity, len(self.columns)), np.nan)
+        self.end = 0
+        self.last_time = None
+
+    def __len__(self):
+        return min(self.end, self.capacity)
+
+    @property
+    def feature_names(self) -> List[str]:
+        return [f"{col}_lag{i}" for col in self.columns for i in range(1, self.lags + 1)]
+
+    def append(self, time, close: float, volume: float = np.nan):
+        """Append the newest bar, computing its return from the previous close."""
+        row = [close]
+        if self.returns:
+            prev_close = self.window()[-1, 0] if self.end else np.nan
+            row.append(close / prev_close - 1)
+        if self.volume:
+            row.append(volume)
+
+        idx = self.end % self.capacity
+        self.buffer[idx] = row
+        self.buffer[idx + self.capacity] = row
+        self.end += 1
+        self.last_time = time
+
+    def extend(self, data: pd.DataFrame):
+        """Append the rows of `data` (columns time, close and optionally volume) newer than last_time."""
+        if self.last_time is not None:
+            data = data[data["time"] > self.last_time]
+        volumes = data["volume"].to_numpy() if "volume" in data else np.full(len(data), np.nan)
+        for time, close, volume in zip(data["time"], data["close"].to_numpy(), volumes):
+            self.append(time, close, volume)
+
+    def window(self) -> np.ndarray:
+        """Contiguous view of the buffered rows, oldest first."""
+        if self.end <= self.capacity:
+            return self.buffer[:self.end]
+        start = self.end % self.capacity
+        return self.buffer[start:start + self.capacity]
+
+    def lag_view(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Zero-copy views (X, y): X has shape (n, features, lags) with X[t, f, i - 1] the value of
+        feature f at lag i, and y is the close aligned with each row of X.
+        """
+        window = self.window()
+        # The very first bar has no previous close, so its return is undefined
+        if self.returns and self.end <= self.capacity:
+            window = window[1:]
+        if len(window) <= self.lags:
+            empty = np.empty((0, len(self.columns), self.lags))
+            return empty, np.empty(0)
+        X = sliding_window_view(window, self.lags, axis=0)[:-1, :, ::-1]
+        y = window[self.lags:, 0]
+        return X, y
+
+    def features(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Flattened (X, y) for model training, columns ordered as feature_names."""
+        X, y = self.lag_view()
+        return X.reshape(len(X), -1), y
+
+# --- Feature Store ---
+class FeatureStore:
+    """Per-symbol ring buffers sharing the same lag/return/volume configuration."""
+    def __init__(self, capacity: int = 1440, lags: int = 3, returns: bool = False, volume: bool = False):
+        self.capacity = capacity
+        self.lags = lags
+        self.returns = returns
+        self.volume = volume
+        self.buffers: Dict[str, SymbolFeatureBuffer] = {}
+
+    def buffer(self, symbol: str) -> SymbolFeatureBuffer:
+        if symbol not in self.buffers:
+            self.buffers[symbol] = SymbolFeatureBuffer(self.capacity, self.lags, self.returns, self.volume)
+        return self.buffers[symbol]
+
+    def last_time(self, symbol: str) -> Optional[pd.Timestamp]:
+        return self.buffer(symbol).last_time
+
+    def update(self, symbol: str, data: pd.DataFrame) -> int:
+        """Append new bars for a symbol and return the number of buffered rows."""
+        buffer = self.buffer(symbol)
+        buffer.extend(data)
+        return len(buffer)
+
+    def features(self, symbol: str) -> Tuple[np.ndarray, np.ndarray]:
+        return self.buffer(symbol).features()
@@ -1,43 +1,56 @@
+import os
+import sys
 import time
 import numpy as np
 import pandas as pd
 import config 
-from sqlalchemy import Column, Float, String, DateTime, Integer, Table, MetaData, text
-from sqlalchemy.orm import declarative_base
-from sqlalchemy.orm import sessionmaker
+from functools import partial
 from sklearn.linear_model import LassoCV
-from sklearn.metrics import r2_score
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
 from typing import Tuple
 from datetime import datetime
+from training_scheduler import TrainingScheduler
+from feature_store import FeatureStore
+from order_store import create_tables, save_predictions, record_outcomes
+from evaluator import OnlineEvaluator
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from walk_forward import WalkForward
 
 # --- Database Configuration ---
-Base = declarative_base()
 engine = config.create_database_engine()
 Session = sessionmaker(bind=engine)
 session = Session()
 
-class LassoOrders(Base):
-    __tablename__ = 'lasso_orders'
-    time = Column(DateTime, primary_key=True)
-    order_symbol = Column(String(20))
-    prediction = Column(Float)
-    confidence = Column(Float)
-    drawdown = Column(Float)
-    hold_time = Column(Float)
-
-Base.metadata.create_all(engine)
+create_tables(engine)
 
 # --- Utility Functions ---
-def fetch_data_from_db(symbol: str, limit: int = 1440) -> pd.DataFrame:
-    """Fetch data for a given symbol from the database."""
+def fetch_data_from_db(symbol: str, limit: int = 1440, columns=None) -> pd.DataFrame:
+    """Fetch the latest `limit` bars for a symbol, selecting only `columns` (all if None)."""
     table_name = symbol.replace("-", "_").lower()
-
-    query = text(f"SELECT * FROM {table_name} ORDER BY time ASC")
-    result = session.execute(query)
+    select_list = ", ".join(columns) if columns else "*"
+
+    query = text(f"""
+        SELECT * FROM (
+            SELECT {select_list} FROM {table_name} ORDER BY time DESC LIMIT :limit
+        ) AS latest ORDER BY time ASC
+    """)
+    result = session.execute(query, {"limit": limit})
     rows = result.fetchall()
     df = pd.DataFrame.from_records(rows, columns=result.keys())
     return df
 
+def fetch_new_bars(symbol: str, since=None, limit: int = 1440) -> pd.DataFrame:
+    """Fetch only time/close/volume of bars newer than `since` (the latest `limit` bars if None)."""
+    if since is None:
+        return fetch_data_from_db(symbol, limit, ["time", "close", "volume"])
+
+    table_name = symbol.replace("-", "_").lower()
+    query = text(f"SELECT time, close, volume FROM {table_name} WHERE time > :since ORDER BY time ASC")
+    result = session.execute(query, {"since": since})
+    rows = result.fetchall()
+    return pd.DataFrame.from_records(rows, columns=result.keys())
+
 def prepare_lagged_features(data: pd.DataFrame, lags: int = 3) -> Tuple[np.ndarray, np.ndarray]:
     """Prepare lagged features for LASSO model."""
     features = [data['close'].shift(i) for i in range(1, lags + 1)]
@@ -47,91 +60,112 @@ def prepare_lagged_features(data: pd.DataFrame, lags: int = 3) -> Tuple[np.ndarr
     y = data['close'][lags:].values
     return X, y
 
-def train_lasso(X: np.ndarray, y: np.ndarray) -> Tuple[LassoCV, float]:
-    """Train LASSO model and calculate R^2 score."""
-    model = LassoCV(cv=5, random_state=42).fit(X, y)
-    r2 = r2_score(y, model.predict(X))
-    return model, r2
-
-def save_order(symbol: str, prediction: float, confidence: float):
-    """Save the best symbol and its prediction to the database."""
-    current_time = pd.Timestamp.utcnow()
-
-    order = LassoOrders(
-        time=current_time,
-        order_symbol=symbol,
-        prediction=prediction,
-        confidence=confidence,
-        drawdown=0.0,  # Placeholder for now
-        hold_time=0.0   # Placeholder for now
-    )
-    session.add(order)
-    session.commit()
+def walk_forward_report(symbols, limit: int = 1440, lags: int = 3, n_splits: int = 5, max_workers=None) -> dict:
+    """
+    Out-of-sample check of the LASSO setup: a LassoCV is refit on each expanding walk-forward
+    fold of lagged returns and predicts the next-bar return on the following segment.
+    The live loop's R^2 is in-sample; this reports hit rate, MAE and the long/flat equity per symbol.
+    """
+    walk_forward = WalkForward(partial(LassoCV, cv=5, random_state=42), n_splits=n_splits,
+                               task="regression", max_workers=max_workers)
+    reports = {}
+    for symbol in symbols:
+        data = fetch_data_from_db(symbol, limit, ["time", "close"])
+        returns = data['close'].astype(float).pct_change()
+        lagged = pd.concat([returns.shift(i) for i in range(1, lags + 1)], axis=1)
+        valid = (lagged.notna().all(axis=1) & returns.notna()).to_numpy()
+        if valid.sum() < 10 * (n_splits + 1):
+            print(f"Skipping walk-forward for {symbol}: only {valid.sum()} rows.")
+            continue
+
+        y = returns.to_numpy()[valid]
+        result = walk_forward.run(lagged.to_numpy()[valid], y, forward_returns=y,
+                                  dates=data['time'].to_numpy()[valid])
+        metrics = result['metrics']
+        print(
+            f"{symbol} walk-forward: hit rate {metrics['hit_rate']:.3f}, MAE {metrics['mae']:.6f}, "
+            f"return {metrics['total_return']:.4f} vs buy & hold {metrics['buy_hold_return']:.4f}"
+        )
+        reports[symbol] = result
+    return reports
 
 # --- Main Execution ---
-def main(symbols):
-    """Main loop to fetch data, train models, and save the best result."""
+def main(symbols, max_workers=None, deadline=45.0, lags=3, returns=False, volume=False):
+    """Main loop to fetch data, train models in parallel, and save the best result."""
+    scheduler = TrainingScheduler(max_workers=max_workers, deadline=deadline)
+    store = FeatureStore(capacity=1440, lags=lags, returns=returns, volume=volume)
+    evaluator = OnlineEvaluator(engine)
     last_run_time = None
 
-    while True:
-        # Lấy thời gian hiện tại
-        current_time = time.time()
+    try:
+        while True:
+            # Lấy thời gian hiện tại
+            current_time = time.time()
+
+            # Nếu đây là lần chạy đầu tiên hoặc đã đủ 1 phút từ lần chạy trước
+            if last_run_time is None or (current_time - last_run_time) >= 60:
+                last_run_time = current_time
+
+                # Datasets to train for each symbol and the bar each prediction is made on
+                datasets = {}
+                bars = {}
+
+                # Loop through each symbol to append new bars and read its lagged features
+                for symbol in symbols:
+                    new_bars = fetch_new_bars(symbol, store.last_time(symbol))
+                    size = store.update(symbol, new_bars)
+                    if size < 10:
+                        print(f"Skipping {symbol} due to insufficient data ({size} records).")
+                        continue
+
+                    # Lagged features from the ring buffer
+                    X, y = store.features(symbol)
+                    if len(X) == 0:
+                        print(f"Skipping {symbol} due to insufficient lagged data.")
+                        continue
+
+                    datasets[symbol] = (X, y)
+                    bars[symbol] = {'time': store.last_time(symbol), 'last_close': y[-1]}
+
+                # Train LASSO models in the worker pool, keeping what finishes before the deadline
+                elapsed = time.time() - current_time
+                results = scheduler.run_cycle(datasets, deadline=max(0.0, deadline - elapsed))
+
+                # If no valid results, skip this iteration
+                if not results:
+                    print("No valid results to save. Retrying...")
+                    continue
+
+                # Find the best symbol based on confidence (R^2 score)
+                best_symbol = max(results, key=lambda s: results[s]['confidence'])
+                best_result = results[best_symbol]
 
-        # Nếu đây là lần chạy đầu tiên hoặc đã đủ 1 phút từ lần chạy trước
-        if last_run_time is None or (current_time - last_run_time) >= 60:
-            last_run_time = current_time
+                # Save the predictions of every symbol, flagging the best one, in one insert
+                for symbol, result in results.items():
+                    result.update(bars[symbol])
+                save_predictions(session, pd.Timestamp.utcnow().tz_localize(None), results, best_symbol)
 
-            # Dictionary to store results for each symbol
-            results = {}
+                # Fill realized outcomes of earlier predictions whose horizon has passed
+                record_outcomes(session, symbols)
 
-            # Loop through each symbol to fetch data and train LASSO model
-            for symbol in symbols:
-                data = fetch_data_from_db(symbol)
-                if len(data) < 10:
-                    print(f"Skipping {symbol} due to insufficient data ({len(data)} records).")
-                    continue
+                # Update rolling hit-rate, MAE and PnL with the newly realized predictions
+                evaluator.update(session, symbols)
 
-                # Prepare lagged features
-                X, y = prepare_lagged_features(data)
-                if len(X) == 0:
-                    print(f"Skipping {symbol} due to insufficient lagged data.")
-                    continue
+                # Log the result
+                print(
+                    f"Best symbol: {best_symbol}, "
+                    f"Prediction: {best_result['prediction']:.4f}, "
+                    f"R^2: {best_result['confidence']:.4f} "
+                    f" at {datetime.now()}"
+                )
 
-                # Train LASSO model and get prediction and R^2 score
-                model, r2 = train_lasso(X, y)
-                next_prediction = model.predict(X[-1].reshape(1, -1))[0]
-                results[symbol] = {
-                    'prediction': next_prediction,
-                    'confidence': r2
-                }
-
-            # If no valid results, skip this iteration
-            if not results:
-                print("No valid results to save. Retrying...")
-                continue
-
-            # Find the best symbol based on confidence (R^2 score)
-            best_symbol = max(results, key=lambda s: results[s]['confidence'])
-            best_result = results[best_symbol]
-
-            # Save the best symbol and its details to the database
-            save_order(
-                symbol=best_symbol,
-                prediction=best_result['prediction'],
-                confidence=best_result['confidence']
-            )
-
-            # Log the result
-            print(
-                f"Best symbol: {best_symbol}, "
-                f"Prediction: {best_result['prediction']:.4f}, "
-                f"R^2: {best_result['confidence']:.4f} "
-                f" at {datetime.now()}"
-            )
-
-        # Chờ đến phút tiếp theo
-        time.sleep(max(0, 60 - (time.time() % 60)))
+            # Chờ đến phút tiếp theo
+            time.sleep(max(0, 60 - (time.time() % 60)))
+    finally:
+        scheduler.shutdown()
 
 if __name__ == "__main__":
     symbols = ["BTC-USDT", "ETH-USDT", "BNB-USDT", "XRP-USDT", "SOL-USDT"]
+    # Out-of-sample check before the live loop (its R^2 confidence is in-sample)
+    walk_forward_report(symbols)
     main(symbols)
\ No newline at end of file
@@ -0,0 +1,106 @@
+import pandas as pd
+from sqlalchemy import Table, Column, MetaData, DateTime, Float, String, Boolean, Index, inspect, insert, text
+from typing import Dict, List
+
+# --- Table Definition ---
+metadata = MetaData()
+
+# One row per (symbol, bar) prediction. Outcome columns stay NULL until the horizon has passed.
+lasso_orders = Table(
+    'lasso_orders', metadata,
+    Column('order_symbol', String(20), primary_key=True),
+    Column('time', DateTime, primary_key=True),
+    Column('prediction', Float),
+    Column('confidence', Float),
+    Column('last_close', Float),
+    Column('horizon_time', DateTime, nullable=False),
+    Column('is_best', Boolean, nullable=False, default=False),
+    Column('realized_close', Float),
+    Column('realized_return', Float),
+    Column('drawdown', Float),
+    Column('hold_time', Float),
+    Index('ix_lasso_orders_symbol_horizon', 'order_symbol', 'horizon_time'),
+)
+
+def create_tables(engine):
+    """Create lasso_orders, moving a table with the old single-row schema out of the way."""
+    inspector = inspect(engine)
+    if inspector.has_table('lasso_orders'):
+        columns = {col['name'] for col in inspector.get_columns('lasso_orders')}
+        if 'horizon_time' not in columns:
+            with engine.begin() as connection:
+                connection.execute(text("RENAME TABLE lasso_orders TO lasso_orders_legacy"))
+            print("Old 'lasso_orders' table renamed to 'lasso_orders_legacy'.")
+    metadata.create_all(engine, [lasso_orders])
+
+# --- Writes ---
+def save_predictions(session, time, results: Dict[str, dict], best_symbol: str, horizon_minutes: int = 1):
+    """
+    Insert the predictions of every symbol for one cycle in a single statement.
+
+    `results` maps symbol -> {'prediction', 'confidence', 'last_close'} and, optionally, 'time'
+    (the bar the prediction was made on; defaults to `time`).
+    """
+    rows = []
+    for symbol, result in results.items():
+        bar_time = pd.Timestamp(result.get('time', time)).to_pydatetime()
+        rows.append({
+            'order_symbol': symbol,
+            'time': bar_time,
+            'prediction': float(result['prediction']),
+            'confidence': float(result['confidence']),
+            'last_close': float(result['last_close']),
+            'horizon_time': bar_time + pd.Timedelta(minutes=horizon_minutes),
+            'is_best': symbol == best_symbol,
+        })
+    if not rows:
+        return 0
+
+    try:
+        session.execute(insert(lasso_orders).prefix_with("IGNORE"), rows)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        print(f"Error saving predictions: {e}")
+        return 0
+    return len(rows)
+
+def record_outcomes(session, symbols: List[str], now=None):
+    """
+    Fill realized_close, realized_return, drawdown and hold_time of every prediction whose
+    horizon has passed, with one set-based UPDATE per symbol table.
+
+    drawdown is the worst adverse move between the prediction bar and the horizon relative to
+    last_close, taking the predicted direction as the position side.
+    """
+    now = pd.Timestamp.utcnow().tz_localize(None) if now is None else pd.Timestamp(now)
+    updated = 0
+    for symbol in symbols:
+        table_name = symbol.replace("-", "_").lower()
+        query = text(f"""
+            UPDATE lasso_orders o
+            JOIN {table_name} k ON k.time = o.horizon_time
+            SET o.realized_close = k.close,
+                o.realized_return = k.close / o.last_close - 1,
+                o.hold_time = TIMESTAMPDIFF(SECOND, o.time, o.horizon_time) / 60,
+                o.drawdown = LEAST(0, CASE
+                    WHEN o.prediction >= o.last_close THEN
+                        (SELECT MIN(w.low) FROM {table_name} w
+                         WHERE w.time > o.time AND w.time <= o.horizon_time) / o.last_close - 1
+                    ELSE
+                        1 - (SELECT MAX(w.high) FROM {table_name} w
+                             WHERE w.time > o.time AND w.time <= o.horizon_time) / o.last_close
+                END)
+            WHERE o.order_symbol = :symbol
+              AND o.realized_close IS NULL
+              AND o.horizon_time <= :now
+        """)
+        try:
+            result = session.execute(query, {"symbol": symbol, "now": now.to_pydatetime()})
+            updated += result.rowcount
+        except Exception as e:
+            session.rollback()
+            print(f"Error recording outcomes for {symbol}: {e}")
+            continue
+    session.commit()
+    return updated
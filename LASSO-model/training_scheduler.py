@@ -0,0 +1,124 @@
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, wait
+from sklearn.linear_model import Lasso, LassoCV
+from sklearn.metrics import r2_score
+from typing import Dict, Optional, Tuple
+
+# --- Worker ---
+def fit_symbol(symbol: str, X: np.ndarray, y: np.ndarray, state: Optional[dict] = None,
+               run_cv: bool = True, path_window: int = 10) -> dict:
+    """
+    Fit one symbol and return its prediction, R^2 and the state to warm-start from next cycle.
+
+    Without a state the full LassoCV path is computed. With a state, either a LassoCV is run
+    on a window of the cached alphas around the previous alpha (run_cv=True), or a single
+    Lasso is refit at the previous alpha starting from the previous coefficients.
+    """
+    start = time.time()
+    if state is None:
+        model = LassoCV(cv=5, random_state=42).fit(X, y)
+        alphas = model.alphas_
+        alpha = model.alpha_
+        coef = model.coef_
+    elif run_cv:
+        cached = state["alphas"]
+        idx = int(np.argmin(np.abs(cached - state["alpha"])))
+        lo, hi = max(0, idx - path_window), min(len(cached), idx + path_window + 1)
+        model = LassoCV(cv=5, alphas=cached[lo:hi], random_state=42).fit(X, y)
+        alphas = cached
+        alpha = model.alpha_
+        coef = model.coef_
+    else:
+        model = Lasso(alpha=state["alpha"], warm_start=True, max_iter=1000)
+        model.coef_ = state["coef"].copy()
+        model.fit(X, y)
+        alphas = state["alphas"]
+        alpha = state["alpha"]
+        coef = model.coef_
+
+    r2 = r2_score(y, model.predict(X))
+    prediction = model.predict(X[-1].reshape(1, -1))[0]
+    return {
+        "symbol": symbol,
+        "prediction": prediction,
+        "confidence": r2,
+        "state": {"alphas": alphas, "alpha": alpha, "coef": coef},
+        "fit_seconds": time.time() - start,
+    }
+
+# --- Scheduler ---
+class TrainingScheduler:
+    """
+    Fits LASSO models for many symbols in a persistent process pool.
+
+    The regularization path and the last alpha/coefficients of every symbol are cached so the
+    next cycle warm-starts instead of refitting from scratch. Each cycle has a deadline: whatever
+    has finished by then is returned, slower fits keep running and only refresh the cache.
+    """
+    def __init__(self, max_workers: Optional[int] = None, deadline: float = 45.0, cv_every: int = 15):
+        self.executor = ProcessPoolExecutor(max_workers=max_workers)
+        self.deadline = deadline
+        self.cv_every = cv_every
+        self.states: Dict[str, dict] = {}
+        self.cycles: Dict[str, int] = {}
+        self.pending = {}
+
+    def _store_state(self, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        result = future.result()
+        self.states[result["symbol"]] = result["state"]
+
+    def submit(self, symbol: str, X: np.ndarray, y: np.ndarray):
+        """Submit one fit, warm-starting from the cached state if there is one."""
+        state = self.states.get(symbol)
+        cycle = self.cycles.get(symbol, 0)
+        run_cv = cycle % self.cv_every == 0
+        self.cycles[symbol] = cycle + 1
+        future = self.executor.submit(fit_symbol, symbol, X, y, state, run_cv)
+        future.add_done_callback(self._store_state)
+        self.pending[symbol] = future
+        return future
+
+    def run_cycle(self, datasets: Dict[str, Tuple[np.ndarray, np.ndarray]],
+                  deadline: Optional[float] = None) -> Dict[str, dict]:
+        """
+        Fit every symbol in `datasets` and return the results available before the deadline.
+        Symbols whose previous fit is still running are skipped this cycle.
+        """
+        deadline = self.deadline if deadline is None else deadline
+        start = time.time()
+
+        futures = {}
+        for symbol, (X, y) in datasets.items():
+            previous = self.pending.get(symbol)
+            if previous is not None and not previous.done():
+                print(f"Skipping {symbol}: previous fit still running.")
+                continue
+            futures[symbol] = self.submit(symbol, X, y)
+
+        done, not_done = wait(futures.values(), timeout=max(0.0, deadline - (time.time() - start)))
+
+        results = {}
+        for symbol, future in futures.items():
+            if future not in done:
+                continue
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Error training {symbol}: {e}")
+                continue
+            results[symbol] = {
+                "prediction": result["prediction"],
+                "confidence": result["confidence"],
+                "alpha": result["state"]["alpha"],
+            }
+
+        if not_done:
+            late = [s for s, f in futures.items() if f in not_done]
+            print(f"Deadline of {deadline:.0f}s reached, publishing {len(results)}/{len(futures)} symbols. Late: {late}")
+        return results
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
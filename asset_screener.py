@@ -0,0 +1,227 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import Table, Column, MetaData, DateTime, Float, Integer, String, text
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+HOURS_PER_YEAR = 24 * 365
+
+# ---------------------------------------------------------------------------
+# BẢNG THỐNG KÊ
+# ---------------------------------------------------------------------------
+metadata = MetaData()
+
+# Tổng tích lũy theo từng ticker, cập nhật tăng dần từ last_open_time (DOUBLE để tổng không mất chính xác)
+ticker_stats = Table(
+    'ticker_stats', metadata,
+    Column('ticker', String(50), primary_key=True),
+    Column('name', String(50), nullable=False),
+    Column('first_open_time', DateTime),
+    Column('last_open_time', DateTime),
+    Column('first_close', Float(53)),
+    Column('last_close', Float(53)),
+    Column('bars', Integer, nullable=False),
+    Column('n', Integer, nullable=False),
+    Column('sum_log_return', Float(53), nullable=False),
+    Column('sum_return', Float(53), nullable=False),
+    Column('sum_return_sq', Float(53), nullable=False),
+    Column('sum_quote_volume', Float(53), nullable=False),
+    Column('quote_volume_30d', Float(53)),
+    Column('updated_at', DateTime),
+)
+
+# ---------------------------------------------------------------------------
+# TÍNH TOÁN VECTOR HÓA
+# ---------------------------------------------------------------------------
+def compute_increment(closes, quote_volumes, last_close=None):
+    """Các tổng của một đoạn nến mới (nối với last_close của lần cập nhật trước nếu có)."""
+    series = closes if last_close is None else np.concatenate(([last_close], closes))
+    prev, curr = series[:-1], series[1:]
+    valid = (prev > 0) & (curr > 0)
+    ratio = curr[valid] / prev[valid]
+    returns = ratio - 1
+    return {
+        'bars': len(closes),
+        'n': int(valid.sum()),
+        'sum_log_return': float(np.log(ratio).sum()),
+        'sum_return': float(returns.sum()),
+        'sum_return_sq': float((returns ** 2).sum()),
+        'sum_quote_volume': float(np.nansum(quote_volumes)),
+    }
+
+def annualized_metrics(n, sum_log_return, sum_return, sum_return_sq, periods_per_year=HOURS_PER_YEAR):
+    """
+    Lợi suất kỳ vọng (CAGR như mean_historical_return), độ biến động và Sharpe theo năm
+    từ các tổng — mọi đầu vào là mảng NumPy, một phần tử cho mỗi ticker.
+    """
+    n = np.asarray(n, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        mu = np.expm1(np.asarray(sum_log_return) * periods_per_year / n)
+        variance = (np.asarray(sum_return_sq) - np.asarray(sum_return) ** 2 / n) / (n - 1)
+        volatility = np.sqrt(np.maximum(variance, 0) * periods_per_year)
+        sharpe = mu / volatility
+    invalid = n < 2
+    mu[invalid] = volatility[invalid] = sharpe[invalid] = np.nan
+    return mu, volatility, sharpe
+
+def select_top(scores, max_assets, largest=True):
+    """Chỉ số của max_assets phần tử tốt nhất (bỏ qua NaN), dùng argpartition thay vì sắp xếp toàn bộ."""
+    scores = np.where(np.isnan(scores), -np.inf if largest else np.inf, scores)
+    keys = -scores if largest else scores
+    k = min(max_assets, len(keys))
+    if k <= 0:
+        return np.array([], dtype=int)
+    top = np.argpartition(keys, k - 1)[:k]
+    top = top[np.argsort(keys[top], kind="stable")]
+    return top[np.isfinite(scores[top])]
+
+def rank_assets(prices, tickers, max_assets, criterion="sharpe", periods_per_year=HOURS_PER_YEAR, min_observations=2):
+    """
+    Xếp hạng trực tiếp trên ma trận giá (T x N, NaN khi chưa có dữ liệu), ví dụ cho một cửa sổ rolling.
+
+    Returns:
+        list: các ticker được chọn theo thứ tự xếp hạng
+    """
+    prices = np.asarray(prices, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = prices[1:] / prices[:-1]
+    ratio[~np.isfinite(ratio) | (ratio <= 0)] = np.nan
+    valid = ~np.isnan(ratio)
+    ratio = np.where(valid, ratio, 1.0)  # Ô thiếu dữ liệu đóng góp 0 vào mọi tổng
+    returns = ratio - 1
+
+    n = valid.sum(axis=0)
+    mu, volatility, sharpe = annualized_metrics(
+        n, np.log(ratio).sum(axis=0), returns.sum(axis=0), (returns ** 2).sum(axis=0), periods_per_year
+    )
+    sharpe[n < min_observations] = np.nan
+    volatility[n < min_observations] = np.nan
+
+    if criterion == "sharpe":
+        top = select_top(sharpe, max_assets, largest=True)
+    elif criterion == "volatility":
+        top = select_top(volatility, max_assets, largest=False)
+    else:
+        raise ValueError("Criterion not supported! Use 'sharpe' or 'volatility'.")
+    return [tickers[i] for i in top]
+
+# ---------------------------------------------------------------------------
+# SCREENER
+# ---------------------------------------------------------------------------
+class AssetScreener:
+    """
+    Sàng lọc toàn bộ universe USDT trong MySQL dựa trên bảng ticker_stats.
+
+    update chỉ đọc các nến mới hơn last_open_time của từng ticker (theo khóa chính open_time) và cộng
+    dồn vào các tổng; screen là một truy vấn trên ticker_stats rồi xếp hạng bằng NumPy.
+    """
+    def __init__(self, engine, periods_per_year=HOURS_PER_YEAR):
+        self.periods_per_year = periods_per_year
+        metadata.create_all(engine, [ticker_stats])
+
+    def _load_stats(self, session):
+        rows = session.execute(text("SELECT * FROM ticker_stats")).mappings().fetchall()
+        return {row['ticker']: dict(row) for row in rows}
+
+    def update(self, session, tickers=None, liquidity_days=30):
+        """
+        Cập nhật ticker_stats cho các ticker (dict ticker -> tên bảng; mặc định lấy từ bảng tickers).
+
+        Returns:
+            int: số nến mới đã được cộng vào
+        """
+        if tickers is None:
+            tickers = dict(session.execute(text("SELECT ticker, name FROM tickers")).fetchall())
+        stats = self._load_stats(session)
+        # Cột DateTime không lưu timezone: ghi giờ UTC dạng naive
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        total = 0
+
+        for ticker, name in tickers.items():
+            current = stats.get(ticker)
+            since = current['last_open_time'] if current else datetime(1970, 1, 1)
+            try:
+                rows = session.execute(
+                    text(f"SELECT open_time, close, quote_asset_volume FROM `{name}` WHERE open_time > :since ORDER BY open_time"),
+                    {"since": since}
+                ).fetchall()
+            except Exception as e:
+                print(f"Lỗi khi đọc {name}: {e}")
+                session.rollback()
+                continue
+            if not rows:
+                continue
+
+            closes = np.fromiter((row.close for row in rows), dtype=float, count=len(rows))
+            quote_volumes = np.fromiter((row.quote_asset_volume or 0.0 for row in rows), dtype=float, count=len(rows))
+            increment = compute_increment(closes, quote_volumes, current['last_close'] if current else None)
+
+            values = {
+                'ticker': ticker,
+                'name': name,
+                'first_open_time': current['first_open_time'] if current else rows[0].open_time,
+                'first_close': current['first_close'] if current else float(closes[0]),
+                'last_open_time': rows[-1].open_time,
+                'last_close': float(closes[-1]),
+                'updated_at': now,
+            }
+            for key, value in increment.items():
+                values[key] = (current[key] if current else 0) + value
+
+            values['quote_volume_30d'] = session.execute(
+                text(f"SELECT SUM(quote_asset_volume) FROM `{name}` WHERE open_time > :since"),
+                {"since": rows[-1].open_time - timedelta(days=liquidity_days)}
+            ).scalar()
+
+            stmt = mysql_insert(ticker_stats).values(**values)
+            stmt = stmt.on_duplicate_key_update({k: stmt.inserted[k] for k in values if k != 'ticker'})
+            session.execute(stmt)
+            total += len(rows)
+
+        session.commit()
+        return total
+
+    def metrics(self, session):
+        """DataFrame các chỉ số theo năm của toàn bộ ticker trong ticker_stats."""
+        df = pd.DataFrame(self._load_stats(session).values())
+        if df.empty:
+            return df
+        df['mu'], df['volatility'], df['sharpe'] = annualized_metrics(
+            df['n'].to_numpy(), df['sum_log_return'].to_numpy(), df['sum_return'].to_numpy(),
+            df['sum_return_sq'].to_numpy(), self.periods_per_year
+        )
+        return df
+
+    def screen(self, session, max_assets, criterion="sharpe", min_quote_volume_30d=0.0, min_bars=0,
+               required_assets=None, by_name=False, candidates=None):
+        """
+        Chọn max_assets ticker tốt nhất theo Sharpe (hoặc độ biến động thấp nhất) sau khi lọc thanh khoản,
+        chỉ trong `candidates` nếu được truyền vào.
+
+        Returns:
+            list: ticker (hoặc tên bảng nếu by_name), các tài sản bắt buộc đứng đầu
+        """
+        df = self.metrics(session)
+        if df.empty:
+            print("Bảng ticker_stats trống, hãy chạy update trước")
+            return list(required_assets or [])[:max_assets]
+
+        key = df['name' if by_name else 'ticker']
+        eligible = ((df['quote_volume_30d'].fillna(0).to_numpy() >= min_quote_volume_30d)
+                    & (df['bars'].to_numpy() >= min_bars))
+        if candidates is not None:
+            eligible &= key.isin(candidates).to_numpy()
+        if criterion == "sharpe":
+            scores = np.where(eligible, df['sharpe'].to_numpy(), np.nan)
+            top = select_top(scores, max_assets, largest=True)
+        elif criterion == "volatility":
+            scores = np.where(eligible, df['volatility'].to_numpy(), np.nan)
+            top = select_top(scores, max_assets, largest=False)
+        else:
+            raise ValueError("Criterion not supported! Use 'sharpe' or 'volatility'.")
+
+        top_assets = key.to_numpy()[top].tolist()
+        if required_assets is not None:
+            top_assets = list(required_assets) + [asset for asset in top_assets if asset not in required_assets]
+            top_assets = top_assets[:max_assets]
+        return top_assets
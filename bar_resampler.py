@@ -0,0 +1,88 @@
+import polars as pl
+from kline_cache import KlineCache, normalize_klines
+from kline_store import KlineStore, ParquetKlineBackend
+
+DEFAULT_TIMEFRAMES = ("5m", "15m", "1h", "4h", "1d")
+
+# Cách gộp từng cột kline khi lên khung thời gian lớn hơn
+AGGREGATIONS = {
+    "open": pl.col("open").first(),
+    "high": pl.col("high").max(),
+    "low": pl.col("low").min(),
+    "close": pl.col("close").last(),
+    "volume": pl.col("volume").sum(),
+    "close_time": pl.col("close_time").last(),
+    "quote_asset_volume": pl.col("quote_asset_volume").sum(),
+    "number_of_trades": pl.col("number_of_trades").sum(),
+    "taker_buy_base_asset_volume": pl.col("taker_buy_base_asset_volume").sum(),
+    "taker_buy_quote_asset_volume": pl.col("taker_buy_quote_asset_volume").sum(),
+}
+
+def resample_klines(bars, every):
+    """
+    Gộp nến cơ sở (LazyFrame/DataFrame đã sắp xếp theo open_time) thành khung `every`.
+    Nến được gán nhãn theo thời điểm mở (giống Binance: khung 4h/1d căn theo UTC).
+    """
+    columns = bars.collect_schema().names()
+    return (
+        bars.group_by_dynamic("open_time", every=every, closed="left", label="left")
+        .agg([expr.alias(name) for name, expr in AGGREGATIONS.items() if name in columns])
+    )
+
+class BarResampler:
+    """
+    Dựng các khung 5m/15m/1h/4h/1d từ nến 1m và lưu từng khung vào KlineCache.
+
+    Khi có nến 1m mới, mỗi khung chỉ tính lại từ đầu nến (của khung đó) chứa nến mới sớm nhất,
+    tức là chỉ các nến cuối còn đang hình thành bị viết lại; phần lịch sử không bị đụng tới.
+    """
+    def __init__(self, cache=None, base_interval="1m", timeframes=DEFAULT_TIMEFRAMES):
+        self.cache = cache if cache is not None else KlineCache()
+        self.store = KlineStore(ParquetKlineBackend(self.cache))
+        self.base_interval = base_interval
+        self.timeframes = timeframes
+
+    def update(self, symbol, new_bars=None):
+        """
+        Ghi nến 1m mới (nếu có) rồi cập nhật các khung lớn hơn.
+        Không truyền new_bars thì dựng lại toàn bộ từ nến 1m trong cache.
+
+        Returns:
+            dict: số nến đã (viết lại) cho từng khung
+        """
+        since = None
+        if new_bars is not None:
+            new_bars = normalize_klines(new_bars)
+            if new_bars.is_empty():
+                return {}
+            self.cache.write(symbol, self.base_interval, new_bars)
+            since = new_bars["open_time"].min()
+
+        if not self.cache.months(symbol, self.base_interval):
+            print(f"Không có nến {self.base_interval} nào cho {symbol}")
+            return {}
+
+        updated = {}
+        for every in self.timeframes:
+            # Chỉ quét các tháng/row group từ đầu nến chứa nến mới sớm nhất
+            start = pl.Series([since]).dt.truncate(every).item() if since is not None else None
+            bars = self.cache.scan(symbol, self.base_interval, start=start)
+            resampled = resample_klines(bars.sort("open_time"), every).collect()
+            self.cache.write(symbol, every, resampled)
+            updated[every] = resampled.height
+        return updated
+
+    def rebuild(self, symbol):
+        return self.update(symbol)
+
+    def read(self, symbol, interval, columns=None, start=None, end=None, limit=None):
+        """Đọc một khung đã được dựng sẵn (hoặc chính khung cơ sở) trong khoảng [start, end), tối đa `limit` nến cuối."""
+        return self.store.read(symbol, interval, start, end, columns, limit)
+
+# --- Sử dụng ---
+# if __name__ == '__main__':
+#     from strategies.binance_data_handle import BinanceDataHandler
+#     handler = BinanceDataHandler(ticker='BTCUSDT', data_frequency='1m')
+#     resampler = BarResampler(KlineCache("./kline_cache"))
+#     resampler.update('BTCUSDT', handler.load_data())
+#     print(resampler.read('BTCUSDT', '4h', start='2024-01-01', limit=5))
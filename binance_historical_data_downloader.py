@@ -1,8 +1,9 @@
 import os
 import shutil
-from binance_historical_data import BinanceDataDumper
 import datetime
 import multiprocessing
+from binance_metadata_cache import BinanceMetadataCache, get_data_dumper
+from kline_merge import merge_csv_files
 
 if __name__ == "__main__":
     multiprocessing.freeze_support()
@@ -18,14 +19,10 @@ if __name__ == "__main__":
     first_day_of_month = datetime.date(now.year, now.month, 1)
     last_day_of_month = (first_day_of_month + datetime.timedelta(days=32)).replace(day=1) - datetime.timedelta(days=1)
 
-    data_dumper = BinanceDataDumper(
-        path_dir_where_to_dump=temp_output_dir,
-        asset_class='spot',
-        data_type='klines',
-        data_frequency='1h'
-    )
+    data_dumper = get_data_dumper('spot', 'klines', '1h', path_dir_where_to_dump=temp_output_dir)
 
-    tickers = data_dumper.get_list_all_trading_pairs()
+    # Danh sách symbol từ cache metadata (chỉ gọi Binance khi cache hết hạn)
+    tickers = BinanceMetadataCache().symbols()
     excluded_tickers = ["UPUSDT", "DOWNUSDT", "BEARUSDT", "BULLUSDT"]
     tickers = [
         ticker
@@ -58,9 +55,8 @@ if __name__ == "__main__":
                         dest_file = os.path.join(final_ticker_dir, file)
 
                         if os.path.exists(dest_file):
-                            with open(src_file, 'r') as src, open(dest_file, 'a') as dest:
-                                next(src)  # Bỏ qua header của file mới nếu đã có trong file cũ
-                                dest.write(src.read())
+                            # Merge theo open_time (file mới thắng) thay vì nối thêm dòng: tải lại không sinh nến trùng
+                            merge_csv_files([src_file], dest_file)
                         else:
                             shutil.move(src_file, dest_file)
 
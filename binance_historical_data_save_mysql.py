@@ -4,12 +4,14 @@ import json
 import config
 import pandas as pd
 import urllib.request
-import multiprocessing
 from datetime import datetime, timedelta, date
-from binance_historical_data import BinanceDataDumper
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import Table, Column, MetaData, DateTime, Float, Integer, String, inspect, insert, Date
 from sqlalchemy.dialects.mysql import insert as mysql_insert
+from download_pool import DownloadWorkerPool
+from binance_metadata_cache import BinanceMetadataCache, get_data_dumper
+from kline_store import prune_files
+from kline_merge import merge_klines
 
 # ---------------------------------------------------------------------------
 # CẤU HÌNH VÀ KHỞI TẠO DATABASE
@@ -83,15 +85,6 @@ def format_time(seconds):
 # ---------------------------------------------------------------------------
 # HÀM XỬ LÝ DỮ LIỆU TICKER VÀ BẢNG CSDL
 # ---------------------------------------------------------------------------
-def get_list_all_trading_pairs():
-    data_dumper = BinanceDataDumper(
-        path_dir_where_to_dump=".",
-        asset_class="spot",
-        data_type="klines",
-        data_frequency="1h",
-    )
-    return data_dumper.get_list_all_trading_pairs()
-
 def filter_usdt_tickers(tickers):
     exclude_keywords = ["UPUSDT", "DOWNUSDT", "BEARUSDT", "BULLUSDT"]
     return [ticker for ticker in tickers if ticker.endswith("USDT") and not any(ex in ticker for ex in exclude_keywords)]
@@ -123,15 +116,6 @@ def get_tickers_data(session, engine):
         print(f"Lỗi khi lấy dữ liệu tickers: {str(e)}")
         return {}
 
-def find_first_data_date(ticker):
-    data_dumper = BinanceDataDumper(
-        path_dir_where_to_dump=".",
-        asset_class="spot",
-        data_type="klines",
-        data_frequency="1h",
-    )
-    return data_dumper.get_min_start_date_for_ticker(ticker)
-
 def create_table_if_not_exists(engine, table_name):
     inspector = inspect(engine)
     if not inspector.has_table(table_name):
@@ -162,12 +146,18 @@ def save_data_to_table(session, engine, table_name, data):
     session.execute(stmt)
 
 def update_tickers_table(session, ticker, first_open_time, last_updated_date, name):
-    stmt = mysql_insert(tickers_table).values(
-        ticker=ticker,
-        first_open_time=first_open_time,
-        last_updated_date=last_updated_date,
-        name=name
-    )
+    upsert_tickers(session, [{
+        'ticker': ticker,
+        'first_open_time': first_open_time,
+        'last_updated_date': last_updated_date,
+        'name': name
+    }])
+
+def upsert_tickers(session, rows):
+    """Ghi nhiều dòng vào bảng tickers bằng một câu lệnh INSERT ... ON DUPLICATE KEY UPDATE."""
+    if not rows:
+        return
+    stmt = mysql_insert(tickers_table).values(rows)
     stmt = stmt.on_duplicate_key_update(
         first_open_time=stmt.inserted.first_open_time,
         last_updated_date=stmt.inserted.last_updated_date,
@@ -178,48 +168,43 @@ def update_tickers_table(session, ticker, first_open_time, last_updated_date, na
 # ---------------------------------------------------------------------------
 # HÀM DOWNLOAD VÀ XỬ LÝ DỮ LIỆU TICKER
 # ---------------------------------------------------------------------------
-def download_ticker(ticker, date_start):
-    data_dumper = BinanceDataDumper(
-        path_dir_where_to_dump=".",
-        asset_class="spot",
-        data_type="klines",
-        data_frequency="1h",
-    )
-    data_dumper.dump_data(
+def download_ticker(ticker, date_start, last_updated_date=None):
+    """Tác vụ của pool: tải CSV rồi đọc/merge ngay trong worker, trả về DataFrame nến mới (hoặc None)."""
+    get_data_dumper().dump_data(
         tickers=ticker,
         date_start=date_start,
         date_end=date.today(),
         is_to_update_existing=False,
     )
+    return process_csv_files(ticker, start=last_updated_date)
 
-def run_download_ticker(ticker, date_start):
-    try:
-        download_ticker(ticker, date_start)
-    except Exception as e:
-        print(f"❌ Lỗi khi download {ticker}: {e}")
-
-def process_csv_files(ticker):
+def process_csv_files(ticker, start=None):
+    """
+    Chuỗi nến chuẩn của ticker từ open_time >= start: file tháng và file ngày (chồng nhau ở tháng hiện tại)
+    được merge theo open_time, file ngày thắng khi trùng, nên DB chỉ nhận mỗi nến một lần.
+    """
     daily_path = os.path.join(os.getcwd(), f"spot/daily/klines/{ticker}/1h")
     monthly_path = os.path.join(os.getcwd(), f"spot/monthly/klines/{ticker}/1h")
-    daily_files = get_csv_files(daily_path)
-    monthly_files = get_csv_files(monthly_path)
-    all_files = daily_files + monthly_files
-    if not all_files:
+    daily_files = prune_files(get_csv_files(daily_path), start)
+    monthly_files = prune_files(get_csv_files(monthly_path), start)
+    if not daily_files and not monthly_files:
         print(f"❗ Không có file CSV nào cho {ticker}")
         return None
-    data = pd.concat([read_csv_file(file) for file in all_files], ignore_index=True)
-    data.sort_values(by='open_time', inplace=True)
+    data = merge_klines([read_csv_file(file) for file in sorted(monthly_files) + sorted(daily_files)])
+    if data is not None and start is not None:
+        data = data[data['open_time'] >= pd.Timestamp(start)]
     return data
 
 # ---------------------------------------------------------------------------
 # HÀM CHÍNH
 # ---------------------------------------------------------------------------
-def main():
+def main(n_workers=4, time_stop=90, retries=1):
     start_time = time.time()
     print("Bắt đầu xử lý tickers...")
 
-    # Lấy danh sách các ticker và lọc theo USDT
-    all_tickers = get_list_all_trading_pairs()
+    # Lấy danh sách các ticker (từ cache metadata, chỉ gọi Binance khi cache hết hạn) và lọc theo USDT
+    binance_metadata = BinanceMetadataCache()
+    all_tickers = binance_metadata.symbols()
     tickers = filter_usdt_tickers(all_tickers)
     print(f"Lấy danh sách tickers: {len(tickers)} tickers, thời gian: {format_time(time.time() - start_time)}")
 
@@ -227,108 +212,106 @@ def main():
     tickers_data = get_tickers_data(session, engine)
     print(f"Lấy dữ liệu tickers từ DB: thời gian: {format_time(time.time() - start_time)}")
 
-    tickers_update_info = []
-    total_tickers = len(tickers)
-
-    # Cập nhật bảng tickers nếu dữ liệu chưa có
-    for index, ticker in enumerate(tickers):
-        ticker_start_time = time.time()
-        table_name = get_table_name(ticker)
-        data_info = tickers_data.get(ticker, {})
-
-        if data_info:
-            tickers_update_info.append({
-                'ticker': ticker,
-                'last_updated_date': data_info.get('last_updated_date'),
-                'first_open_time': data_info.get('first_open_time'),
-                'name': table_name
-            })
-            continue
-
-        first_open_time = find_first_data_date(ticker)
-        if first_open_time is None:
-            print(f"Bỏ qua {ticker} do không tìm thấy dữ liệu đầu tiên.")
-            continue
-
-        last_updated_date = first_open_time
-
-        try:
-            update_tickers_table(session, ticker, first_open_time, last_updated_date, table_name)
-            session.commit()
-            tickers_update_info.append({
+    # Pool worker dùng chung cho tra cứu ngày đầu tiên và download (timeout: time_stop giây mỗi tác vụ)
+    with DownloadWorkerPool(n_workers=n_workers, timeout=time_stop, retries=retries) as pool:
+        # Ticker mới: ngày dữ liệu đầu tiên lấy từ cache metadata (symbol chưa có thì tra song song trên pool),
+        # lưu vào bảng tickers trong một lần ghi
+        new_tickers = [ticker for ticker in tickers if ticker not in tickers_data]
+        if new_tickers:
+            first_dates = binance_metadata.first_dates(new_tickers, "1h", pool=pool)
+            new_rows = []
+            for ticker in new_tickers:
+                if first_dates.get(ticker) is None:
+                    print(f"Bỏ qua {ticker} do không tìm thấy dữ liệu đầu tiên.")
+                    continue
+                new_rows.append({
+                    'ticker': ticker,
+                    'first_open_time': first_dates[ticker],
+                    'last_updated_date': first_dates[ticker],
+                    'name': get_table_name(ticker)
+                })
+            try:
+                upsert_tickers(session, new_rows)
+                session.commit()
+                for row in new_rows:
+                    tickers_data[row['ticker']] = row
+                print(f"Thêm {len(new_rows)}/{len(new_tickers)} ticker mới: thời gian: {format_time(time.time() - start_time)}")
+            except Exception as e:
+                session.rollback()
+                print(f"Lỗi khi cập nhật bảng tickers: {str(e)}")
+
+        tickers_update_info = [
+            {
                 'ticker': ticker,
-                'last_updated_date': last_updated_date,
-                'first_open_time': first_open_time,
-                'name': table_name
-            })
-            print(f"{ticker}: {format_time(time.time() - ticker_start_time)}, {index + 1}/{total_tickers}")
-        except Exception as e:
-            session.rollback()
-            print(f"Lỗi khi cập nhật {ticker}: {str(e)}, thời gian: {format_time(time.time() - ticker_start_time)}")
-            continue
-
-    # Sắp xếp theo last_updated_date
-    tickers_update_info.sort(key=lambda x: x['last_updated_date'])
-    tickers = [info['ticker'] for info in tickers_update_info]
-    print(f"Sắp xếp tickers theo ngày cập nhật: thời gian: {format_time(time.time() - start_time)}")
-    print(f"Hoàn thành cập nhật tickers, tổng thời gian: {format_time(time.time() - start_time)}")
-
-    # Xử lý từng ticker
-    for i, ticker in enumerate(tickers):
-        ticker_start_time = time.time()
-        print(f"🔄 Đang xử lý {ticker}... (Ticker {i + 1}/{len(tickers)})")
-
-        ticker_info = next((info for info in tickers_update_info if info['ticker'] == ticker), {})
-        date_start = ticker_info.get('last_updated_date')
-        first_open_time = ticker_info.get('first_open_time')
-
-        if not date_start:
-            date_start = find_first_data_date(ticker)
-        else:
-            date_start = date_start - timedelta(days=1)
-
-        time_stop = 90  # thời gian timeout (giây)
-        proc = multiprocessing.Process(target=run_download_ticker, args=(ticker, date_start))
-        proc.start()
-        proc.join(timeout=time_stop)
-
-        if proc.is_alive():
-            print(f"⚠️ Bỏ qua {ticker}: Thời gian chạy vượt quá {time_stop} giây")
-            proc.terminate()  # Kết thúc process nếu vượt thời gian
-            proc.join()       # Chờ cho process kết thúc
-            continue
-
-        # Xử lý dữ liệu CSV
-        data = process_csv_files(ticker)
-        if data is None:
-            continue
-
-        table_name = ticker_info.get('name')
-        create_table_if_not_exists(engine, table_name)
-
-        try:
-            save_data_to_table(session, engine, table_name, data)
-            last_updated_date = data['open_time'].max()
-            update_tickers_table(session, ticker, first_open_time, last_updated_date, table_name)
-            session.commit()
-        except FileNotFoundError as e:
-            print(f"❗ Lỗi không tìm thấy file cho {ticker}: {str(e)}")
-            continue
-        except Exception as e:
-            print(f"❗ Lỗi nghiêm trọng khi xử lý {ticker}: {str(e)}")
-            session.rollback()
-            continue
-        finally:
-            session.close()
-
-        # Hiển thị thời gian xử lý và ước tính còn lại
-        elapsed_time = time.time() - ticker_start_time
-        total_elapsed = time.time() - start_time
-        avg_ticker_time = total_elapsed / (i + 1)
-        remaining_tickers = len(tickers) - i - 1
-        estimated_time = avg_ticker_time * remaining_tickers
-
-        print(f"✅ {ticker}: {format_time(elapsed_time)} | Đã xử lý: {format_time(total_elapsed)} | Còn lại: {format_time(estimated_time)} ({i + 1}/{len(tickers)})")
+                'last_updated_date': tickers_data[ticker].get('last_updated_date'),
+                'first_open_time': tickers_data[ticker].get('first_open_time'),
+                'name': get_table_name(ticker)
+            }
+            for ticker in tickers if ticker in tickers_data
+        ]
+
+        # Sắp xếp theo last_updated_date
+        tickers_update_info.sort(key=lambda x: x['last_updated_date'])
+        tickers_info = {info['ticker']: info for info in tickers_update_info}
+        print(f"Sắp xếp tickers theo ngày cập nhật: thời gian: {format_time(time.time() - start_time)}")
+        print(f"Hoàn thành cập nhật tickers, tổng thời gian: {format_time(time.time() - start_time)}")
+
+        # Download và đọc CSV song song trong worker; ticker nào xong thì ghi DB ngay trong process chính
+        for info in tickers_update_info:
+            date_start = info['last_updated_date']
+            if not date_start:
+                date_start = binance_metadata.first_date(info['ticker'], "1h")
+            else:
+                date_start = date_start - timedelta(days=1)
+            pool.submit(download_ticker, info['ticker'], date_start, info['last_updated_date'])
+
+        failed = []
+        for i, outcome in enumerate(pool.results()):
+            ticker = outcome['key']
+            ticker_info = tickers_info[ticker]
+            ticker_start_time = time.time()
+
+            if outcome['status'] != 'ok':
+                print(f"⚠️ Bỏ qua {ticker}: {outcome['error']} (sau {outcome['attempts']} lần thử)")
+                failed.append(ticker)
+                continue
+            print(f"🔄 Đang xử lý {ticker}... tải xong sau {format_time(outcome['elapsed'])} (Ticker {i + 1}/{len(tickers_info)})")
+
+            # CSV đã được đọc trong worker, chỉ từ ngày cập nhật gần nhất (những nến trước đó đã có trong DB)
+            data = outcome['result']
+            if data is None or data.empty:
+                continue
+
+            table_name = ticker_info.get('name')
+            create_table_if_not_exists(engine, table_name)
+
+            try:
+                save_data_to_table(session, engine, table_name, data)
+                last_updated_date = data['open_time'].max()
+                update_tickers_table(session, ticker, ticker_info.get('first_open_time'), last_updated_date, table_name)
+                session.commit()
+            except FileNotFoundError as e:
+                print(f"❗ Lỗi không tìm thấy file cho {ticker}: {str(e)}")
+                continue
+            except Exception as e:
+                print(f"❗ Lỗi nghiêm trọng khi xử lý {ticker}: {str(e)}")
+                session.rollback()
+                continue
+            finally:
+                session.close()
+
+            # Hiển thị thời gian xử lý và ước tính còn lại
+            elapsed_time = time.time() - ticker_start_time
+            total_elapsed = time.time() - start_time
+            avg_ticker_time = total_elapsed / (i + 1)
+            remaining_tickers = len(tickers_info) - i - 1
+            estimated_time = avg_ticker_time * remaining_tickers
+
+            print(f"✅ {ticker}: {format_time(elapsed_time)} | Đã xử lý: {format_time(total_elapsed)} | Còn lại: {format_time(estimated_time)} ({i + 1}/{len(tickers_info)})")
+
+    print(f"Hoàn thành: {len(tickers_info) - len(failed)}/{len(tickers_info)} ticker, tổng thời gian: {format_time(time.time() - start_time)}")
+    if failed:
+        print(f"Ticker lỗi: {', '.join(failed)}")
 
 # ---------------------------------------------------------------------------
 # MAIN - KHỞI CHẠY CHƯƠNG TRÌNH
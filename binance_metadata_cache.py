@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import functools
+from datetime import date, datetime
+from binance_historical_data import BinanceDataDumper
+
+# ---------------------------------------------------------------------------
+# BINANCE DATA DUMPER (MỘT ĐỐI TƯỢNG CHO MỖI CẤU HÌNH, MỖI PROCESS)
+# ---------------------------------------------------------------------------
+@functools.lru_cache(maxsize=None)
+def get_data_dumper(asset_class="spot", data_type="klines", data_frequency="1h", path_dir_where_to_dump="."):
+    return BinanceDataDumper(
+        path_dir_where_to_dump=path_dir_where_to_dump,
+        asset_class=asset_class,
+        data_type=data_type,
+        data_frequency=data_frequency,
+    )
+
+def probe_first_date(asset_class, data_type, data_frequency, symbol):
+    """Hỏi Binance ngày dữ liệu đầu tiên của symbol (gọi mạng; dùng được làm tác vụ của DownloadWorkerPool)."""
+    return get_data_dumper(asset_class, data_type, data_frequency).get_min_start_date_for_ticker(symbol)
+
+def _to_date(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+# ---------------------------------------------------------------------------
+# CACHE METADATA
+# ---------------------------------------------------------------------------
+class BinanceMetadataCache:
+    """
+    Metadata của Binance lưu cục bộ trong {cache_dir}/{asset_class}.json:
+    - lists: danh sách symbol (đang giao dịch, hoặc theo thư mục trên data.binance.vision), làm mới sau ttl_hours;
+    - first_dates: ngày dữ liệu đầu tiên theo (symbol, data_type, khung thời gian); ngày đã tìm thấy không đổi
+      nên không hết hạn, kết quả chưa xác định (xem _permanent) được hỏi lại sau ttl_hours;
+    - delisted: symbol từng có trong danh sách đang giao dịch nhưng đã biến mất (kèm ngày phát hiện).
+
+    offline=True (hoặc biến môi trường BINANCE_OFFLINE=1) chỉ đọc cache, không gọi mạng.
+    Khi gọi mạng lỗi, dữ liệu cũ (dù hết hạn) được dùng thay.
+    """
+    def __init__(self, cache_dir="./binance_metadata", asset_class="spot", ttl_hours=24, offline=None):
+        if offline is None:
+            offline = os.getenv("BINANCE_OFFLINE", "").lower() in ("1", "true", "yes")
+        self.asset_class = asset_class
+        self.ttl = ttl_hours * 3600
+        self.offline = offline
+        self.path = os.path.join(cache_dir, f"{asset_class}.json")
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _update(self, section, updates, removals=()):
+        """Đọc lại file rồi chỉ ghi đè các khóa đã đổi (nhiều process có thể dùng chung cache)."""
+        data = self._load()
+        entries = data.setdefault(section, {})
+        entries.update(updates)
+        for key in removals:
+            entries.pop(key, None)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=4)
+        os.replace(tmp_path, self.path)
+
+    def _fresh(self, entry):
+        return entry is not None and time.time() - entry['fetched_at'] < self.ttl
+
+    @staticmethod
+    def _permanent(entry):
+        """
+        Ngày đầu tiên đã xác định: get_min_start_date_for_ticker trả về ngày 1 của tháng hiện tại
+        khi không tìm thấy file (hoặc lỗi mạng), nên kết quả đó chỉ được dùng đến khi hết hạn.
+        """
+        if entry['date'] is None:
+            return False
+        return _to_date(entry['date']) < date.fromtimestamp(entry['fetched_at']).replace(day=1)
+
+    def cached_list(self, key, fetch, refresh=False):
+        """
+        Danh sách lưu cache dưới `key`; `fetch()` chỉ được gọi khi hết hạn (hoặc refresh=True).
+        fetch trả về None hoặc danh sách rỗng được coi là lỗi và không ghi vào cache.
+        """
+        entry = self._load().get('lists', {}).get(key)
+        if self.offline or (self._fresh(entry) and not refresh):
+            if entry is None:
+                print(f"⚠️  Chưa có '{key}' trong cache metadata ({self.path})")
+                return None
+            return entry['value']
+
+        try:
+            value = fetch()
+        except Exception as e:
+            print(f"❌ Lỗi khi lấy '{key}': {e}")
+            value = None
+        if not value:
+            if entry is not None:
+                print(f"⚠️  Dùng '{key}' từ cache (cập nhật lúc {datetime.fromtimestamp(entry['fetched_at'])})")
+                return entry['value']
+            return value
+
+        self._update('lists', {key: {'value': list(value), 'fetched_at': time.time()}})
+        return list(value)
+
+    # --- Danh sách symbol đang giao dịch + delisting ---
+    def symbols(self, refresh=False):
+        """Danh sách symbol đang giao dịch (BinanceDataDumper.get_list_all_trading_pairs)."""
+        key = "trading_pairs"
+        previous = self._load().get('lists', {}).get(key)
+
+        def fetch():
+            current = get_data_dumper(self.asset_class).get_list_all_trading_pairs()
+            if current and previous is not None:
+                current_set = set(current)
+                today = date.today().isoformat()
+                delisted = {symbol: today for symbol in previous['value'] if symbol not in current_set}
+                known = self.delisted()
+                delisted = {symbol: day for symbol, day in delisted.items() if symbol not in known}
+                relisted = [symbol for symbol in known if symbol in current_set]
+                if delisted or relisted:
+                    self._update('delisted', delisted, relisted)
+                    if delisted:
+                        print(f"Symbol ngừng giao dịch: {', '.join(sorted(delisted))}")
+            return current
+
+        return self.cached_list(key, fetch, refresh) or []
+
+    def delisted(self):
+        """dict symbol -> ngày phát hiện ngừng giao dịch (ISO)."""
+        return self._load().get('delisted', {})
+
+    def is_delisted(self, symbol):
+        return symbol in self.delisted()
+
+    # --- Ngày dữ liệu đầu tiên ---
+    @staticmethod
+    def _first_date_key(symbol, data_type, data_frequency):
+        return f"{symbol}/{data_type}/{data_frequency}"
+
+    def first_dates(self, symbols, data_frequency="1h", data_type="klines", pool=None, refresh=False):
+        """
+        Ngày dữ liệu đầu tiên cho nhiều symbol; chỉ symbol chưa có trong cache mới được hỏi Binance,
+        song song trên `pool` (DownloadWorkerPool) nếu có, và kết quả được ghi cache trong một lần.
+
+        Returns:
+            dict: symbol -> date (None nếu không tìm thấy)
+        """
+        cached = self._load().get('first_dates', {})
+        result, missing = {}, []
+        for symbol in symbols:
+            entry = cached.get(self._first_date_key(symbol, data_type, data_frequency))
+            if entry is not None and not refresh and (self._permanent(entry) or self._fresh(entry)):
+                result[symbol] = _to_date(entry['date'])
+            elif self.offline:
+                result[symbol] = _to_date(entry['date']) if entry is not None else None
+            else:
+                missing.append(symbol)
+
+        if missing:
+            probe = functools.partial(probe_first_date, self.asset_class, data_type, data_frequency)
+            found = {}
+            if pool is not None:
+                for symbol, outcome in pool.map(probe, missing).items():
+                    if outcome['status'] != 'ok':
+                        print(f"Lỗi khi tìm ngày đầu tiên của {symbol}: {outcome['error']}")
+                        continue
+                    found[symbol] = outcome['result']
+            else:
+                for symbol in missing:
+                    try:
+                        found[symbol] = probe(symbol)
+                    except Exception as e:
+                        print(f"Lỗi khi tìm ngày đầu tiên của {symbol}: {e}")
+
+            now = time.time()
+            self._update('first_dates', {
+                self._first_date_key(symbol, data_type, data_frequency): {
+                    'date': _to_date(value).isoformat() if value is not None else None,
+                    'fetched_at': now,
+                }
+                for symbol, value in found.items()
+            })
+            for symbol in missing:
+                result[symbol] = _to_date(found.get(symbol))
+
+        return result
+
+    def first_date(self, symbol, data_frequency="1h", data_type="klines", refresh=False):
+        return self.first_dates([symbol], data_frequency, data_type, refresh=refresh)[symbol]
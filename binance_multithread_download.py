@@ -10,6 +10,7 @@ from rich.progress import Progress, TaskID
 from rich.console import Console
 from typing import List, Optional
 from natsort import natsorted
+from binance_metadata_cache import BinanceMetadataCache
 
 def download_binance_data(
     asset_type: str,
@@ -23,7 +24,8 @@ def download_binance_data(
     max_extract_workers: int = 5,
     retries: int = 3,
     batch_number: int = 1,
-    total_batches: int = 3
+    total_batches: int = 3,
+    refresh_symbols: bool = False
 ):
     """
     Downloads and extracts Binance data with parallel downloading and extraction.
@@ -41,8 +43,8 @@ def download_binance_data(
     download_base_url = "https://data.binance.vision"
     console = Console()
 
-    def get_all_symbols(asset_type: str, symbol_suffix: Optional[List[str]] = None) -> List[str]:
-        """Get all symbols for the given asset type with optional suffix filtering."""
+    def fetch_all_symbols(asset_type: str) -> List[str]:
+        """List every symbol directory on data.binance.vision for the given asset type."""
         console.print(f"[bold blue]Fetching symbols for {asset_type}...[/]")
 
         if asset_type == "spot":
@@ -96,6 +98,16 @@ def download_binance_data(
             else:
                 break
 
+        return all_symbols
+
+    def get_all_symbols(asset_type: str, symbol_suffix: Optional[List[str]] = None) -> List[str]:
+        """Get all symbols for the given asset type with optional suffix filtering."""
+        # The S3 listing is cached locally and only re-fetched once the cache expires
+        metadata = BinanceMetadataCache(asset_class=asset_type)
+        all_symbols = metadata.cached_list(
+            f"{time_period}/{data_type}", lambda: fetch_all_symbols(asset_type), refresh=refresh_symbols
+        ) or []
+
         # Filter unwanted symbols
         exclude_patterns = ["UPUSDT", "DOWNUSDT", "BEARUSDT", "BULLUSDT"]
         all_symbols = [s for s in all_symbols if not any(pattern in s for pattern in exclude_patterns)]
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+from collections import deque
+
+# ================================================
+# Incremental RSI
+# ================================================
+class IncrementalRSI:
+    """
+    Wilder-style RSI updated one closed bar at a time.
+    Same recursion as the pandas version (ewm(alpha=1/window, adjust=False) of gains/losses).
+    """
+    def __init__(self, window):
+        self.alpha = 1 / window
+        self.prev_close = None
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+
+    def _step(self, close):
+        if self.prev_close is None:
+            return 0.0, 0.0
+        delta = close - self.prev_close
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        avg_gain = (1 - self.alpha) * self.avg_gain + self.alpha * gain
+        avg_loss = (1 - self.alpha) * self.avg_loss + self.alpha * loss
+        return avg_gain, avg_loss
+
+    @staticmethod
+    def _rsi(avg_gain, avg_loss):
+        if avg_loss == 0:
+            return 100.0 if avg_gain > 0 else np.nan
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+    def update(self, close):
+        """Commit a closed bar and return its RSI."""
+        self.avg_gain, self.avg_loss = self._step(close)
+        self.prev_close = close
+        return self._rsi(self.avg_gain, self.avg_loss)
+
+    def peek(self, close):
+        """RSI if the next bar closed at `close`, without changing the state."""
+        return self._rsi(*self._step(close))
+
+# ================================================
+# Bar Cache
+# ================================================
+class BarCache:
+    """
+    Cache of closed bars for one (symbol, timeframe) with incremental RSI.
+
+    The first update loads `num_bars` bars; later updates only fetch the last few bars and
+    commit those newer than the last closed bar. The most recent bar returned by the broker
+    is the forming one: it is kept aside and only used for the current RSI value.
+    """
+    def __init__(self, broker, symbol, timeframe, rsi_window, num_bars=1000, fetch_bars=10):
+        self.broker = broker
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.rsi_window = rsi_window
+        self.num_bars = num_bars
+        self.fetch_bars = fetch_bars
+        self.reset()
+
+    def reset(self):
+        self.bars = deque(maxlen=self.num_bars)
+        self.rsi_state = IncrementalRSI(self.rsi_window)
+        self.last_closed_time = None
+        self.forming = None
+
+    def _commit(self, rates):
+        for bar in rates:
+            rsi = self.rsi_state.update(float(bar['close']))
+            self.bars.append((int(bar['time']), float(bar['close']), rsi))
+            self.last_closed_time = int(bar['time'])
+
+    def update(self):
+        """
+        Fetch bars newer than the cache and commit the closed ones.
+
+        Returns:
+            int: number of newly closed bars, or None if the broker returned no data
+        """
+        if self.last_closed_time is None:
+            rates = self.broker.copy_rates_from_pos(self.symbol, self.timeframe, 0, self.num_bars)
+            if rates is None or len(rates) == 0:
+                return None
+            self._commit(rates[:-1])
+            self.forming = rates[-1]
+            return len(rates) - 1
+
+        rates = self.broker.copy_rates_from_pos(self.symbol, self.timeframe, 0, self.fetch_bars)
+        if rates is None or len(rates) == 0:
+            return None
+        # Gap larger than the fetch window: reload everything
+        if int(rates[0]['time']) > self.last_closed_time and len(rates) == self.fetch_bars:
+            self.reset()
+            return self.update()
+
+        new_rates = rates[rates['time'] > self.last_closed_time]
+        if len(new_rates) == 0:
+            return 0
+        self._commit(new_rates[:-1])
+        self.forming = new_rates[-1]
+        return len(new_rates) - 1
+
+    def current_rsi(self):
+        """RSI including the forming bar, as the last value of the full-history calculation."""
+        if self.forming is None:
+            return np.nan
+        return self.rsi_state.peek(float(self.forming['close']))
+
+    def to_dataframe(self):
+        df = pd.DataFrame(list(self.bars), columns=['time', 'close', 'RSI'])
+        df['time'] = pd.to_datetime(df['time'], unit='s')
+        return df
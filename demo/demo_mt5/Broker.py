@@ -0,0 +1,131 @@
+import numpy as np
+from collections import namedtuple
+
+Tick = namedtuple("Tick", ["time", "bid", "ask", "last"])
+OrderResult = namedtuple("OrderResult", ["retcode", "order", "price", "volume", "request"])
+
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')
+])
+
+# ================================================
+# Broker Interface
+# ================================================
+class BrokerError(Exception):
+    """
+    Error raised by a broker (connection, login, terminal failures)
+    """
+
+class Broker:
+    """
+    Interface used by TradeManager/BarCache instead of calling MetaTrader5 directly.
+    Method names and return types follow the MetaTrader5 package.
+    """
+    TIMEFRAME_M15 = 15
+    TIMEFRAME_H1 = 16385
+    TRADE_ACTION_DEAL = 1
+    ORDER_TYPE_BUY = 0
+    ORDER_TYPE_SELL = 1
+    ORDER_TIME_GTC = 0
+    ORDER_FILLING_FOK = 0
+    TRADE_RETCODE_DONE = 10009
+
+    def connect(self, login, password, server):
+        raise NotImplementedError
+
+    def shutdown(self):
+        raise NotImplementedError
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        raise NotImplementedError
+
+    def symbol_info_tick(self, symbol):
+        raise NotImplementedError
+
+    def positions_get(self, **kwargs):
+        raise NotImplementedError
+
+    def order_send(self, request):
+        raise NotImplementedError
+
+class MT5Broker(Broker):
+    """
+    Broker backed by the MetaTrader5 terminal
+    """
+    def __init__(self):
+        import MetaTrader5 as mt5
+        self.mt5 = mt5
+        for name in ("TIMEFRAME_M15", "TIMEFRAME_H1", "TRADE_ACTION_DEAL", "ORDER_TYPE_BUY", "ORDER_TYPE_SELL",
+                     "ORDER_TIME_GTC", "ORDER_FILLING_FOK", "TRADE_RETCODE_DONE"):
+            setattr(self, name, getattr(mt5, name))
+
+    def connect(self, login, password, server):
+        if not self.mt5.initialize():
+            raise BrokerError(f"MT5 initialization failed: {self.mt5.last_error()}")
+        if not self.mt5.login(login, password, server):
+            self.mt5.shutdown()
+            raise BrokerError(f"MT5 login failed: {self.mt5.last_error()}")
+
+    def shutdown(self):
+        self.mt5.shutdown()
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        return self.mt5.copy_rates_from_pos(symbol, timeframe, start_pos, count)
+
+    def symbol_info_tick(self, symbol):
+        return self.mt5.symbol_info_tick(symbol)
+
+    def positions_get(self, **kwargs):
+        return self.mt5.positions_get(**kwargs)
+
+    def order_send(self, request):
+        return self.mt5.order_send(request)
+
+class FakeBroker(Broker):
+    """
+    In-memory stand-in for the MT5 terminal, used to run the bot offline.
+    Bars are pushed with add_bar; the last bar of each series is the forming one.
+    """
+    def __init__(self):
+        self.rates = {}
+        self.orders = []
+        self.positions = []
+        self.calls = []
+
+    def connect(self, login, password, server):
+        pass
+
+    def shutdown(self):
+        pass
+
+    def add_bar(self, symbol, timeframe, time, open_, high, low, close, tick_volume=0):
+        """Append a bar, or replace the forming bar if it has the same time."""
+        bars = self.rates.setdefault((symbol, timeframe), [])
+        bar = (int(time), open_, high, low, close, tick_volume, 0, 0)
+        if bars and bars[-1][0] == bar[0]:
+            bars[-1] = bar
+        else:
+            bars.append(bar)
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        self.calls.append(("copy_rates_from_pos", symbol, timeframe, start_pos, count))
+        bars = self.rates.get((symbol, timeframe))
+        if not bars:
+            return None
+        end = len(bars) - start_pos
+        return np.array(bars[max(0, end - count):end], dtype=RATES_DTYPE)
+
+    def symbol_info_tick(self, symbol):
+        closes = [bars[-1] for (s, _), bars in self.rates.items() if s == symbol and bars]
+        if not closes:
+            return None
+        price = closes[0][4]
+        return Tick(closes[0][0], price, price, price)
+
+    def positions_get(self, **kwargs):
+        return tuple(p for p in self.positions if all(getattr(p, k) == v for k, v in kwargs.items()))
+
+    def order_send(self, request):
+        self.orders.append(request)
+        return OrderResult(self.TRADE_RETCODE_DONE, len(self.orders), request.get("price"), request.get("volume"), request)
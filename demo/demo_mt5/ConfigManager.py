@@ -1,4 +1,8 @@
+import copy
 import json
+import os
+import threading
+import time
 
 # ================================================
 # Core Classes
@@ -7,9 +11,22 @@ class ConfigManager:
     """
     Class for managing configuration
     Refactor step 3: Extract configuration management
+
+    Per-symbol state lives in memory behind a lock. Every update is appended and flushed to
+    a journal file before it returns, so an acknowledged update survives a process crash.
+    The background thread fsyncs the journal every sync_interval seconds (group commit, outside
+    the lock), so at most the last sync_interval seconds of updates can be lost on power failure,
+    and every flush_interval seconds compacts the journal into the JSON snapshot, written to a
+    temporary file and atomically renamed over the old one.
     """
-    def __init__(self, config_file="jpara.json"):
+    def __init__(self, config_file="jpara.json", flush_interval=5.0, compact_every=1000, fsync=True,
+                 sync_interval=0.2):
         self.config_file = config_file
+        self.journal_file = f"{config_file}.journal"
+        self.flush_interval = flush_interval
+        self.sync_interval = sync_interval
+        self.compact_every = compact_every
+        self.fsync = fsync
         self.default_config = {
             'buy_counter': 0,
             'sell_counter': 0,
@@ -30,24 +47,107 @@ class ConfigManager:
             'dca_buy_positive_count': 0,
             'dca_buy_negative_count': 0,
         }
+        self.lock = threading.RLock()
+        self.journal = None
+        self.journal_entries = 0
+        self.dirty = False
+        self.unsynced = False
+        self.last_compact = time.time()
         self.load_config()
 
+        self.stop_event = threading.Event()
+        self.flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self.flusher.start()
+
     def load_config(self):
-        try:
-            with open(self.config_file, "r") as f:
-                self.config = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            self.config = {}
+        """Load the snapshot, replay the journal on top of it, then compact."""
+        with self.lock:
+            try:
+                with open(self.config_file, "r") as f:
+                    self.config = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self.config = {}
 
-    def save_config(self):
-        with open(self.config_file, "w") as f:
+            replayed = 0
+            try:
+                with open(self.journal_file, "r") as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except json.JSONDecodeError:
+                            break  # Partially written last line: never acknowledged
+                        self.config.setdefault(entry['symbol'], copy.deepcopy(self.default_config)).update(entry['updates'])
+                        replayed += 1
+            except FileNotFoundError:
+                pass
+
+            if replayed:
+                print(f"Recovered {replayed} journaled updates from {self.journal_file}")
+            self.save_config()
+
+    def _write_snapshot(self):
+        tmp_file = f"{self.config_file}.tmp"
+        with open(tmp_file, "w") as f:
             json.dump(self.config, f, indent=4)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_file, self.config_file)
+
+    def save_config(self):
+        """Compact: write the full snapshot atomically and start an empty journal."""
+        with self.lock:
+            self._write_snapshot()
+            if self.journal is not None:
+                self.journal.close()
+            self.journal = open(self.journal_file, "w")
+            self.journal_entries = 0
+            self.dirty = False
+            self.unsynced = False
+            self.last_compact = time.time()
+
+    def _sync_journal(self):
+        """fsync the journal without holding the lock during the disk flush."""
+        with self.lock:
+            if not self.unsynced or not self.fsync:
+                return
+            fd = os.dup(self.journal.fileno())
+            self.unsynced = False
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _flush_loop(self):
+        while not self.stop_event.wait(self.sync_interval):
+            self._sync_journal()
+            with self.lock:
+                if self.dirty and time.time() - self.last_compact >= self.flush_interval:
+                    self.save_config()
 
     def get_symbol_config(self, symbol):
-        return self.config.get(symbol, self.default_config.copy())
+        with self.lock:
+            return copy.deepcopy(self.config.get(symbol, self.default_config))
 
     def update_symbol_config(self, symbol, updates):
-        current = self.get_symbol_config(symbol)
-        current.update(updates)
-        self.config[symbol] = current
-        self.save_config()
\ No newline at end of file
+        with self.lock:
+            current = self.config.get(symbol) or copy.deepcopy(self.default_config)
+            current.update(updates)
+            self.config[symbol] = current
+
+            self.journal.write(json.dumps({'symbol': symbol, 'updates': updates}) + "\n")
+            self.journal.flush()
+            self.journal_entries += 1
+            self.dirty = True
+            self.unsynced = True
+
+            if self.journal_entries >= self.compact_every:
+                self.save_config()
+
+    def close(self):
+        """Stop the background flusher and write a final snapshot."""
+        self.stop_event.set()
+        self.flusher.join()
+        self.save_config()
+        with self.lock:
+            self.journal.close()
@@ -0,0 +1,171 @@
+import bisect
+import threading
+import time
+import traceback
+import concurrent.futures
+
+# ================================================
+# Latency Histogram
+# ================================================
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram (seconds)
+    """
+    BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, float('inf')]
+
+    def __init__(self):
+        self.counts = [0] * len(self.BUCKETS)
+        self.total = 0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self.lock:
+            self.counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+            self.total += 1
+            self.max = max(self.max, seconds)
+
+    def percentile(self, q):
+        """Upper bound of the bucket containing the q-th percentile"""
+        with self.lock:
+            if self.total == 0:
+                return None
+            rank = q / 100 * self.total
+            seen = 0
+            for bound, count in zip(self.BUCKETS, self.counts):
+                seen += count
+                if seen >= rank:
+                    return min(bound, self.max)
+            return self.max
+
+    def summary(self):
+        if self.total == 0:
+            return "no samples"
+        return (f"n={self.total} p50<={self.percentile(50):.2f}s p95<={self.percentile(95):.2f}s "
+                f"p99<={self.percentile(99):.2f}s max={self.max:.2f}s")
+
+# ================================================
+# Symbol Runner
+# ================================================
+class SymbolRunner:
+    """
+    Runs one function per symbol on a persistent thread pool within a cycle budget.
+
+    Each symbol gets symbol_timeout seconds from the moment a worker actually starts it, and no
+    symbol may run past cycle_budget from the start of the cycle. A queued call that has not
+    started when the budget runs out is cancelled; a running call that misses its deadline is
+    reported as 'timeout' and the symbol is not resubmitted until it returns, so one stuck broker
+    call cannot pile up work or delay the other symbols.
+    """
+    def __init__(self, func, max_workers=None, symbol_timeout=60, cycle_budget=120):
+        """
+        Args:
+            func (callable): Function called with the symbol
+            max_workers (int): Number of worker threads
+            symbol_timeout (float): Per-symbol deadline in seconds, from when the call starts
+            cycle_budget (float): Deadline of a whole cycle in seconds
+        """
+        self.func = func
+        self.symbol_timeout = symbol_timeout
+        self.cycle_budget = cycle_budget
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="symbol")
+        self.in_flight = {}
+        self.started = {}
+        self.cycle = 0
+        self.symbol_latency = LatencyHistogram()
+        self.cycle_latency = LatencyHistogram()
+        self.last_results = []
+
+    @staticmethod
+    def _record(status, value=None, error=None, started=None, latency=None):
+        return {'status': status, 'value': value, 'error': error, 'started': started, 'latency': latency}
+
+    def _run(self, symbol):
+        start = time.time()
+        self.started[symbol] = start
+        try:
+            return self._record('ok', value=self.func(symbol), started=start, latency=time.time() - start)
+        except Exception as e:
+            return self._record('error', error=f"{e}\n{traceback.format_exc()}", started=start,
+                                latency=time.time() - start)
+        finally:
+            self.symbol_latency.observe(time.time() - start)
+
+    def _deadline(self, symbol, cycle_deadline):
+        started = self.started.get(symbol)
+        if started is None:
+            return cycle_deadline
+        return min(started + self.symbol_timeout, cycle_deadline)
+
+    def run_cycle(self, symbols):
+        """
+        Process all symbols and return one result record per symbol.
+
+        Returns:
+            list: dicts with symbol, cycle, status ('ok', 'error', 'timeout', 'skipped'),
+                  value (the function's return value), error, started and latency
+        """
+        self.cycle += 1
+        cycle_start = time.time()
+        cycle_deadline = cycle_start + self.cycle_budget
+        results = {}
+        pending = {}
+
+        for symbol in symbols:
+            previous = self.in_flight.get(symbol)
+            if previous is not None and not previous.done():
+                results[symbol] = self._record('skipped', error="previous call still running",
+                                               started=self.started.get(symbol))
+                continue
+            self.started.pop(symbol, None)
+            pending[symbol] = self.executor.submit(self._run, symbol)
+            self.in_flight[symbol] = pending[symbol]
+
+        while pending:
+            now = time.time()
+            for symbol, future in list(pending.items()):
+                if future.done():
+                    results[symbol] = future.result()
+                    del pending[symbol]
+                elif now >= self._deadline(symbol, cycle_deadline):
+                    del pending[symbol]
+                    if future.cancel():
+                        # Never started: drop it so the symbol is submitted fresh next cycle
+                        self.in_flight.pop(symbol, None)
+                        results[symbol] = self._record('timeout', error="not started within the cycle budget")
+                    else:
+                        started = self.started.get(symbol)
+                        results[symbol] = self._record(
+                            'timeout', error=f"no result after {now - started:.1f}s", started=started,
+                            latency=now - started)
+            if not pending:
+                break
+            next_deadline = min(self._deadline(symbol, cycle_deadline) for symbol in pending)
+            concurrent.futures.wait(pending.values(), timeout=max(0.0, min(next_deadline - time.time(), 1.0)),
+                                    return_when=concurrent.futures.FIRST_COMPLETED)
+
+        cycle_time = time.time() - cycle_start
+        self.cycle_latency.observe(cycle_time)
+
+        records = []
+        for symbol in symbols:
+            record = {'symbol': symbol, 'cycle': self.cycle, **results[symbol]}
+            records.append(record)
+            if record['status'] != 'ok':
+                print(f"[{record['status']}] {symbol}: {record['error']}")
+
+        counts = {}
+        for record in records:
+            counts[record['status']] = counts.get(record['status'], 0) + 1
+        print(f"Cycle {self.cycle}: {cycle_time:.2f}s {counts} | symbol latency {self.symbol_latency.summary()} "
+              f"| cycle latency {self.cycle_latency.summary()}")
+
+        self.last_results = records
+        return records
+
+    def latency_summary(self):
+        """Latency histograms of symbol calls and of whole cycles"""
+        return {'symbol': self.symbol_latency.summary(), 'cycle': self.cycle_latency.summary()}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
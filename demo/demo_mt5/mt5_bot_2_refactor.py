@@ -12,14 +12,13 @@ REFACTOR STEPS:
 10. Ensure proper connection management
 """
 
-import MetaTrader5 as mt5
-import pandas as pd
-from datetime import datetime
 import time
-import concurrent.futures
-import json
 import schedule
 from functools import wraps
+from Broker import Broker, BrokerError, MT5Broker
+from ConfigManager import ConfigManager
+from SymbolRunner import SymbolRunner
+from BarCache import BarCache
 
 # ================================================
 # Configuration and Constants
@@ -31,11 +30,13 @@ SYMBOL_LIST = ['EURUSD', 'USDCHF', 'USDCAD', 'AUDUSD', 'EURJPY', 'EURGBP',
               'EURCHF', 'GBPCHF', 'GBPCAD', 'GBPAUD', 'GBPNZD', 'XAUUSD', 
               'Brent', 'Crude']
 TIMEFRAMES = {
-    'M15': mt5.TIMEFRAME_M15,
-    'H1': mt5.TIMEFRAME_H1
+    'M15': Broker.TIMEFRAME_M15,
+    'H1': Broker.TIMEFRAME_H1
 }
 BASE_VOLUME = 0.01
 RSI_WINDOW = 3
+SYMBOL_TIMEOUT = 60   # seconds
+CYCLE_BUDGET = 120    # seconds
 
 # ================================================
 # Utility Functions and Decorators
@@ -49,8 +50,8 @@ def handle_errors(func):
     def wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
-        except mt5.MT5Error as e:
-            print(f"MT5 Error in {func.__name__}: {e}")
+        except BrokerError as e:
+            print(f"Broker error in {func.__name__}: {e}")
             return None
         except Exception as e:
             print(f"Unexpected error in {func.__name__}: {e}")
@@ -60,119 +61,52 @@ def handle_errors(func):
 # ================================================
 # Core Classes
 # ================================================
-class ConfigManager:
-    """
-    Class for managing configuration
-    Refactor step 3: Extract configuration management
-    """
-    def __init__(self, config_file="jpara.json"):
-        self.config_file = config_file
-        self.default_config = {
-            'buy_counter': 0,
-            'sell_counter': 0,
-            'buy_price': 0,
-            'sell_price': 10000,
-            'last_sell_positive': 0,
-            'last_buy_positive': 0,
-            'last_sell_negative': 0,
-            'last_buy_negative': 0,
-            'dca_buy_positive_tickets': [],
-            'dca_buy_negative_tickets': [],
-            'dca_sell_positive_tickets': [],
-            'dca_sell_negative_tickets': [],
-            'sell_ticket': 0,
-            'buy_ticket': 0,
-            'dca_sell_positive_count': 0,
-            'dca_sell_negative_count': 0,
-            'dca_buy_positive_count': 0,
-            'dca_buy_negative_count': 0,
-        }
-        self.load_config()
-
-    def load_config(self):
-        try:
-            with open(self.config_file, "r") as f:
-                self.config = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            self.config = {}
-
-    def save_config(self):
-        with open(self.config_file, "w") as f:
-            json.dump(self.config, f, indent=4)
-
-    def get_symbol_config(self, symbol):
-        return self.config.get(symbol, self.default_config.copy())
-
-    def update_symbol_config(self, symbol, updates):
-        current = self.get_symbol_config(symbol)
-        current.update(updates)
-        self.config[symbol] = current
-        self.save_config()
-
 class TradeManager:
     """
     Class for managing trading operations
     Refactor step 4: Extract trading logic
     """
-    def __init__(self, config_manager):
+    def __init__(self, config_manager, broker):
         self.config = config_manager
-        self.rsi_window = RSI_WINDOW
+        self.broker = broker
         self.base_volume = BASE_VOLUME
 
-    @handle_errors
-    def get_historical_data(self, symbol, timeframe, num_bars=1000):
-        rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, num_bars)
-        if rates is None:
-            return None
-        df = pd.DataFrame(rates)
-        df['time'] = pd.to_datetime(df['time'], unit='s')
-        return df
-
-    def calculate_rsi(self, df):
-        delta = df['close'].diff()
-        gain = delta.where(delta > 0, 0)
-        loss = -delta.where(delta < 0, 0)
-        
-        avg_gain = gain.ewm(alpha=1/self.rsi_window, adjust=False).mean()
-        avg_loss = loss.ewm(alpha=1/self.rsi_window, adjust=False).mean()
-        
-        rs = avg_gain / avg_loss
-        return 100 - (100 / (1 + rs))
-
     @handle_errors
     def execute_order(self, symbol, order_type, volume=None):
         volume = volume or self.base_volume
-        tick = mt5.symbol_info_tick(symbol)
+        broker = self.broker
+        tick = broker.symbol_info_tick(symbol)
         price = tick.ask if order_type == 'buy' else tick.bid
         
         request = {
-            'action': mt5.TRADE_ACTION_DEAL,
+            'action': broker.TRADE_ACTION_DEAL,
             'symbol': symbol,
             'volume': volume,
-            'type': mt5.ORDER_TYPE_BUY if order_type == 'buy' else mt5.ORDER_TYPE_SELL,
+            'type': broker.ORDER_TYPE_BUY if order_type == 'buy' else broker.ORDER_TYPE_SELL,
             'price': price,
             'deviation': 10,
             'magic': 100,
             'comment': 'Python automated order',
-            'type_time': mt5.ORDER_TIME_GTC,
-            'type_filling': mt5.ORDER_FILLING_FOK,
+            'type_time': broker.ORDER_TIME_GTC,
+            'type_filling': broker.ORDER_FILLING_FOK,
         }
-        return mt5.order_send(request)
+        return broker.order_send(request)
 
     @handle_errors
     def close_position(self, ticket):
-        position = mt5.positions_get(ticket=ticket)
+        broker = self.broker
+        position = broker.positions_get(ticket=ticket)
         if not position:
             return None
             
         position = position[0]
         symbol = position.symbol
         volume = position.volume
-        order_type = mt5.ORDER_TYPE_SELL if position.type == mt5.ORDER_TYPE_BUY else mt5.ORDER_TYPE_BUY
-        price = mt5.symbol_info_tick(symbol).bid if position.type == mt5.ORDER_TYPE_BUY else mt5.symbol_info_tick(symbol).ask
+        order_type = broker.ORDER_TYPE_SELL if position.type == broker.ORDER_TYPE_BUY else broker.ORDER_TYPE_BUY
+        price = broker.symbol_info_tick(symbol).bid if position.type == broker.ORDER_TYPE_BUY else broker.symbol_info_tick(symbol).ask
         
         request = {
-            "action": mt5.TRADE_ACTION_DEAL,
+            "action": broker.TRADE_ACTION_DEAL,
             "symbol": symbol,
             "volume": volume,
             "type": order_type,
@@ -181,10 +115,10 @@ class TradeManager:
             "deviation": 20,
             "magic": 123456,
             "comment": f"Close position {ticket}",
-            "type_time": mt5.ORDER_TIME_GTC,
-            "type_filling": mt5.ORDER_FILLING_FOK,
+            "type_time": broker.ORDER_TIME_GTC,
+            "type_filling": broker.ORDER_FILLING_FOK,
         }
-        return mt5.order_send(request)
+        return broker.order_send(request)
 
 # ================================================
 # Main Trading Bot
@@ -194,18 +128,24 @@ class TradingBot:
     Main trading bot class
     Refactor step 5: Create main class for overall management
     """
-    def __init__(self):
+    def __init__(self, broker=None):
+        self.broker = broker or MT5Broker()
         self.config_manager = ConfigManager()
-        self.trade_manager = TradeManager(self.config_manager)
+        self.trade_manager = TradeManager(self.config_manager, self.broker)
+        # Refactor step 6: one incremental bar cache per (symbol, timeframe)
+        self.bar_caches = {
+            (symbol, name): BarCache(self.broker, symbol, timeframe, RSI_WINDOW)
+            for symbol in SYMBOL_LIST
+            for name, timeframe in TIMEFRAMES.items()
+        }
+        # Refactor step 7: persistent worker pool with per-symbol deadlines
+        self.runner = SymbolRunner(self.process_symbol, max_workers=len(SYMBOL_LIST),
+                                   symbol_timeout=SYMBOL_TIMEOUT, cycle_budget=CYCLE_BUDGET)
         self.setup_schedule()
 
     @handle_errors
     def init_mt5(self):
-        if not mt5.initialize():
-            raise mt5.MT5Error("MT5 initialization failed")
-        if not mt5.login(LOGIN, PASSWORD, SERVER):
-            mt5.shutdown()
-            raise mt5.MT5Error("MT5 login failed")
+        self.broker.connect(LOGIN, PASSWORD, SERVER)
         print("MT5 connection established")
 
     def setup_schedule(self):
@@ -214,30 +154,25 @@ class TradingBot:
             schedule.every().hour.at(t).do(self.trade_all_symbols)
 
     def trade_all_symbols(self):
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            executor.map(self.process_symbol, SYMBOL_LIST)
+        return self.runner.run_cycle(SYMBOL_LIST)
 
-    @handle_errors
     def process_symbol(self, symbol):
         print(f"Processing {symbol}...")
         
-        # Get market data
-        m15_data = self.trade_manager.get_historical_data(symbol, TIMEFRAMES['M15'])
-        h1_data = self.trade_manager.get_historical_data(symbol, TIMEFRAMES['H1'])
+        # Fetch only bars newer than the cache and update RSI incrementally
+        m15_cache = self.bar_caches[(symbol, 'M15')]
+        h1_cache = self.bar_caches[(symbol, 'H1')]
         
-        if m15_data is None or h1_data is None:
+        if m15_cache.update() is None or h1_cache.update() is None:
             return
             
-        # Calculate RSI values
-        m15_data['RSI'] = self.trade_manager.calculate_rsi(m15_data)
-        h1_data['RSI'] = self.trade_manager.calculate_rsi(h1_data)
-        
-        current_rsi_m15 = m15_data['RSI'].iloc[-1]
-        current_rsi_h1 = h1_data['RSI'].iloc[-1]
+        current_rsi_m15 = m15_cache.current_rsi()
+        current_rsi_h1 = h1_cache.current_rsi()
         
         # Main trading logic
         self.check_entry_conditions(symbol, current_rsi_m15)
         self.manage_existing_positions(symbol, current_rsi_m15, current_rsi_h1)
+        return {'rsi_m15': current_rsi_m15, 'rsi_h1': current_rsi_h1}
 
     def check_entry_conditions(self, symbol, rsi_m15):
         config = self.config_manager.get_symbol_config(symbol)
@@ -268,14 +203,14 @@ class TradingBot:
 
     def manage_existing_positions(self, symbol, rsi_m15, rsi_h1):
         config = self.config_manager.get_symbol_config(symbol)
-        positions = mt5.positions_get(symbol=symbol)
+        positions = self.broker.positions_get(symbol=symbol)
         
         # Manage DCA and exit conditions
         self.manage_dca(symbol, config, positions, rsi_m15)
         self.check_exit_conditions(symbol, config, positions, rsi_m15, rsi_h1)
 
     def manage_dca(self, symbol, config, positions, rsi_m15):
-        current_price = mt5.symbol_info_tick(symbol).ask
+        current_price = self.broker.symbol_info_tick(symbol).ask
         
         # Manage sell DCA
         if config['sell_counter'] > 0:
@@ -294,7 +229,9 @@ class TradingBot:
         except KeyboardInterrupt:
             print("Shutting down...")
         finally:
-            mt5.shutdown()
+            self.runner.shutdown()
+            self.config_manager.close()
+            self.broker.shutdown()
             print("MT5 connection closed")
 
 # ================================================
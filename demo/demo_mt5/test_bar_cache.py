@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+import schedule
+
+from Broker import Broker, FakeBroker
+from BarCache import BarCache
+
+M15 = Broker.TIMEFRAME_M15
+H1 = Broker.TIMEFRAME_H1
+
+def add_bars(broker, symbol, timeframe, closes, start=0, step=900):
+    for i, close in enumerate(closes):
+        t = (start + i) * step
+        broker.add_bar(symbol, timeframe, t, close, close, close, close)
+
+def pandas_rsi(closes, window):
+    """Full-history RSI as computed before the incremental cache"""
+    delta = pd.Series(closes).diff()
+    gain = delta.where(delta > 0, 0)
+    loss = -delta.where(delta < 0, 0)
+    avg_gain = gain.ewm(alpha=1 / window, adjust=False).mean()
+    avg_loss = loss.ewm(alpha=1 / window, adjust=False).mean()
+    return (100 - (100 / (1 + avg_gain / avg_loss))).to_numpy()
+
+def test_update_only_commits_bars_newer_than_cache():
+    broker = FakeBroker()
+    add_bars(broker, "EURUSD", M15, np.linspace(1.0, 1.1, 50))
+    cache = BarCache(broker, "EURUSD", M15, rsi_window=3, num_bars=1000, fetch_bars=10)
+
+    assert cache.update() == 49
+    assert broker.calls[-1][-1] == 1000
+    assert cache.last_closed_time == 48 * 900
+
+    # Nothing new: the small fetch window is requested and nothing is committed
+    assert cache.update() == 0
+    assert broker.calls[-1][-1] == 10
+    assert len(cache.bars) == 49
+
+    # The forming bar closes and two more bars arrive
+    add_bars(broker, "EURUSD", M15, [1.2, 1.15, 1.18], start=49)
+    assert cache.update() == 2
+    assert broker.calls[-1][-1] == 10
+    times = [bar[0] for bar in cache.bars]
+    assert times == [i * 900 for i in range(51)]
+    assert cache.forming['time'] == 51 * 900
+
+def test_incremental_rsi_matches_pandas():
+    rng = np.random.default_rng(0)
+    closes = list(100 + np.cumsum(rng.normal(0, 1, 300)))
+    broker = FakeBroker()
+    add_bars(broker, "EURUSD", M15, closes[:200])
+    cache = BarCache(broker, "EURUSD", M15, rsi_window=3, fetch_bars=10)
+    cache.update()
+
+    for i in range(200, 300):
+        add_bars(broker, "EURUSD", M15, [closes[i]], start=i)
+        cache.update()
+        expected = pandas_rsi(closes[:i + 1], 3)
+        assert cache.current_rsi() == pytest.approx(expected[-1])
+
+    expected = pandas_rsi(closes[:299], 3)
+    np.testing.assert_allclose(cache.to_dataframe()['RSI'].to_numpy(), expected, equal_nan=True)
+
+def test_process_symbol_sends_order(tmp_path, monkeypatch):
+    from mt5_bot_2_refactor import TradingBot
+
+    monkeypatch.chdir(tmp_path)
+    # Exit and DCA handlers are not part of this refactor step
+    for name in ("check_exit_conditions", "manage_sell_dca", "manage_buy_dca"):
+        monkeypatch.setattr(TradingBot, name, lambda *args: None, raising=False)
+
+    broker = FakeBroker()
+    # Steadily rising closes push the M15 RSI to 100, which triggers a sell entry
+    add_bars(broker, "EURUSD", M15, np.linspace(1.0, 1.2, 60))
+    add_bars(broker, "EURUSD", H1, np.linspace(1.0, 1.2, 60), step=3600)
+
+    bot = TradingBot(broker=broker)
+    try:
+        result = bot.process_symbol("EURUSD")
+        assert result['rsi_m15'] >= 95
+        assert len(broker.orders) == 1
+        assert broker.orders[0]['type'] == broker.ORDER_TYPE_SELL
+        assert broker.orders[0]['symbol'] == "EURUSD"
+        assert bot.config_manager.get_symbol_config("EURUSD")['sell_counter'] == 1
+
+        # Next cycle without new bars: no new order, only the short fetch window
+        bot.process_symbol("EURUSD")
+        assert len(broker.orders) == 1
+        assert broker.calls[-1][-1] == bot.bar_caches[("EURUSD", "H1")].fetch_bars
+    finally:
+        bot.runner.shutdown()
+        bot.config_manager.close()
+        schedule.clear()
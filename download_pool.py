@@ -0,0 +1,179 @@
+import time
+import multiprocessing
+import multiprocessing.connection
+from collections import deque
+
+# ---------------------------------------------------------------------------
+# WORKER (process con sống suốt phiên chạy)
+# ---------------------------------------------------------------------------
+def _worker_main(conn):
+    """Nhận (task_id, func, args) qua pipe, chạy và gửi lại (task_id, ok, result, error, elapsed)."""
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+        task_id, func, args = task
+        start = time.time()
+        try:
+            message = (task_id, True, func(*args), None, time.time() - start)
+        except Exception as e:
+            message = (task_id, False, None, f"{type(e).__name__}: {e}", time.time() - start)
+        try:
+            conn.send(message)
+        except Exception as e:
+            # Kết quả không pickle được
+            conn.send((task_id, False, None, f"{type(e).__name__}: {e}", time.time() - start))
+
+# ---------------------------------------------------------------------------
+# POOL
+# ---------------------------------------------------------------------------
+class DownloadWorkerPool:
+    """
+    Pool process dài hạn cho các tác vụ tải dữ liệu: mỗi worker chỉ import thư viện và khởi tạo
+    BinanceDataDumper một lần rồi xử lý nhiều ticker liên tiếp, thay vì một process mới cho mỗi ticker.
+
+    - timeout: tác vụ chạy quá `timeout` giây thì worker bị terminate và thay bằng worker mới;
+    - retries: tác vụ lỗi hoặc quá thời gian được chạy lại tối đa `retries` lần, sau `backoff * lần thử` giây;
+    - results(): trả về kết quả từng tác vụ ngay khi xong (status 'ok' / 'error' / 'timeout'); worker rảnh
+      được giao tác vụ mới trước mỗi lần yield nên việc xử lý kết quả ở process chính không làm pool đứng.
+
+    Worker không phải daemon vì dump_data tự tạo process con.
+    """
+    def __init__(self, n_workers=4, timeout=90, retries=1, backoff=5.0, poll_interval=0.5, context=None):
+        self.n_workers = n_workers
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.poll_interval = poll_interval
+        self.ctx = multiprocessing.get_context(context)
+        self._workers = [self._spawn() for _ in range(n_workers)]
+        self._tasks = {}
+        self._pending = deque()
+        self._delayed = []
+        self._next_id = 0
+
+    def _spawn(self):
+        parent_conn, child_conn = self.ctx.Pipe()
+        process = self.ctx.Process(target=_worker_main, args=(child_conn,))
+        process.start()
+        child_conn.close()
+        return {'process': process, 'conn': parent_conn, 'task': None, 'started': None}
+
+    def _replace(self, index):
+        worker = self._workers[index]
+        if worker['process'].is_alive():
+            worker['process'].terminate()
+        worker['process'].join()
+        worker['conn'].close()
+        self._workers[index] = self._spawn()
+
+    def submit(self, func, *args, key=None):
+        """Thêm tác vụ func(*args); key dùng để nhận diện kết quả (mặc định là args[0])."""
+        task_id = self._next_id
+        self._next_id += 1
+        self._tasks[task_id] = {
+            'id': task_id, 'key': key if key is not None else (args[0] if args else task_id),
+            'func': func, 'args': args, 'attempts': 0, 'started_at': None,
+        }
+        self._pending.append(task_id)
+        return task_id
+
+    def _dispatch(self):
+        now = time.monotonic()
+        ready = [item for item in self._delayed if item[0] <= now]
+        self._delayed = [item for item in self._delayed if item[0] > now]
+        self._pending.extend(task_id for _, task_id in sorted(ready))
+
+        for worker in self._workers:
+            if not self._pending:
+                break
+            if worker['task'] is not None:
+                continue
+            task = self._tasks[self._pending.popleft()]
+            task['attempts'] += 1
+            if task['started_at'] is None:
+                task['started_at'] = time.time()
+            worker['conn'].send((task['id'], task['func'], task['args']))
+            worker['task'] = task['id']
+            worker['started'] = time.monotonic()
+
+    def _finish(self, task_id, status, result=None, error=None):
+        """Lên lịch chạy lại nếu còn lượt, ngược lại trả về dict kết quả cuối cùng."""
+        task = self._tasks[task_id]
+        if status != 'ok' and task['attempts'] <= self.retries:
+            delay = self.backoff * task['attempts']
+            print(f"↻ {task['key']}: {error}, thử lại sau {delay:.0f}s (lần {task['attempts'] + 1}/{self.retries + 1})")
+            self._delayed.append((time.monotonic() + delay, task_id))
+            return None
+        del self._tasks[task_id]
+        return {
+            'key': task['key'], 'args': task['args'], 'status': status, 'result': result, 'error': error,
+            'attempts': task['attempts'], 'elapsed': time.time() - task['started_at'],
+        }
+
+    def results(self):
+        """Generator: kết quả các tác vụ đã submit theo thứ tự hoàn thành, đến khi hết tác vụ."""
+        while self._tasks:
+            self._dispatch()
+            busy = {worker['conn']: index for index, worker in enumerate(self._workers) if worker['task'] is not None}
+            if busy:
+                ready = multiprocessing.connection.wait(list(busy), timeout=self.poll_interval)
+            else:
+                time.sleep(self.poll_interval)
+                ready = []
+
+            for conn, index in busy.items():
+                worker = self._workers[index]
+                task_id = worker['task']
+                # poll(): kết quả có thể đã đến trong lúc bên gọi xử lý kết quả trước đó
+                if conn in ready or conn.poll():
+                    try:
+                        _, ok, result, error, _ = conn.recv()
+                    except (EOFError, OSError):
+                        self._replace(index)
+                        outcome = self._finish(task_id, 'error', error="worker dừng đột ngột")
+                    else:
+                        worker['task'] = None
+                        outcome = self._finish(task_id, 'ok' if ok else 'error', result, error)
+                elif time.monotonic() - worker['started'] > self.timeout:
+                    self._replace(index)
+                    outcome = self._finish(task_id, 'timeout', error=f"vượt quá {self.timeout} giây")
+                elif not worker['process'].is_alive():
+                    self._replace(index)
+                    outcome = self._finish(task_id, 'error', error="worker dừng đột ngột")
+                else:
+                    continue
+                if outcome is not None:
+                    # Giao việc cho worker vừa rảnh trước khi trả quyền cho bên gọi (có thể xử lý lâu)
+                    self._dispatch()
+                    yield outcome
+
+    def map(self, func, items):
+        """Chạy func(item) cho mọi item, trả về dict item -> dict kết quả."""
+        for item in items:
+            self.submit(func, item, key=item)
+        return {outcome['key']: outcome for outcome in self.results()}
+
+    def close(self):
+        for worker in self._workers:
+            if worker['task'] is None:
+                try:
+                    worker['conn'].send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+        for worker in self._workers:
+            worker['process'].join(timeout=5)
+            if worker['process'].is_alive():
+                worker['process'].terminate()
+                worker['process'].join()
+            worker['conn'].close()
+        self._workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,148 @@
+import os
+import urllib.request
+import numpy as np
+import pandas as pd
+import polars as pl
+
+FAMA_FRENCH_URL = "https://mba.tuck.dartmouth.edu/pages/faculty/ken.french/ftp/F-F_Research_Data_5_Factors_2x3_daily_CSV.zip"
+FACTOR_COLUMNS = ["Mkt-RF", "SMB", "HML", "RMW", "CMA", "RF"]
+
+# ---------------------------------------------------------------------------
+# DỮ LIỆU FAMA-FRENCH (CACHE CỤC BỘ)
+# ---------------------------------------------------------------------------
+def load_factors(url=FAMA_FRENCH_URL, cache_dir="./factor_cache", refresh=False):
+    """
+    Đọc file nhân tố Fama-French: file zip chỉ tải một lần, bảng đã parse được lưu parquet.
+    refresh=True để tải lại (ví dụ khi cần dữ liệu mới hơn).
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    name = os.path.splitext(os.path.basename(url))[0]
+    zip_path = os.path.join(cache_dir, f"{name}.zip")
+    parquet_path = os.path.join(cache_dir, f"{name}.parquet")
+
+    if not refresh and os.path.exists(parquet_path):
+        return pl.read_parquet(parquet_path)
+
+    if refresh or not os.path.exists(zip_path):
+        print(f"Tải {url}")
+        urllib.request.urlretrieve(url, f"{zip_path}.tmp")
+        os.replace(f"{zip_path}.tmp", zip_path)
+
+    factors = pd.read_csv(zip_path, compression='zip', skiprows=3, header=0)
+    factors.rename(columns={factors.columns[0]: "Date"}, inplace=True)
+    factors["Date"] = pd.to_datetime(factors["Date"], format="%Y%m%d", errors="coerce")
+    factors = factors.dropna(subset=["Date"])
+
+    factors = pl.DataFrame(factors).with_columns([
+        pl.col(column).cast(pl.Float64) for column in FACTOR_COLUMNS
+    ])
+    factors.write_parquet(parquet_path)
+    return factors
+
+# ---------------------------------------------------------------------------
+# OLS THEO NHÓM
+# ---------------------------------------------------------------------------
+def grouped_ols(X, y, groups):
+    """
+    OLS cho từng nhóm trong một lượt: X'X và X'y của mọi nhóm được cộng theo đoạn (reduceat)
+    rồi giải đồng thời bằng np.linalg.solve trên mảng (G, k, k).
+
+    Args:
+        X (ndarray): (n, k), đã có cột hằng số nếu cần
+        y (ndarray): (n,)
+        groups (ndarray): (n,) nhãn nhóm
+
+    Returns:
+        dict: groups, n, beta (G, k), se (G, k), r2 (G,)
+    """
+    order = np.argsort(groups, kind="stable")
+    X, y, groups = X[order], y[order], groups[order]
+    labels, starts, counts = np.unique(groups, return_index=True, return_counts=True)
+
+    XtX = np.add.reduceat(X[:, :, None] * X[:, None, :], starts, axis=0)
+    Xty = np.add.reduceat(X * y[:, None], starts, axis=0)
+    yty = np.add.reduceat(y * y, starts)
+    ysum = np.add.reduceat(y, starts)
+
+    k = X.shape[1]
+    beta = np.full((len(labels), k), np.nan)
+    se = np.full((len(labels), k), np.nan)
+    r2 = np.full(len(labels), np.nan)
+
+    # Nhóm quá ít quan sát hoặc X'X suy biến thì bỏ qua
+    ok = (counts > k) & (np.linalg.matrix_rank(XtX) == k)
+    if ok.any():
+        XtX_inv = np.linalg.inv(XtX[ok])
+        b = np.einsum("gij,gj->gi", XtX_inv, Xty[ok])
+        sse = yty[ok] - np.einsum("gi,gi->g", b, Xty[ok])
+        sst = yty[ok] - ysum[ok] ** 2 / counts[ok]
+        sigma2 = sse / (counts[ok] - k)
+        beta[ok] = b
+        se[ok] = np.sqrt(np.maximum(np.einsum("gii->gi", XtX_inv), 0) * sigma2[:, None])
+        r2[ok] = 1 - sse / sst
+
+    return {'groups': labels, 'n': counts, 'beta': beta, 'se': se, 'r2': r2}
+
+def rolling_ols(X, y, window):
+    """
+    Hệ số OLS trên cửa sổ trượt `window` dòng: tổng X'X, X'y của mỗi cửa sổ lấy từ hiệu của
+    tổng tích lũy (O(1) cho mỗi bước, không lặp lại trên cửa sổ).
+
+    Returns:
+        ndarray: (n, k), NaN cho các dòng chưa đủ cửa sổ
+    """
+    n, k = X.shape
+    betas = np.full((n, k), np.nan)
+    if n < window:
+        return betas
+    XtX = np.cumsum(X[:, :, None] * X[:, None, :], axis=0)
+    Xty = np.cumsum(X * y[:, None], axis=0)
+    XtX_window = XtX[window - 1:].copy()
+    Xty_window = Xty[window - 1:].copy()
+    XtX_window[1:] -= XtX[:-window]
+    Xty_window[1:] -= Xty[:-window]
+    betas[window - 1:] = np.linalg.solve(XtX_window, Xty_window[..., None])[..., 0]
+    return betas
+
+# ---------------------------------------------------------------------------
+# HỒI QUY THEO (CỔ PHIẾU, TRẠNG THÁI)
+# ---------------------------------------------------------------------------
+def regime_factor_regressions(state_data, factors, factor_columns=("Mkt-RF", "SMB", "HML"),
+                              return_column="Log_Returns", state_column="State"):
+    """
+    Hồi quy Fama-French cho mọi cặp (cổ phiếu, trạng thái HMM) trong một lần giải.
+
+    Args:
+        state_data (dict): cổ phiếu -> DataFrame polars có Date, return_column, state_column
+        factors (pl.DataFrame): bảng nhân tố (Date + factor_columns)
+
+    Returns:
+        pl.DataFrame: stock, state, n, r2 và hệ số/sai số chuẩn/t-stat cho const và từng nhân tố
+    """
+    factor_columns = list(factor_columns)
+    stocks = list(state_data)
+    merged = pl.concat([
+        df.select("Date", return_column, state_column)
+        .join(factors.select(["Date"] + factor_columns), on="Date")
+        .with_columns(pl.lit(i, dtype=pl.Int64).alias("_stock"))
+        for i, df in enumerate(state_data.values())
+    ]).drop_nulls()
+
+    n_states = int(merged[state_column].max()) + 1
+    groups = merged["_stock"].to_numpy() * n_states + merged[state_column].to_numpy()
+    X = np.column_stack([np.ones(merged.height), merged.select(factor_columns).to_numpy()])
+    y = merged[return_column].to_numpy()
+
+    result = grouped_ols(X, y, groups)
+    names = ["const"] + factor_columns
+    columns = {
+        "stock": [stocks[g // n_states] for g in result['groups']],
+        "state": (result['groups'] % n_states).tolist(),
+        "n": result['n'],
+        "r2": result['r2'],
+    }
+    for j, name in enumerate(names):
+        columns[f"beta_{name}"] = result['beta'][:, j]
+        columns[f"se_{name}"] = result['se'][:, j]
+        columns[f"t_{name}"] = result['beta'][:, j] / result['se'][:, j]
+    return pl.DataFrame(columns)
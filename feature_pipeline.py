@@ -0,0 +1,147 @@
+import os
+import json
+import hashlib
+import numpy as np
+import polars as pl
+import talib as ta
+
+FEATURES = ["RSI", "MACD", "Signal_Line", "Volume", "Volume MA"]
+TARGET = "Market_Trend"
+
+# ---------------------------------------------------------------------------
+# TÍNH CHỈ BÁO
+# ---------------------------------------------------------------------------
+def compute_features(df, price_column="Adj Close", volume_column="Volume"):
+    """
+    Tính toàn bộ chỉ báo trên một DataFrame polars; mỗi họ chỉ báo chỉ gọi một lần
+    (MACD trả về cả macd/signal/hist) và tất cả cột được thêm trong một with_columns.
+    Các dòng đầu (chưa đủ dữ liệu cho chỉ báo) và dòng cuối (chưa biết Market_Trend) có giá trị null.
+    """
+    close = df[price_column].to_numpy().astype(float)
+    volume = df[volume_column].to_numpy().astype(float)
+    macd, signal, hist = ta.MACD(close, fastperiod=12, slowperiod=26, signalperiod=9)
+
+    return df.with_columns([
+        pl.Series("RSI", ta.RSI(close, timeperiod=14)),
+        pl.Series("MACD", macd),
+        pl.Series("Signal_Line", signal),
+        pl.Series("MACD_Hist", hist),
+        pl.Series("Volume MA", ta.SMA(volume, timeperiod=20)),
+        (pl.col(price_column).shift(-1) > pl.col(price_column)).cast(pl.Int64).alias(TARGET),
+    ]).fill_nan(None)
+
+def data_version(df, columns):
+    """Hash nội dung các cột đầu vào: đổi dữ liệu (không chỉ thêm dòng) là đổi version."""
+    digest = hashlib.sha1()
+    for column in columns:
+        digest.update(np.ascontiguousarray(df[column].to_physical().to_numpy()).tobytes())
+    return digest.hexdigest()
+
+# ---------------------------------------------------------------------------
+# WALK-FORWARD
+# ---------------------------------------------------------------------------
+def walk_forward_splits(n, n_splits=5, test_size=None, min_train=None, expanding=True, gap=1):
+    """
+    Chia theo thời gian (không xáo trộn): mỗi fold train trên quá khứ và test trên đoạn ngay sau đó.
+
+    Args:
+        n (int): số dòng
+        test_size (int): số dòng mỗi fold test (mặc định chia đều phần sau min_train)
+        min_train (int): số dòng train của fold đầu (mặc định n // (n_splits + 1))
+        expanding (bool): True = cửa sổ train mở rộng, False = cửa sổ trượt dài min_train
+        gap (int): số dòng bỏ giữa train và test; mặc định 1 vì target là hướng nến kế tiếp
+            (nhãn của dòng train cuối lấy từ nến test đầu tiên nếu gap=0)
+
+    Yields:
+        tuple: (train_idx, test_idx) là mảng chỉ số
+    """
+    if min_train is None:
+        min_train = n // (n_splits + 1)
+    if test_size is None:
+        test_size = (n - min_train - gap) // n_splits
+    if test_size <= 0:
+        raise ValueError(f"Không đủ dữ liệu ({n} dòng) cho {n_splits} fold")
+
+    for fold in range(n_splits):
+        train_end = min_train + fold * test_size
+        test_start = train_end + gap
+        test_end = min(test_start + test_size, n)
+        if test_start >= test_end:
+            break
+        train_start = 0 if expanding else train_end - min_train
+        yield np.arange(train_start, train_end), np.arange(test_start, test_end)
+
+# ---------------------------------------------------------------------------
+# FEATURE PIPELINE
+# ---------------------------------------------------------------------------
+class FeaturePipeline:
+    """
+    Ma trận đặc trưng cache theo (symbol, data version) trong {cache_dir}/{symbol}.parquet.
+
+    Nếu dữ liệu mới chỉ là dữ liệu cũ cộng thêm dòng, chỉ tính lại phần đuôi: chỉ báo được tính trên
+    `lookback` dòng trước đó để khởi động (EMA/Wilder hội tụ, sai khác cỡ (1 - alpha)^lookback),
+    rồi nối vào phần đã cache. Dòng cuối của cache cũng được tính lại vì Market_Trend của nó giờ đã biết.
+    """
+    def __init__(self, cache_dir="./feature_cache", price_column="Adj Close", volume_column="Volume",
+                 date_column="Date", lookback=500):
+        self.cache_dir = cache_dir
+        self.price_column = price_column
+        self.volume_column = volume_column
+        self.date_column = date_column
+        self.lookback = lookback
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @property
+    def input_columns(self):
+        return [self.date_column, self.price_column, self.volume_column]
+
+    def _paths(self, symbol):
+        base = os.path.join(self.cache_dir, symbol)
+        return f"{base}.parquet", f"{base}.json"
+
+    def _load(self, symbol):
+        parquet_path, meta_path = self._paths(symbol)
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            return pl.read_parquet(parquet_path), meta
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None, None
+
+    def _store(self, symbol, features, meta):
+        parquet_path, meta_path = self._paths(symbol)
+        features.write_parquet(f"{parquet_path}.tmp")
+        os.replace(f"{parquet_path}.tmp", parquet_path)
+        with open(f"{meta_path}.tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
+
+    def build(self, symbol, df):
+        """
+        Ma trận đặc trưng đầy đủ (gồm cả các dòng null ở đầu/cuối) cho `df` đã sắp xếp theo thời gian.
+        """
+        version = data_version(df, self.input_columns)
+        cached, meta = self._load(symbol)
+
+        if meta is not None and meta['version'] == version:
+            return cached
+
+        rows = meta['rows'] if meta is not None else 0
+        if (meta is not None and 0 < rows < df.height
+                and data_version(df.head(rows), self.input_columns) == meta['version']):
+            start = max(rows - 1 - self.lookback, 0)
+            tail = compute_features(df.slice(start), self.price_column, self.volume_column)
+            features = pl.concat([cached.head(rows - 1), tail.slice(rows - 1 - start)], how="vertical_relaxed")
+            print(f"{symbol}: tính đặc trưng cho {df.height - rows} dòng mới")
+        else:
+            features = compute_features(df, self.price_column, self.volume_column)
+            print(f"{symbol}: tính đặc trưng cho toàn bộ {df.height} dòng")
+
+        self._store(symbol, features, {'version': version, 'rows': df.height})
+        return features
+
+    def training_data(self, symbol, df, features=FEATURES, target=TARGET):
+        """(dates, X, y) đã bỏ các dòng thiếu giá trị, dùng cho train/walk-forward."""
+        data = self.build(symbol, df).select([self.date_column] + list(features) + [target]).drop_nulls()
+        return (data[self.date_column].to_numpy(), data.select(features).to_numpy().astype(float),
+                data[target].to_numpy())
@@ -0,0 +1,182 @@
+import numpy as np
+import pandas as pd
+import cvxpy as cp
+from collections import OrderedDict
+from pypfopt import expected_returns
+from pypfopt.risk_models import CovarianceShrinkage
+
+def clean_weights(weights, tickers, cutoff=1e-4, rounding=5):
+    """Giống EfficientFrontier.clean_weights: bỏ trọng số rất nhỏ và làm tròn."""
+    clean = np.array(weights, dtype=float)
+    clean[np.abs(clean) < cutoff] = 0
+    if rounding is not None:
+        clean = np.round(clean, rounding)
+    return OrderedDict(zip(tickers, clean))
+
+class FrontierEngine:
+    """
+    Đường biên hiệu quả cho một tập tài sản với μ và Σ (Ledoit-Wolf) tính một lần.
+
+    Bài toán QP  min ||Lᵀw||²  s.t. Σw = 1, min_weight <= w <= max_weight, μᵀw >= target
+    được dựng một lần với μ, L (Cholesky của Σ) và target là cvxpy Parameter, nên cvxpy chỉ biên dịch
+    một lần; mỗi điểm trên đường biên (và mỗi cửa sổ rolling qua update) chỉ đổi giá trị tham số và
+    giải lại với warm start.
+
+    Max Sharpe giải trực tiếp bằng một QP thuần nhất hóa (y = w/κ, κ > 0) trên cùng các tham số μ, L:
+        min ||Lᵀy||²  s.t. μᵀy - rf·κ = 1, Σy = κ, min_weight·κ <= y <= max_weight·κ
+    rồi w = y/κ, như EfficientFrontier.max_sharpe.
+
+    risk_free_rate mặc định 0.0 như pypfopt đang cài; nên truyền tường minh từ nơi gọi.
+    """
+    def __init__(self, prices=None, mu=None, cov=None, tickers=None, min_weight=0.0, max_weight=1.0,
+                 risk_free_rate=0.0, frequency=252):
+        self.min_weight = min_weight
+        self.max_weight = max_weight
+        self.risk_free_rate = risk_free_rate
+        self.frequency = frequency
+        self.problem = None
+        self.frontier_points = None
+        if prices is not None or mu is not None:
+            self.update(prices, mu, cov, tickers)
+
+    def _build(self, n):
+        self.w = cp.Variable(n)
+        self.mu_param = cp.Parameter(n)
+        self.chol_param = cp.Parameter((n, n))
+        self.target = cp.Parameter()
+        constraints = [
+            cp.sum(self.w) == 1,
+            self.w >= self.min_weight,
+            self.w <= self.max_weight,
+            self.mu_param @ self.w >= self.target,
+        ]
+        self.problem = cp.Problem(cp.Minimize(cp.sum_squares(self.chol_param.T @ self.w)), constraints)
+
+        self.y = cp.Variable(n)
+        self.kappa = cp.Variable(nonneg=True)
+        self.rf_param = cp.Parameter()
+        sharpe_constraints = [
+            self.mu_param @ self.y - self.rf_param * self.kappa == 1,
+            cp.sum(self.y) == self.kappa,
+            self.y >= self.min_weight * self.kappa,
+            self.y <= self.max_weight * self.kappa,
+        ]
+        self.sharpe_problem = cp.Problem(cp.Minimize(cp.sum_squares(self.chol_param.T @ self.y)), sharpe_constraints)
+
+    def update(self, prices=None, mu=None, cov=None, tickers=None):
+        """Đặt μ/Σ mới (từ giá hoặc truyền sẵn); giữ nguyên bài toán đã biên dịch nếu số tài sản không đổi."""
+        if mu is None:
+            mu = expected_returns.mean_historical_return(prices, frequency=self.frequency)
+        if cov is None:
+            cov = CovarianceShrinkage(prices, frequency=self.frequency).ledoit_wolf()
+        if tickers is None:
+            tickers = list(mu.index) if isinstance(mu, pd.Series) else list(range(len(mu)))
+
+        self.tickers = tickers
+        self.mu = np.asarray(mu, dtype=float)
+        self.cov = np.asarray(cov, dtype=float)
+        n = len(self.mu)
+        if n * self.min_weight > 1 + 1e-9 or n * self.max_weight < 1 - 1e-9:
+            raise ValueError(f"Không có danh mục nào thỏa min_weight={self.min_weight}, max_weight={self.max_weight} với {n} tài sản")
+
+        if self.problem is None or self.w.shape[0] != n:
+            self._build(n)
+        self.mu_param.value = self.mu
+        self.rf_param.value = self.risk_free_rate
+        # Cộng một lượng rất nhỏ lên đường chéo để Cholesky ổn định khi Σ gần suy biến
+        self.chol_param.value = np.linalg.cholesky(self.cov + 1e-12 * np.eye(n))
+        self.frontier_points = None
+
+    # ---------------------------------------------------------------------------
+    # GIẢI BÀI TOÁN
+    # ---------------------------------------------------------------------------
+    def _solve(self, target):
+        self.target.value = target
+        self.problem.solve(warm_start=True)
+        if self.problem.status not in ("optimal", "optimal_inaccurate"):
+            raise ValueError(f"Không giải được với target_return={target:.4f} (status: {self.problem.status})")
+        return np.array(self.w.value)
+
+    def performance(self, weights):
+        """(lợi suất kỳ vọng, độ biến động, Sharpe) theo năm, như portfolio_performance."""
+        ret = float(weights @ self.mu)
+        vol = float(np.sqrt(weights @ self.cov @ weights))
+        return ret, vol, (ret - self.risk_free_rate) / vol
+
+    def _result(self, weights):
+        return clean_weights(weights, self.tickers), self.performance(weights)
+
+    def min_return(self):
+        """Target không ràng buộc: thấp hơn mọi lợi suất có thể đạt."""
+        return float(self.mu.min()) - 1.0
+
+    def max_return(self):
+        """Lợi suất lớn nhất đạt được: min_weight cho tất cả, phần còn lại dồn vào tài sản μ cao nhất."""
+        weights = np.full(len(self.mu), self.min_weight)
+        remaining = 1 - weights.sum()
+        for i in np.argsort(-self.mu):
+            add = min(self.max_weight - weights[i], remaining)
+            weights[i] += add
+            remaining -= add
+            if remaining <= 0:
+                break
+        return float(weights @ self.mu)
+
+    # ---------------------------------------------------------------------------
+    # ĐƯỜNG BIÊN VÀ CÁC DANH MỤC
+    # ---------------------------------------------------------------------------
+    def frontier(self, n_points=50):
+        """
+        Giải N điểm từ danh mục biến động thấp nhất đến lợi suất lớn nhất (warm start từ điểm trước).
+
+        Returns:
+            DataFrame: target, return, volatility, sharpe cho từng điểm
+        """
+        min_vol_weights = self._solve(self.min_return())
+        low = float(min_vol_weights @ self.mu)
+        high = self.max_return()
+
+        points = [(low, min_vol_weights)]
+        for target in np.linspace(low, high, n_points)[1:]:
+            try:
+                points.append((target, self._solve(target)))
+            except ValueError:
+                break  # Sai số số học ở sát lợi suất lớn nhất
+        self.frontier_points = points
+
+        return pd.DataFrame(
+            [(target, *self.performance(weights)) for target, weights in points],
+            columns=["target", "return", "volatility", "sharpe"]
+        )
+
+    def min_volatility(self):
+        if self.frontier_points is None:
+            return self._result(self._solve(self.min_return()))
+        return self._result(self.frontier_points[0][1])
+
+    def efficient_return(self, target_return):
+        if target_return > self.max_return():
+            raise ValueError(f"target_return={target_return} lớn hơn lợi suất tối đa {self.max_return():.4f}")
+        return self._result(self._solve(target_return))
+
+    def max_sharpe(self):
+        """
+        Danh mục Sharpe lớn nhất: một lần giải QP thuần nhất hóa. Khi không tài sản nào có lợi suất
+        vượt risk_free_rate (bài toán vô nghiệm), lấy điểm có Sharpe cao nhất trên đường biên.
+        """
+        self.sharpe_problem.solve(warm_start=True)
+        if self.sharpe_problem.status in ("optimal", "optimal_inaccurate") and self.kappa.value > 0:
+            return self._result(np.array(self.y.value) / self.kappa.value)
+
+        if self.frontier_points is None:
+            self.frontier()
+        weights = max((weights for _, weights in self.frontier_points), key=lambda w: self.performance(w)[2])
+        return self._result(weights)
+
+    def portfolios(self, target_return=0.2):
+        """Max Sharpe, Min Volatility và danh mục theo target_return (mỗi danh mục một lần giải QP)."""
+        return {
+            "sharpe": self.max_sharpe(),
+            "volatility": self.min_volatility(),
+            "optimal": self.efficient_return(target_return),
+        }
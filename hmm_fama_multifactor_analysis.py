@@ -1,51 +1,11 @@
 import polars as pl
-import pandas as pd
-import yfinance as yf
-import statsmodels.api as sm
 import matplotlib.pyplot as plt
-from hmmlearn.hmm import GaussianHMM
+from price_cache import PriceCache
+from regime_detection import RegimeDetector
+from factor_regression import load_factors, regime_factor_regressions
 
 stocks = ["SPY", "BAC", "AES", "DCOM"]
 
-data = {stock: yf.download(stock, start="2003-01-01", end="2023-12-31") for stock in stocks}
-
-dataframes = {
-    stock: (
-        pl.from_pandas(data[stock].reset_index())
-        .rename({
-            f"('Date', '')": "Date",
-            f"('Adj Close', '{stock}')": "Adj Close",
-            f"('Close', '{stock}')": "Close",
-            f"('High', '{stock}')": "High",
-            f"('Low', '{stock}')": "Low",
-            f"('Open', '{stock}')": "Open",
-            f"('Volume', '{stock}')": "Volume",
-        })
-    )
-    for stock in stocks
-}
-
-fama_french_url = "https://mba.tuck.dartmouth.edu/pages/faculty/ken.french/ftp/F-F_Research_Data_5_Factors_2x3_daily_CSV.zip"
-
-factors = pd.read_csv(fama_french_url,
-                      compression='zip',
-                      skiprows=3,
-                      header=0)
-
-factors.rename(columns={factors.columns[0]: "Date"}, inplace=True)
-factors["Date"] = pd.to_datetime(factors["Date"], format="%Y%m%d", errors="coerce")
-
-factors = pl.DataFrame(factors)
-
-factors = factors.with_columns([
-    pl.col("Mkt-RF").cast(pl.Float64),
-    pl.col("SMB").cast(pl.Float64),
-    pl.col("HML").cast(pl.Float64),
-    pl.col("RMW").cast(pl.Float64),
-    pl.col("CMA").cast(pl.Float64),
-    pl.col("RF").cast(pl.Float64),
-])
-
 # Hàm tính log-returns
 def calculate_log_returns(df):
     df = df.with_columns(
@@ -53,39 +13,38 @@ def calculate_log_returns(df):
     )
     return df.drop_nulls()
 
-# Áp dụng cho từng cổ phiếu
-processed_data = {stock: calculate_log_returns(dataframes[stock]) for stock in stocks}
+def apply_hmm(processed_data, n_states=3):
+    # Fit song song trên process pool với seed cố định; dữ liệu không đổi hoặc chỉ thêm vài ngày thì dùng lại model đã cache
+    return RegimeDetector(n_states=n_states).apply(processed_data)
+
+# Hàm phân tích Fama-French: một hồi quy cho mỗi (cổ phiếu, trạng thái), giải chung một lượt
+def fama_french_analysis(state_data, factors_df):
+    return regime_factor_regressions(state_data, factors_df, ["Mkt-RF", "SMB", "HML"])
+
+if __name__ == "__main__":
+    # Giá được đọc từ cache cục bộ, chỉ tải (một request cho cả danh sách) khi còn thiếu
+    data = PriceCache().get(stocks, start="2003-01-01", end="2023-12-31")
+
+    dataframes = {stock: pl.from_pandas(data[stock].reset_index()) for stock in stocks}
 
-def apply_hmm(log_returns, n_states=3):
-    hmm = GaussianHMM(n_components=n_states, covariance_type="diag", n_iter=1000)
-    hmm.fit(log_returns.to_pandas()[["Log_Returns"]])
-    states = hmm.predict(log_returns.to_pandas()[["Log_Returns"]])
-    return log_returns.with_columns(pl.Series("State", states))
+    factors = load_factors()
 
-# Xác định trạng thái cho từng cổ phiếu
-state_data = {stock: apply_hmm(processed_data[stock], n_states=3) for stock in stocks}
+    # Áp dụng cho từng cổ phiếu
+    processed_data = {stock: calculate_log_returns(dataframes[stock]) for stock in stocks}
 
-# Hàm phân tích Fama-French
-def fama_french_analysis(df, factors_df):
-    merged = df.join(factors_df, on="Date")
-    y = merged["Log_Returns"].to_numpy()
-    X = merged[["Mkt-RF", "SMB", "HML"]].to_numpy()
-    X = sm.add_constant(X)
-    model = sm.OLS(y, X).fit()
-    return model.summary()
+    # Xác định trạng thái cho từng cổ phiếu
+    state_data = apply_hmm(processed_data, n_states=3)
 
-# Phân tích cho từng trạng thái của SPY
-spy_states = state_data["SPY"]
-factor_analysis = {state: fama_french_analysis(state_data[stock], factors) for state,
-                   stock in enumerate(stocks)}
+    # Phân tích cho từng trạng thái của từng cổ phiếu
+    factor_analysis = fama_french_analysis(state_data, factors)
 
-for stock, analysis in factor_analysis.items():
-    print(f"Stock analysis: {stocks[stock]}")
-    print(analysis)
-    print("-" * 50)
+    for stock in stocks:
+        print(f"Stock analysis: {stock}")
+        print(factor_analysis.filter(pl.col("stock") == stock))
+        print("-" * 50)
 
-for stock, df in state_data.items():
-    plt.figure(figsize=(10, 6))
-    plt.plot(df["Date"], df["State"])
-    plt.title(f"Market States for {stock}")
-    plt.show()
+    for stock, df in state_data.items():
+        plt.figure(figsize=(10, 6))
+        plt.plot(df["Date"], df["State"])
+        plt.title(f"Market States for {stock}")
+        plt.show()
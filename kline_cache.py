@@ -0,0 +1,154 @@
+import os
+import glob
+import numpy as np
+import polars as pl
+import pandas as pd
+from datetime import timedelta
+from kline_merge import merge_klines
+
+KLINE_COLUMNS = [
+    "open_time", "open", "high", "low", "close", "volume",
+    "close_time", "quote_asset_volume", "number_of_trades",
+    "taker_buy_base_asset_volume", "taker_buy_quote_asset_volume"
+]
+
+# ---------------------------------------------------------------------------
+# CHUẨN HÓA DỮ LIỆU
+# ---------------------------------------------------------------------------
+def to_epoch_ms(column, dtype):
+    """Biểu thức chuyển cột thời gian (ms, us hoặc Datetime) về Datetime(ms)."""
+    col = pl.col(column)
+    if dtype == pl.Datetime("ms"):
+        return col
+    if isinstance(dtype, pl.Datetime):
+        return col.cast(pl.Datetime("ms"))
+    # Timestamp số: 13 chữ số là ms, 16 chữ số là us (file Binance từ 2025)
+    return (
+        pl.when(col >= 10**15).then(col // 1000).otherwise(col)
+        .cast(pl.Int64).cast(pl.Datetime("ms"))
+    )
+
+def normalize_klines(df):
+    """
+    Chuẩn hóa DataFrame kline (pandas hoặc polars) về polars với tên cột chữ thường
+    và open_time/close_time kiểu Datetime(ms), sắp xếp theo open_time.
+    """
+    if isinstance(df, pd.DataFrame):
+        df = pl.from_pandas(df)
+    df = df.rename({c: c.lower() for c in df.columns if c != c.lower()})
+    df = df.with_columns([
+        to_epoch_ms(c, df.schema[c]).alias(c) for c in ("open_time", "close_time") if c in df.columns
+    ])
+    return df.sort("open_time")
+
+def to_datetime(value):
+    """None, chuỗi ISO, date, datetime, pd.Timestamp hoặc epoch ms -> datetime không timezone (UTC)."""
+    if value is None:
+        return None
+    if isinstance(value, (int, np.integer)):
+        return pd.Timestamp(int(value), unit="ms").to_pydatetime()
+    value = pd.Timestamp(value)
+    if value.tzinfo is not None:
+        value = value.tz_convert(None)
+    return value.to_pydatetime()
+
+def time_filter(column, start=None, end=None):
+    """Biểu thức lọc khoảng [start, end) trên cột thời gian (None nếu không giới hạn)."""
+    predicate = None
+    if start is not None:
+        predicate = pl.col(column) >= start
+    if end is not None:
+        upper = pl.col(column) < end
+        predicate = upper if predicate is None else predicate & upper
+    return predicate
+
+# ---------------------------------------------------------------------------
+# CACHE PARQUET THEO THÁNG
+# ---------------------------------------------------------------------------
+class KlineCache:
+    """
+    Cache kline dạng cột trên đĩa: {base_dir}/{symbol}/{interval}/{YYYY-MM}.parquet.
+
+    Mỗi lần ghi chỉ viết lại những tháng có dữ liệu mới (merge theo open_time, bản mới thắng),
+    file được ghi ra tạm rồi os.replace nên người đọc không bao giờ thấy file dở dang.
+
+    Đọc theo khoảng thời gian: tháng nằm ngoài khoảng bị loại theo tên file, trong mỗi file
+    điều kiện open_time được đẩy xuống reader và so với min/max của từng row group
+    (row_group_size dòng), nên chỉ các row group giao với khoảng và các cột được yêu cầu được đọc.
+    """
+    def __init__(self, base_dir="./kline_cache", row_group_size=8192):
+        self.base_dir = base_dir
+        self.row_group_size = row_group_size
+
+    def partition_dir(self, symbol, interval):
+        return os.path.join(self.base_dir, symbol, interval)
+
+    def partition_path(self, symbol, interval, month):
+        return os.path.join(self.partition_dir(symbol, interval), f"{month}.parquet")
+
+    def months(self, symbol, interval, start=None, end=None):
+        """Danh sách tháng (YYYY-MM) đã có trong cache và giao với [start, end), tăng dần."""
+        files = glob.glob(os.path.join(self.partition_dir(symbol, interval), "*.parquet"))
+        months = sorted(os.path.basename(f)[:-len(".parquet")] for f in files)
+        start, end = to_datetime(start), to_datetime(end)
+        if start is not None:
+            months = [m for m in months if m >= start.strftime("%Y-%m")]
+        if end is not None:
+            # end không thuộc khoảng: tháng bắt đầu đúng tại end bị loại
+            last = (end - timedelta(milliseconds=1)).strftime("%Y-%m")
+            months = [m for m in months if m <= last]
+        return months
+
+    def write(self, symbol, interval, df):
+        """
+        Ghi (upsert) các nến vào cache.
+
+        Returns:
+            list: các tháng đã được viết lại
+        """
+        df = normalize_klines(df)
+        if df.is_empty():
+            return []
+        os.makedirs(self.partition_dir(symbol, interval), exist_ok=True)
+
+        df = df.with_columns(pl.col("open_time").dt.strftime("%Y-%m").alias("_month"))
+        written = []
+        for (month,), part in df.group_by("_month", maintain_order=True):
+            part = part.drop("_month")
+            path = self.partition_path(symbol, interval, month)
+            if os.path.exists(path):
+                existing = pl.read_parquet(path)
+                part = merge_klines([existing, part.select(existing.columns)])
+            else:
+                part = merge_klines([part])
+
+            tmp_path = f"{path}.tmp"
+            part.write_parquet(tmp_path, statistics=True, row_group_size=self.row_group_size)
+            os.replace(tmp_path, path)
+            written.append(month)
+        return written
+
+    def scan(self, symbol, interval, columns=None, start=None, end=None):
+        """LazyFrame trên các tháng giao với [start, end) (None nếu không có tháng nào)."""
+        files = [self.partition_path(symbol, interval, m) for m in self.months(symbol, interval, start, end)]
+        if not files:
+            return None
+        lf = pl.scan_parquet(files)
+        predicate = time_filter("open_time", to_datetime(start), to_datetime(end))
+        if predicate is not None:
+            lf = lf.filter(predicate)
+        if columns is not None:
+            lf = lf.select(columns)
+        return lf
+
+    def read(self, symbol, interval, columns=None, start=None, end=None):
+        lf = self.scan(symbol, interval, columns, start, end)
+        return None if lf is None else lf.collect()
+
+    def last_open_time(self, symbol, interval):
+        """open_time của nến cuối cùng trong cache, chỉ đọc tháng mới nhất."""
+        months = self.months(symbol, interval)
+        if not months:
+            return None
+        path = self.partition_path(symbol, interval, months[-1])
+        return pl.scan_parquet(path).select(pl.col("open_time").max()).collect().item()
@@ -0,0 +1,110 @@
+import os
+import numpy as np
+import pandas as pd
+import polars as pl
+
+# ---------------------------------------------------------------------------
+# MERGE THEO OPEN_TIME (BẢN GHI SAU THẮNG)
+# ---------------------------------------------------------------------------
+def key_array(values):
+    """
+    Khóa so sánh int64 (ms) từ cột open_time: Datetime/datetime64 hoặc timestamp số
+    (13 chữ số là ms, 16 chữ số là us như file Binance từ 2025).
+    """
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype("datetime64[ms]").astype(np.int64)
+    values = values.astype(np.int64)
+    return np.where(values >= 10**15, values // 1000, values)
+
+def merge_positions(keys):
+    """
+    Vị trí các dòng được giữ sau khi merge, theo thứ tự khóa tăng dần.
+
+    Args:
+        keys (list): mảng khóa của từng nguồn theo thứ tự ưu tiên (nguồn sau thắng nguồn trước
+            khi trùng khóa; trong cùng một nguồn, dòng sau thắng)
+
+    Returns:
+        np.ndarray: vị trí trong mảng ghép nối của các nguồn
+
+    Mỗi nguồn (file CSV, bảng đã lưu) vốn đã sắp xếp, nên sort ổn định (timsort) trên mảng ghép
+    chỉ cần trộn các đoạn đã sắp xếp: O(n log k) với k nguồn, O(n) khi các nguồn không chồng lên nhau.
+    Sort ổn định giữ thứ tự nguồn giữa các dòng cùng khóa, nên dòng cuối mỗi nhóm là bản ghi thắng.
+    """
+    keys = np.concatenate([np.asarray(k, dtype=np.int64) for k in keys]) if keys else np.empty(0, np.int64)
+    if keys.size == 0:
+        return np.empty(0, dtype=np.int64)
+    if np.all(keys[1:] > keys[:-1]):
+        return np.arange(keys.size)
+    order = np.argsort(keys, kind="stable")
+    ordered = keys[order]
+    last = np.empty(ordered.size, dtype=bool)
+    last[:-1] = ordered[1:] != ordered[:-1]
+    last[-1] = True
+    return order[last]
+
+def merge_klines(frames, key="open_time"):
+    """
+    Gộp nhiều DataFrame kline (pandas hoặc polars, cùng kiểu) thành một chuỗi sắp xếp theo `key`,
+    không trùng lặp; frames theo thứ tự ưu tiên tăng dần (frame sau thắng).
+    None và frame rỗng được bỏ qua; trả về None nếu không còn dữ liệu.
+    """
+    frames = [df for df in frames if df is not None and len(df)]
+    if not frames:
+        return None
+    positions = merge_positions([key_array(df[key].to_numpy()) for df in frames])
+    if isinstance(frames[0], pl.DataFrame):
+        return pl.concat(frames, how="vertical_relaxed")[positions]
+    return pd.concat(frames, ignore_index=True).take(positions).reset_index(drop=True)
+
+# ---------------------------------------------------------------------------
+# FILE CSV CHUẨN (CANONICAL)
+# ---------------------------------------------------------------------------
+def read_raw_csv(path):
+    """
+    Đọc file kline Binance giữ nguyên chuỗi gốc của từng ô (ghi lại không làm đổi định dạng số).
+
+    Returns:
+        tuple: (header hoặc None, DataFrame chuỗi không tên cột)
+    """
+    with open(path, "r") as f:
+        first_line = f.readline()
+    has_header = bool(first_line) and not first_line[:1].isdigit()
+    header = first_line.rstrip("\r\n") if has_header else None
+    try:
+        df = pd.read_csv(path, header=None, skiprows=1 if has_header else 0, dtype=str)
+    except pd.errors.EmptyDataError:
+        return header, None
+    return header, df
+
+def merge_csv_files(sources, dest_path):
+    """
+    Ghi `dest_path` là kết quả merge của chính nó (nếu có) với `sources` (ưu tiên tăng dần:
+    dest < sources[0] < sources[1] ...), thay cho việc nối thêm dòng vào cuối file.
+    File được ghi ra tạm rồi os.replace; header của file đích (hoặc của nguồn đầu tiên có header) được giữ.
+
+    Returns:
+        int: số dòng của file sau khi merge
+    """
+    paths = ([dest_path] if os.path.exists(dest_path) else []) + list(sources)
+    header, frames = None, []
+    for path in paths:
+        file_header, df = read_raw_csv(path)
+        if header is None:
+            header = file_header
+        if df is not None:
+            frames.append(df)
+
+    rows = 0
+    tmp_path = f"{dest_path}.tmp"
+    with open(tmp_path, "w", newline="") as f:
+        if header is not None:
+            f.write(header + "\n")
+        if frames:
+            positions = merge_positions([key_array(df[0].astype(np.int64).to_numpy()) for df in frames])
+            merged = pd.concat(frames, ignore_index=True).take(positions)
+            merged.to_csv(f, header=False, index=False)
+            rows = len(merged)
+    os.replace(tmp_path, dest_path)
+    return rows
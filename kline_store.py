@@ -0,0 +1,141 @@
+import os
+import re
+import polars as pl
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import select, table, column, DateTime
+from kline_cache import KlineCache, KLINE_COLUMNS, to_datetime, to_epoch_ms, time_filter
+
+# ---------------------------------------------------------------------------
+# CẮT TỈA FILE CSV CỦA BINANCE THEO TÊN FILE
+# ---------------------------------------------------------------------------
+FILE_PERIOD_PATTERN = re.compile(r"(\d{4})-(\d{2})(?:-(\d{2}))?\.csv$")
+
+def file_period(path):
+    """
+    Khoảng thời gian [start, end) của một file Binance theo tên:
+    SYMBOL-1h-2024-01.csv (tháng) hoặc SYMBOL-1h-2024-01-15.csv (ngày). None nếu không nhận ra.
+    """
+    match = FILE_PERIOD_PATTERN.search(os.path.basename(path))
+    if match is None:
+        return None
+    year, month, day = match.groups()
+    if day is None:
+        start = datetime(int(year), int(month), 1)
+        return start, start + relativedelta(months=1)
+    start = datetime(int(year), int(month), int(day))
+    return start, start + relativedelta(days=1)
+
+def prune_files(files, start=None, end=None):
+    """Chỉ giữ các file có khoảng thời gian giao với [start, end); file không rõ khoảng luôn được giữ."""
+    start, end = to_datetime(start), to_datetime(end)
+    kept = []
+    for path in files:
+        period = file_period(path)
+        if period is not None:
+            if start is not None and period[1] <= start:
+                continue
+            if end is not None and period[0] >= end:
+                continue
+        kept.append(path)
+    return kept
+
+# ---------------------------------------------------------------------------
+# BACKEND
+# ---------------------------------------------------------------------------
+class ParquetKlineBackend:
+    """Đọc từ KlineCache: loại tháng theo tên file, đẩy điều kiện thời gian và cột xuống reader Parquet."""
+    def __init__(self, cache=None):
+        self.cache = cache if cache is not None else KlineCache()
+
+    def read(self, symbol, interval, start, end, columns, limit):
+        if limit is None:
+            return self.cache.read(symbol, interval, columns, start, end)
+
+        # limit: đọc ngược từ tháng mới nhất, dừng khi đủ số nến (file mỗi tháng đã sắp xếp theo open_time)
+        parts, rows = [], 0
+        predicate = time_filter("open_time", start, end)
+        for month in reversed(self.cache.months(symbol, interval, start, end)):
+            lf = pl.scan_parquet(self.cache.partition_path(symbol, interval, month))
+            if predicate is not None:
+                lf = lf.filter(predicate)
+            if columns is not None:
+                lf = lf.select(columns)
+            part = lf.tail(limit - rows).collect()
+            parts.append(part)
+            rows += part.height
+            if rows >= limit:
+                break
+        return pl.concat(parts[::-1]) if parts else None
+
+class MySQLKlineBackend:
+    """
+    Đọc từ bảng MySQL mỗi ticker (cột thời gian là khóa chính): WHERE time >= :start AND time < :end
+    chỉ quét đoạn tương ứng của index, limit dùng ORDER BY time DESC LIMIT n trên cùng index,
+    và chỉ các cột được yêu cầu được chọn.
+    """
+    def __init__(self, engine, table_name=None, time_column="open_time"):
+        self.engine = engine
+        self.table_name = table_name or (lambda symbol, interval: symbol.lower().replace("usdt", "_usdt"))
+        self.time_column = time_column
+
+    def read(self, symbol, interval, start, end, columns, limit):
+        columns = list(columns) if columns is not None else KLINE_COLUMNS
+        names = columns if self.time_column in columns else [self.time_column] + columns
+        time_columns = {self.time_column, "open_time", "close_time"}
+        source = table(self.table_name(symbol, interval), *[
+            column(name, DateTime) if name in time_columns else column(name) for name in names
+        ])
+        time_col = source.c[self.time_column]
+
+        query = select(*[source.c[name] for name in names])
+        if start is not None:
+            query = query.where(time_col >= start)
+        if end is not None:
+            query = query.where(time_col < end)
+        if limit is not None:
+            query = query.order_by(time_col.desc()).limit(limit)
+        else:
+            query = query.order_by(time_col)
+
+        with self.engine.connect() as connection:
+            rows = connection.execute(query).fetchall()
+        if not rows:
+            return None
+        if limit is not None:
+            rows = rows[::-1]
+
+        df = pl.DataFrame([tuple(row) for row in rows], schema=names, orient="row")
+        df = df.with_columns([
+            to_epoch_ms(c, df.schema[c]).alias(c) for c in ("open_time", "close_time") if c in names
+        ])
+        return df.select(columns)
+
+# ---------------------------------------------------------------------------
+# KLINE STORE
+# ---------------------------------------------------------------------------
+class KlineStore:
+    """
+    API đọc kline theo khoảng thời gian, dùng chung cho cache Parquet cục bộ và MySQL.
+
+    Ví dụ:
+        store = KlineStore(ParquetKlineBackend(KlineCache("./kline_cache")))
+        store.read("BTCUSDT", "1h", start="2024-01-01", end="2024-02-01", columns=["open_time", "close"])
+    """
+    def __init__(self, backend):
+        self.backend = backend
+
+    def read(self, symbol, interval, start=None, end=None, columns=None, limit=None):
+        """
+        Args:
+            start, end: khoảng [start, end) (chuỗi ISO, date, datetime hoặc epoch ms; None = không giới hạn)
+            columns (list): các cột cần đọc (mặc định tất cả)
+            limit (int): chỉ lấy `limit` nến cuối cùng trong khoảng
+
+        Returns:
+            pl.DataFrame: sắp xếp theo open_time, hoặc None nếu không có nến nào trong khoảng
+        """
+        df = self.backend.read(symbol, interval, to_datetime(start), to_datetime(end), columns, limit)
+        if df is None or df.is_empty():
+            return None
+        return df
@@ -4,104 +4,82 @@
 #url = 'https://anaconda.org/conda-forge/ta-lib/0.4.19/download/linux-64/ta-lib-0.4.19-py310hde88566_4.tar.bz2'
 #!curl -L $url | tar xj -C /usr/local/lib/python3.10/dist-packages/ lib/python3.10/site-packages/talib --strip-components=3
 
-import talib as ta
-import yfinance as yf
 import polars as pl
 import pandas as pd
 import matplotlib.pyplot as plt
-from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import confusion_matrix, classification_report
+from price_cache import PriceCache
+from functools import partial
+from feature_pipeline import FeaturePipeline, FEATURES, walk_forward_splits
+from walk_forward import WalkForward
+
+if __name__ == "__main__":
+    nasdaq_data = PriceCache().get(['NDAQ'])['NDAQ']
+
+    nasdaq_data = pl.from_pandas(nasdaq_data, include_index = True)
+    #print(nasdaq_data)
+
+    # Tất cả chỉ báo tính trong một lượt (MACD gọi một lần) và cache theo version dữ liệu;
+    # lần chạy sau chỉ tính cho các dòng mới
+    pipeline = FeaturePipeline()
+    nasdaq_data = pipeline.build('NDAQ', nasdaq_data)
+    print(nasdaq_data)
+    plt.figure(figsize=(12, 6))
+    plt.plot(nasdaq_data['Date'], nasdaq_data['RSI'], label='RSI', color='blue')
+    plt.axhline(y=70, color='red', linestyle='--', label='Overbought (70)')
+    plt.axhline(y=30, color='green', linestyle='--', label='Oversold (30)')
+    plt.legend()
+    plt.grid()
+    plt.show()
+
+    nasdaq_data = nasdaq_data.drop_nulls()
+
+    #print(nasdaq_data)
+
+    plt.figure(figsize=(12, 6))
+    plt.plot(nasdaq_data['Date'], nasdaq_data['MACD'], label='MACD', color='blue')
+    plt.plot(nasdaq_data['Date'], nasdaq_data['Signal_Line'], label='Signal Line', color='orange')
+    plt.bar(nasdaq_data['Date'], nasdaq_data['MACD_Hist'], label='MACD Histogram', color='gray', alpha=0.5)
+    plt.title('MACD over Time')
+    plt.legend()
+    plt.grid()
+    plt.show()
+
+    features = FEATURES
+    X = nasdaq_data[features].to_numpy().astype(float)
+    y = nasdaq_data["Market_Trend"].to_numpy()
+
+    # Chia theo thời gian: train trên quá khứ, test trên 20% dữ liệu gần nhất (không xáo trộn)
+    train_idx, test_idx = list(walk_forward_splits(len(y), n_splits=1, min_train=int(len(y) * 0.8), gap=1))[-1]
+    X_train, X_test, y_train, y_test = X[train_idx], X[test_idx], y[train_idx], y[test_idx]
+
+    model = LogisticRegression(max_iter=5000)
+    model.fit(X_train, y_train)
+
+    y_pred = model.predict(X_test)
+    #print(y_test.value_counts())
+    #print(y_pred)
+
+    conf_matrix = confusion_matrix(y_test, y_pred)
+    print("Confusion Matrix:\n", conf_matrix)
+
+    # Báo cáo hiệu suất
+    print("Classification Report:\n", classification_report(y_test, y_pred, zero_division=0))
+
+    # Walk-forward: 5 fold train mở rộng, train song song, dự đoán out-of-sample và equity curve
+    forward_returns = (nasdaq_data["Adj Close"].shift(-1) / nasdaq_data["Adj Close"] - 1).fill_null(0).to_numpy()
+    walk_forward = WalkForward(partial(LogisticRegression, max_iter=5000), n_splits=5)
+    result = walk_forward.run(X, y, forward_returns=forward_returns, dates=nasdaq_data["Date"].to_numpy())
+
+    print("Walk-forward metrics:", {k: v for k, v in result['metrics'].items() if k != 'confusion_matrix'})
+    print(pl.DataFrame(result['fold_metrics']))
+
+    plt.figure(figsize=(12, 6))
+    plt.plot(result['equity']['date'], result['equity']['equity'], label='Strategy', color='blue')
+    plt.plot(result['equity']['date'], result['equity']['buy_hold'], label='Buy & Hold', color='gray')
+    plt.title('Walk-forward Equity Curve')
+    plt.legend()
+    plt.grid()
+    plt.show()
 
-nasdaq_data = yf.download('NDAQ', period = "max")
-
-nasdaq_data = pl.from_pandas(nasdaq_data, include_index = True).rename({
-    "('Adj Close', 'NDAQ')": "Adj Close",
-    "('Close', 'NDAQ')": "Close",
-    "('High', 'NDAQ')": "High",
-    "('Low', 'NDAQ')": "Low",
-    "('Open', 'NDAQ')": "Open",
-    "('Volume', 'NDAQ')": "Volume",
-})
-#print(nasdaq_data)
-
-nasdaq_data = (nasdaq_data
-              .with_columns(
-                  pl.Series(
-                      name="RSI",
-                      values = ta.RSI(nasdaq_data["Adj Close"].to_numpy(), timeperiod=14))))
-print(nasdaq_data)
-plt.figure(figsize=(12, 6))
-plt.plot(nasdaq_data['Date'], nasdaq_data['RSI'], label='RSI', color='blue')
-plt.axhline(y=70, color='red', linestyle='--', label='Overbought (70)')
-plt.axhline(y=30, color='green', linestyle='--', label='Oversold (30)')
-plt.legend()
-plt.grid()
-plt.show()
-
-nasdaq_data = nasdaq_data.with_columns([
-    pl.Series(
-        name="MACD",
-        values=ta.MACD(nasdaq_data["Adj Close"].to_numpy(),
-                       fastperiod=12,
-                       slowperiod=26,
-                       signalperiod=9)[0]
-    ),
-    pl.Series(
-        name="Signal_Line",
-        values=ta.MACD(nasdaq_data["Adj Close"].to_numpy(),
-                       fastperiod=12,
-                       slowperiod=26,
-                       signalperiod=9)[1]
-    ),
-    pl.Series(
-        name="MACD_Hist",
-        values=ta.MACD(nasdaq_data["Adj Close"].to_numpy(),
-                       fastperiod=12,
-                       slowperiod=26,
-                       signalperiod=9)[2]
-    )
-])
-
-nasdaq_data = nasdaq_data.with_columns([
-    pl.Series(
-        name="Volume MA",
-        values=ta.SMA(nasdaq_data["Volume"].to_numpy().astype(float),
-                      timeperiod=20))])
-
-nasdaq_data = nasdaq_data.with_columns([
-    pl.Series(
-        name="Market_Trend",
-        values=nasdaq_data["Adj Close"].shift(-1) > nasdaq_data["Adj Close"]).cast(pl.Int64)])
-
-nasdaq_data = nasdaq_data.fill_nan(None).drop_nulls()
-
-#print(nasdaq_data)
-
-plt.figure(figsize=(12, 6))
-plt.plot(nasdaq_data['Date'], nasdaq_data['MACD'], label='MACD', color='blue')
-plt.plot(nasdaq_data['Date'], nasdaq_data['Signal_Line'], label='Signal Line', color='orange')
-plt.bar(nasdaq_data['Date'], nasdaq_data['MACD_Hist'], label='MACD Histogram', color='gray', alpha=0.5)
-plt.title('MACD over Time')
-plt.legend()
-plt.grid()
-plt.show()
-
-features = ["RSI", "MACD", "Signal_Line", "Volume", "Volume MA"]
-X = nasdaq_data[features]
-y = nasdaq_data["Market_Trend"]
-
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-model = LogisticRegression(max_iter=5000)
-model.fit(X_train, y_train)
-
-y_pred = model.predict(X_test)
-#print(y_test.value_counts())
-#print(y_pred)
-
-conf_matrix = confusion_matrix(y_test, y_pred)
-print("Confusion Matrix:\n", conf_matrix)
-
-# Báo cáo hiệu suất
-print("Classification Report:\n", classification_report(y_test, y_pred, zero_division=0))
\ No newline at end of file
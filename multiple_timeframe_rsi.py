@@ -5,89 +5,62 @@ import pandas as pd
 import polars as pl
 import matplotlib.pyplot as plt
 import binance_historical_data as bhd
-from binance_historical_data import BinanceDataDumper
+from binance_metadata_cache import BinanceMetadataCache, get_data_dumper
+
+def load_hourly_bars(directory):
+    """
+    Đọc lazy toàn bộ file csv 1m trong thư mục và gộp thành nến 1h.
+    Chỉ cột open_time và close được đọc (projection pushdown); phép gộp chạy bằng streaming engine
+    nên bộ nhớ tối đa chỉ là 2 cột này thay vì toàn bộ dữ liệu 1m.
+    """
+    bars_1m = pl.scan_csv(os.path.join(directory, "*.csv"), has_header=False).select(
+        pl.col("column_1").alias("Open time"),
+        pl.col("column_5").cast(pl.Float64).alias("Close"),
+    )
+
+    return (
+        bars_1m
+        .with_columns(pl.from_epoch("Open time", "ms").alias("Open time"))
+        .sort("Open time")
+        .group_by_dynamic(
+            "Open time",
+            every="1h",
+            closed="right").agg([
+                pl.col("Close").first().alias("Open"),
+                pl.col("Close").max().alias("High"),
+                pl.col("Close").min().alias("Low"),
+                pl.col("Close").last().alias("Close"),
+            ])
+        .collect(engine="streaming")
+    )
 
 if __name__ == "__main__":
     # Khởi tạo BinanceDataDumper
-    data_dumper = BinanceDataDumper(
-        path_dir_where_to_dump=".",
+    data_dumper = get_data_dumper(
         asset_class="spot",  # spot, um, cm
         data_type="klines",  # aggTrades, klines, trades
         data_frequency="1m",
     )
 
-    # Dump dữ liệu
+    # Dump dữ liệu (ngày bắt đầu lấy từ cache metadata thay vì để dumper dò lại mỗi lần chạy)
     data_dumper.dump_data(
         tickers="BTCUSDT",
-        date_start=None,
+        date_start=BinanceMetadataCache().first_date("BTCUSDT", "1m"),
         date_end=None,
         is_to_update_existing=False,
         tickers_to_exclude=["UST"],
     )
 
-    # Đọc dữ liệu từ các file CSV
+    # Đọc dữ liệu 1m (lazy) và gộp thành nến 1h
     directory = "./spot/monthly/klines/BTCUSDT/1m"
-    all_files = [os.path.join(directory, f) for f in os.listdir(directory) if f.endswith('.csv')]
-    all_files.sort()
-
-    btc = (
-        pl.concat([pl.read_csv(file, has_header=False, columns=range(0, 11)) for file in all_files])
-        .rename(
-            {
-                "column_1": "Open time",
-                "column_2": "Open",
-                "column_3": "High",
-                "column_4": "Low",
-                "column_5": "Close",
-                "column_6": "Volume",
-                "column_7": "Close time",
-                "column_8": "Quote asset volume",
-                "column_9": "Number of trades",
-                "column_10": "Taker buy base asset volume",
-                "column_11": "Taker buy quote asset volume",
-            }
-        )
-        .with_columns(
-            pl.from_epoch("Open time", "ms").alias("Open time"),
-            pl.from_epoch("Close time", "ms").alias("Close time"),
-        )
-    )
-    #print(btc.head())
-    #print(btc.tail())
-
-    btc_melted = btc.unpivot(
-        index=['Open time'],
-        on=['Close'],
-        variable_name='Price_Type',
-        value_name='Price_Value').rename(
-            {
-                "Price_Value": "Close"
-            })
-    
-    btc_1h = btc_melted.group_by_dynamic(
-        "Open time",
-        every="1h",
-        closed="right").agg([
-            pl.col("Close").first().alias("Open"),
-            pl.col("Close").max().alias("High"),
-            pl.col("Close").min().alias("Low"),
-            pl.col("Close").last().alias("Close"),
-            # pl.col("RSI").last().alias("RSI"),
-            # pl.col("pct_return").sum().alias("pct_return"),
-            ])
-    btc_strat = btc_1h.with_columns(pl.col("Close").ta.rsi(14).alias("RSI").fill_nan(None),((pl.col("Close")/pl.col("Close").shift())-1).alias("pct_return")).drop_nulls()
-    btc_date = btc_strat[["Open time"]]
-    btc_return = btc_strat[["pct_return"]]
-    btc_rsi = btc_strat[["RSI"]]
+    btc_1h = load_hourly_bars(directory)
 
-    btc_strat_pd = btc_strat.to_pandas()
-    btc_date_pd = btc_strat_pd[["Open time"]]
-    btc_return_pd = btc_strat_pd[["pct_return"]]
-    btc_rsi_pd = btc_strat_pd[["RSI"]]
-
-    btc_strat[["Open time"]].to_numpy()
+    btc_strat = btc_1h.with_columns(pl.col("Close").ta.rsi(14).alias("RSI").fill_nan(None),((pl.col("Close")/pl.col("Close").shift())-1).alias("pct_return")).drop_nulls()
 
-    btc_rsi_pd.iloc[1]
+    # Mảng NumPy liên tục đưa thẳng vào backtest (không chuyển qua pandas)
+    btc_date = btc_strat["Open time"].to_numpy()
+    btc_return = btc_strat["pct_return"].to_numpy()
+    btc_rsi = btc_strat["RSI"].to_numpy()
 
     date = []
 pnl = []
@@ -205,11 +178,11 @@ for i in range(len(btc_date)):
         in_position = False
 
         for i in range(len(btc_date)):
-            date.append(btc_date.iloc[i])
+            date.append(btc_date[i])
 
             if in_position:
                 hold_counter += 1
-                pnl.append(btc_return.iloc[i] * position)
+                pnl.append(btc_return[i] * position)
                 if hold_counter >= hold_time:
                     in_position = False
                     hold_counter = 0
@@ -217,11 +190,11 @@ for i in range(len(btc_date)):
             else:
                 pnl.append(0)
 
-            if (btc_rsi.iloc[i] >= rsi_long_threshold) and (btc_rsi.iloc[i-1] < rsi_long_threshold):
+            if (btc_rsi[i] >= rsi_long_threshold) and (btc_rsi[i-1] < rsi_long_threshold):
                 in_position = True
                 position = 1
                 hold_counter = 0
-            elif (btc_rsi.iloc[i] <= rsi_short_threshold) and (btc_rsi.iloc[i-1] > rsi_short_threshold):
+            elif (btc_rsi[i] <= rsi_short_threshold) and (btc_rsi[i-1] > rsi_short_threshold):
                 in_position = True
                 position = -1
                 hold_counter = 0
@@ -241,7 +214,7 @@ for i in range(len(btc_date)):
 
     # Loop through combinations and run backtest
     for rsi_long, rsi_short, hold_time in parameter_combinations:
-        dates, pnl = run_backtest(btc_date_pd, btc_return_pd, btc_rsi_pd, rsi_long, rsi_short, hold_time)
+        dates, pnl = run_backtest(btc_date, btc_return, btc_rsi, rsi_long, rsi_short, hold_time)
 
         # Create a DataFrame for the results of this run
         result_df = pd.DataFrame({'date': dates, 'pnl': pnl})
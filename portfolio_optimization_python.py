@@ -1,24 +1,23 @@
 import pandas as pd
-import yfinance as yf
 import concurrent.futures
 import matplotlib.pyplot as plt
 from datetime import date, timedelta
-from pypfopt import EfficientFrontier, expected_returns, objective_functions
-from pypfopt.risk_models import CovarianceShrinkage
-
-def download_data(basket, start_date, end_date):
-    data = {}
-    for ticker in basket:
-        df_ticker = yf.download(ticker, start=start_date, end=end_date)['Close']
-        data[ticker] = df_ticker
-    df = pd.concat(data, axis=1).ffill().fillna(0)
+from pypfopt import expected_returns
+from price_cache import PriceCache
+from frontier_engine import FrontierEngine
+
+def download_data(basket, start_date, end_date, cache=None):
+    # Chỉ tải (một lần cho cả giỏ) các đoạn chưa có trong cache, còn lại đọc từ đĩa
+    cache = cache if cache is not None else PriceCache()
+    df = cache.close_prices(basket, start_date, end_date).ffill().fillna(0)
     if df.isnull().values.any():
         raise ValueError("Data contains NaN values even after filling!")
     return df
 
-def filter_top_assets(df, max_assets, criterion="sharpe", required_assets=None):
-    # Tính lợi suất kỳ vọng
-    mu = expected_returns.mean_historical_return(df)
+def filter_top_assets(df, max_assets, criterion="sharpe", required_assets=None, mu=None):
+    # Tính lợi suất kỳ vọng (nếu chưa được tính sẵn)
+    if mu is None:
+        mu = expected_returns.mean_historical_return(df)
     # Tính độ lệch chuẩn từ lợi suất hàng ngày
     daily_returns = df.pct_change().dropna()
     if daily_returns.isna().any().any():
@@ -32,7 +31,8 @@ def filter_top_assets(df, max_assets, criterion="sharpe", required_assets=None):
             sharpe_ratios.index = sharpe_ratios.index.map(lambda x: x[0])
         top_assets = sharpe_ratios.nlargest(max_assets).index.tolist()  # Lấy top tài sản theo Sharpe Ratio
     elif criterion == "volatility":
-        std_devs.index = std_devs.index.map(lambda x: x[0])
+        if isinstance(std_devs.index, pd.MultiIndex):
+            std_devs.index = std_devs.index.map(lambda x: x[0])
         top_assets = std_devs.nsmallest(max_assets).index.tolist()  # Lấy top tài sản có độ biến động thấp nhất
     else:
         raise ValueError("Criterion not supported! Use 'sharpe' or 'volatility'.")
@@ -49,36 +49,10 @@ def filter_top_assets(df, max_assets, criterion="sharpe", required_assets=None):
     print(top_assets)  # In danh sách ticker
     return df[top_assets]
 
-def optimize_portfolio(df_filtered, target_return=0.2, min_weight=0.05): 
-    mu = expected_returns.mean_historical_return(df_filtered)
-    S = CovarianceShrinkage(df_filtered).ledoit_wolf()
-
-    # 1. Portfolio có tỷ lệ Sharpe cao nhất
-    ef_sharpe = EfficientFrontier(mu, S)
-    ef_sharpe.add_constraint(lambda w: w >= min_weight)  # Ràng buộc tối thiểu
-    ef_sharpe.max_sharpe()
-    weights_sharpe = ef_sharpe.clean_weights()
-    performance_sharpe = ef_sharpe.portfolio_performance(verbose=False)
-
-    # 2. Portfolio có độ biến động thấp nhất
-    ef_volatility = EfficientFrontier(mu, S)
-    ef_volatility.add_constraint(lambda w: w >= min_weight)  # Ràng buộc tối thiểu
-    ef_volatility.min_volatility()
-    weights_volatility = ef_volatility.clean_weights()
-    performance_volatility = ef_volatility.portfolio_performance(verbose=False)
-
-    # 3. Portfolio tối ưu (giữa rủi ro và lợi suất)
-    ef_optimal = EfficientFrontier(mu, S)
-    ef_optimal.add_constraint(lambda w: w >= min_weight)  # Ràng buộc tối thiểu
-    ef_optimal.efficient_return(target_return=target_return)
-    weights_optimal = ef_optimal.clean_weights()
-    performance_optimal = ef_optimal.portfolio_performance(verbose=False)
-
-    return {
-        "sharpe": (weights_sharpe, performance_sharpe),
-        "volatility": (weights_volatility, performance_volatility),
-        "optimal": (weights_optimal, performance_optimal),
-    }
+def optimize_portfolio(df_filtered, target_return=0.2, min_weight=0.05, mu=None, risk_free_rate=0.0):
+    # μ và Σ tính một lần; cả ba danh mục dùng chung các bài toán QP tham số đã biên dịch
+    engine = FrontierEngine(df_filtered, mu=mu, min_weight=min_weight, risk_free_rate=risk_free_rate)
+    return engine.portfolios(target_return)
 
 def plot_portfolio(weights, title):
     filtered_weights = {key: weight for key, weight in weights.items() if weight > 0}
@@ -90,15 +64,19 @@ def plot_portfolio(weights, title):
     plt.title(title)
     plt.show()
 
-def main(basket, start_date, end_date, max_assets, min_weight, target_return, criterion, required_assets=None):
+def main(basket, start_date, end_date, max_assets, min_weight, target_return, criterion, required_assets=None,
+         risk_free_rate=0.0):
     # Download data
     df = download_data(basket, start_date, end_date)
 
+    # Lợi suất kỳ vọng tính một lần, dùng cho cả lọc tài sản và tối ưu
+    mu = expected_returns.mean_historical_return(df)
+
     # Filter top assets
-    df = filter_top_assets(df, max_assets, criterion, required_assets)
+    df = filter_top_assets(df, max_assets, criterion, required_assets, mu=mu)
 
     # Optimize portfolio
-    results = optimize_portfolio(df, target_return, min_weight)
+    results = optimize_portfolio(df, target_return, min_weight, mu=mu[df.columns], risk_free_rate=risk_free_rate)
 
     # Create Portfolio Comparison DataFrame
     portfolio_data = {
@@ -129,7 +107,7 @@ def main(basket, start_date, end_date, max_assets, min_weight, target_return, cr
     # Display results for each portfolio type
     for portfolio_type, (weights, performance) in results.items():
         weight = pd.DataFrame([
-          {'Token': 'GOLD' if k[0] == 'GC=F' else k[0].replace('-USD', ''), 'Allocation': f"{v*100:.2f}%"}
+          {'Token': 'GOLD' if k == 'GC=F' else k.replace('-USD', ''), 'Allocation': f"{v*100:.2f}%"}
           for k, v in weights.items()
         ])
 
@@ -153,5 +131,6 @@ if __name__ == "__main__":
     target_return = 0.2
     criterion = "sharpe"  # "sharpe" or "volatility"
     required_assets = ['BTC-USD', 'GC=F', 'ONUS-USD']
+    risk_free_rate = 0.0
 
-    main(basket, start_date, end_date, max_assets, min_weight, target_return, criterion, required_assets)
+    main(basket, start_date, end_date, max_assets, min_weight, target_return, criterion, required_assets, risk_free_rate)
@@ -0,0 +1,174 @@
+import os
+import json
+import pandas as pd
+from datetime import date
+
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+# ---------------------------------------------------------------------------
+# FETCHER
+# ---------------------------------------------------------------------------
+def yfinance_fetcher(tickers, start, end):
+    """
+    Tải nhiều ticker trong một lần gọi yf.download (yfinance tự tải song song bằng threads).
+
+    Returns:
+        dict: ticker -> DataFrame (index Date, cột PRICE_COLUMNS)
+    """
+    import yfinance as yf
+    raw = yf.download(tickers, start=start, end=end, group_by="ticker",
+                      auto_adjust=False, threads=True, progress=False)
+    result = {}
+    for ticker in tickers:
+        if isinstance(raw.columns, pd.MultiIndex):
+            if ticker in raw.columns.get_level_values(0):
+                df = raw[ticker]
+            elif ticker in raw.columns.get_level_values(1):
+                df = raw.xs(ticker, axis=1, level=1)
+            else:
+                continue
+        else:
+            df = raw
+        result[ticker] = df.dropna(how="all")
+    return result
+
+# ---------------------------------------------------------------------------
+# KHOẢNG THỜI GIAN [start, end)
+# ---------------------------------------------------------------------------
+def merge_intervals(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+def missing_intervals(covered, start, end):
+    """Các đoạn con của [start, end) chưa nằm trong `covered` (đã gộp, tăng dần)."""
+    missing = []
+    cursor = start
+    for c_start, c_end in covered:
+        if c_end <= cursor:
+            continue
+        if c_start >= end:
+            break
+        if c_start > cursor:
+            missing.append((cursor, c_start))
+        cursor = max(cursor, c_end)
+    if cursor < end:
+        missing.append((cursor, end))
+    return missing
+
+def has_trading_days(start, end):
+    """[start, end) có chứa ít nhất một ngày trong tuần (thứ Hai - thứ Sáu) hay không."""
+    return len(pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1))) > 0
+
+def to_iso(value):
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+# ---------------------------------------------------------------------------
+# PRICE CACHE
+# ---------------------------------------------------------------------------
+class PriceCache:
+    """
+    Cache giá ngày trên đĩa: {cache_dir}/{ticker}.parquet và coverage.json ghi lại các đoạn
+    [start, end) đã tải cho từng ticker.
+
+    Mỗi lần get chỉ tải các đoạn còn thiếu; các ticker thiếu cùng một đoạn được gom vào một
+    lần gọi fetcher (một request nhiều ticker). Fetcher có thể thay thế (ví dụ dữ liệu offline khi test).
+    """
+    def __init__(self, cache_dir="./price_cache", fetcher=yfinance_fetcher):
+        self.cache_dir = cache_dir
+        self.fetcher = fetcher
+        self.coverage_file = os.path.join(cache_dir, "coverage.json")
+        os.makedirs(cache_dir, exist_ok=True)
+        try:
+            with open(self.coverage_file, "r") as f:
+                self.coverage = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.coverage = {}
+
+    def _path(self, ticker):
+        return os.path.join(self.cache_dir, f"{ticker.replace('/', '_')}.parquet")
+
+    def _save_coverage(self):
+        tmp_file = f"{self.coverage_file}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(self.coverage, f, indent=4)
+        os.replace(tmp_file, self.coverage_file)
+
+    def _load(self, ticker):
+        path = self._path(ticker)
+        if not os.path.exists(path):
+            return None
+        return pd.read_parquet(path)
+
+    def _store(self, ticker, df):
+        existing = self._load(ticker)
+        if existing is not None:
+            df = pd.concat([existing, df])
+        df = df[~df.index.duplicated(keep="last")].sort_index()
+        df.index.name = "Date"
+        tmp_path = f"{self._path(ticker)}.tmp"
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, self._path(ticker))
+
+    def get(self, tickers, start="1970-01-01", end=None):
+        """
+        Dữ liệu giá [start, end) của từng ticker, tải phần còn thiếu rồi đọc từ cache.
+
+        Returns:
+            dict: ticker -> DataFrame (index Date)
+        """
+        start = to_iso(start)
+        end = to_iso(end if end is not None else date.today())
+        # Hôm nay chưa đóng nến: không đánh dấu là đã có
+        coverage_end = min(end, to_iso(date.today()))
+
+        # Gom các ticker theo đoạn thiếu để tải một lần cho nhiều ticker
+        requests = {}
+        for ticker in tickers:
+            covered = self.coverage.get(ticker, [])
+            for interval in missing_intervals(covered, start, end):
+                requests.setdefault(interval, []).append(ticker)
+
+        for (miss_start, miss_end), batch in requests.items():
+            print(f"Tải {len(batch)} ticker từ {miss_start} đến {miss_end}")
+            try:
+                fetched = self.fetcher(batch, miss_start, miss_end)
+            except Exception as e:
+                print(f"Lỗi khi tải {batch}: {e}")
+                continue
+            for ticker in batch:
+                df = fetched.get(ticker)
+                if df is None:
+                    # Fetcher không trả về ticker (lỗi riêng ticker, rate limit): không ghi coverage, lần sau tải lại
+                    print(f"Lỗi khi tải {ticker} từ {miss_start} đến {miss_end}")
+                    continue
+                if df.empty:
+                    print(f"Không có dữ liệu cho {ticker} từ {miss_start} đến {miss_end}")
+                    # yfinance trả về cột toàn NaN (rỗng sau dropna) khi một ticker lỗi: chỉ coi là đã có
+                    # khi đoạn này không có ngày giao dịch nào (cuối tuần)
+                    if has_trading_days(miss_start, miss_end):
+                        continue
+                else:
+                    self._store(ticker, df)
+                if miss_start < coverage_end:
+                    covered = self.coverage.get(ticker, []) + [[miss_start, min(miss_end, coverage_end)]]
+                    self.coverage[ticker] = merge_intervals(covered)
+        if requests:
+            self._save_coverage()
+
+        result = {}
+        for ticker in tickers:
+            df = self._load(ticker)
+            if df is None:
+                continue
+            result[ticker] = df[(df.index >= start) & (df.index < end)]
+        return result
+
+    def close_prices(self, tickers, start="1970-01-01", end=None, column="Close"):
+        """Bảng giá đóng cửa: index Date, mỗi cột một ticker (theo thứ tự `tickers`)."""
+        data = self.get(tickers, start, end)
+        return pd.DataFrame({ticker: data[ticker][column] for ticker in tickers if ticker in data})
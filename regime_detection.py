@@ -0,0 +1,165 @@
+import os
+import pickle
+import hashlib
+import numpy as np
+import polars as pl
+import concurrent.futures
+from hmmlearn.hmm import GaussianHMM
+
+# ---------------------------------------------------------------------------
+# DỮ LIỆU ĐẦU VÀO
+# ---------------------------------------------------------------------------
+def log_returns(df, price_column="Close"):
+    """Thêm cột Log_Returns (log(P_t / P_t-1)) và bỏ dòng đầu."""
+    return df.with_columns(
+        (pl.col(price_column) / pl.col(price_column).shift(1)).log().alias("Log_Returns")
+    ).drop_nulls("Log_Returns")
+
+def kline_log_returns(store, symbol, interval="1d", start=None, end=None):
+    """
+    Log-returns [start, end) từ KlineStore (cache Parquet hoặc MySQL) với cùng định dạng như dữ liệu yfinance;
+    chỉ cột open_time/close trong khoảng được đọc.
+    """
+    df = store.read(symbol, interval, start, end, ["open_time", "close"])
+    if df is None:
+        return None
+    return log_returns(df.rename({"open_time": "Date", "close": "Close"}))
+
+def data_hash(values):
+    return hashlib.sha1(np.ascontiguousarray(values, dtype=np.float64).tobytes()).hexdigest()
+
+# ---------------------------------------------------------------------------
+# FIT HMM (chạy trong process con)
+# ---------------------------------------------------------------------------
+def _sorted_params(hmm):
+    """Tham số của model với các trạng thái sắp xếp theo mean tăng dần (nhãn ổn định giữa các lần fit)."""
+    order = np.argsort(hmm.means_[:, 0])
+    return {
+        'startprob': hmm.startprob_[order],
+        'transmat': hmm.transmat_[np.ix_(order, order)],
+        'means': hmm.means_[order],
+        'covars': np.array([np.diag(c) for c in hmm.covars_])[order],
+    }
+
+def fit_hmm(symbol, returns, n_states=3, random_state=42, n_iter=1000, params=None):
+    """
+    Fit GaussianHMM trên chuỗi log-returns; nếu có `params` thì khởi tạo từ đó (không khởi tạo ngẫu nhiên).
+
+    Returns:
+        dict: symbol, states, params, converged, iterations
+    """
+    X = np.asarray(returns, dtype=np.float64).reshape(-1, 1)
+    if params is None:
+        hmm = GaussianHMM(n_components=n_states, covariance_type="diag", n_iter=n_iter, random_state=random_state)
+    else:
+        hmm = GaussianHMM(n_components=n_states, covariance_type="diag", n_iter=n_iter, random_state=random_state,
+                          init_params="")
+        hmm.startprob_ = params['startprob']
+        hmm.transmat_ = params['transmat']
+        hmm.means_ = params['means']
+        hmm.covars_ = params['covars']
+    hmm.fit(X)
+
+    params = _sorted_params(hmm)
+    hmm.startprob_, hmm.transmat_ = params['startprob'], params['transmat']
+    hmm.means_, hmm.covars_ = params['means'], params['covars']
+    return {
+        'symbol': symbol,
+        'states': hmm.predict(X),
+        'params': params,
+        'converged': hmm.monitor_.converged,
+        'iterations': hmm.monitor_.iter,
+    }
+
+# ---------------------------------------------------------------------------
+# REGIME DETECTOR
+# ---------------------------------------------------------------------------
+class RegimeDetector:
+    """
+    Xác định trạng thái thị trường (HMM) cho nhiều mã song song, có cache tham số đã fit.
+
+    Cache mỗi (symbol, n_states) lưu hash và độ dài dữ liệu đã fit:
+    - dữ liệu không đổi (cùng hash): dùng lại trạng thái, không fit;
+    - dữ liệu chỉ được nối thêm vài ngày (hash của phần đầu trùng): fit tiếp từ tham số cũ với ít vòng lặp;
+    - còn lại: fit lại từ đầu.
+    """
+    def __init__(self, n_states=3, random_state=42, n_iter=1000, refit_iter=100,
+                 cache_dir="./regime_cache", max_workers=None):
+        self.n_states = n_states
+        self.random_state = random_state
+        self.n_iter = n_iter
+        self.refit_iter = refit_iter
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _cache_path(self, symbol):
+        return os.path.join(self.cache_dir, f"{symbol}_{self.n_states}.pkl")
+
+    def _load(self, symbol):
+        try:
+            with open(self._cache_path(symbol), "rb") as f:
+                return pickle.load(f)
+        except (FileNotFoundError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _store(self, symbol, entry):
+        tmp_path = f"{self._cache_path(symbol)}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(entry, f)
+        os.replace(tmp_path, self._cache_path(symbol))
+
+    def fit(self, returns_by_symbol):
+        """
+        Args:
+            returns_by_symbol (dict): symbol -> mảng log-returns
+
+        Returns:
+            dict: symbol -> mảng trạng thái (0 = mean thấp nhất)
+        """
+        states = {}
+        jobs = {}
+        for symbol, returns in returns_by_symbol.items():
+            returns = np.asarray(returns, dtype=np.float64)
+            digest = data_hash(returns)
+            cached = self._load(symbol)
+
+            if cached is not None and cached['hash'] == digest:
+                states[symbol] = cached['states']
+            elif (cached is not None and cached['length'] < len(returns)
+                  and data_hash(returns[:cached['length']]) == cached['hash']):
+                jobs[symbol] = (returns, digest, cached['params'], self.refit_iter)
+            else:
+                jobs[symbol] = (returns, digest, None, self.n_iter)
+
+        if jobs:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {
+                    executor.submit(fit_hmm, symbol, returns, self.n_states, self.random_state, n_iter, params): symbol
+                    for symbol, (returns, _, params, n_iter) in jobs.items()
+                }
+                for future in concurrent.futures.as_completed(futures):
+                    symbol = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"Lỗi khi fit HMM cho {symbol}: {e}")
+                        continue
+                    returns, digest, params, _ = jobs[symbol]
+                    mode = "fit tiếp" if params is not None else "fit mới"
+                    print(f"{symbol}: {mode}, {result['iterations']} vòng lặp, hội tụ: {result['converged']}")
+                    states[symbol] = result['states']
+                    self._store(symbol, {
+                        'hash': digest, 'length': len(returns),
+                        'params': result['params'], 'states': result['states'],
+                    })
+
+        return {symbol: states[symbol] for symbol in returns_by_symbol if symbol in states}
+
+    def apply(self, frames, column="Log_Returns"):
+        """Thêm cột State vào từng DataFrame polars (yfinance hoặc kline)."""
+        states = self.fit({symbol: df[column].to_numpy() for symbol, df in frames.items()})
+        return {
+            symbol: df.with_columns(pl.Series("State", states[symbol]))
+            for symbol, df in frames.items() if symbol in states
+        }
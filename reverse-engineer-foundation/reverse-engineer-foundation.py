@@ -1,138 +1,139 @@
 import os
 import glob
+import numpy as np
 import polars as pl
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # Thiết lập hiển thị không giới hạn
 pl.Config.set_tbl_cols(-1)
 pl.Config.set_tbl_rows(-1)
 pl.Config.set_fmt_str_lengths(50)
 
-# --- Hàm tính PnL theo phương pháp Average Cost với log trạng thái vị thế ---
-def compute_pnl_average_cost_with_log(df: pl.DataFrame) -> pl.DataFrame:
+# --- Kernel average cost: chạy trên mảng kiểu cố định, biên dịch bằng numba nếu có ---
+# side: 0 = không có vị thế (None), 1 = long, -1 = short
+def _average_cost_kernel(codes, is_buyer, reduce_only, price, qty, n_tickers,
+                         pnl_out, side_out, qty_out, avg_out):
     """
-    Tính PnL dựa trên phương pháp trung bình giá (average cost) cho mỗi ticker.
-    Sau mỗi giao dịch, log lại trạng thái vị thế, trạng thái lệnh (Open/Close)
-    và ghi nhận số lượng hiện tại (current_qty) của vị thế.
+    Máy trạng thái average cost cho toàn bộ giao dịch (đã sắp xếp theo thời gian).
+    Trạng thái vị thế của mỗi ticker lưu trong 3 mảng side/quantity/avg_price theo mã ticker.
+    Thứ tự các phép tính giống hệt phiên bản dùng dict nên kết quả trùng khớp từng bit.
     """
-    # Sắp xếp theo thời gian (chuỗi time có định dạng chuẩn lexicographically)
-    df = df.sort(by="time")
+    pos_side = [0] * n_tickers
+    pos_qty = [0.0] * n_tickers
+    pos_avg = [0.0] * n_tickers
 
-    # positions[ticker] lưu trạng thái vị thế hiện tại:
-    # - side: "long", "short" hoặc None
-    # - quantity: khối lượng đang giữ
-    # - avg_price: giá vốn trung bình
-    positions = {}
+    for i in range(len(codes)):
+        k = codes[i]
+        buyer = is_buyer[i]
+        p = price[i]
+        q = qty[i]
+        row_pnl = 0.0
+        current_side = 1 if buyer else -1
 
-    # Danh sách lưu kết quả PnL, log trạng thái và số lượng hiện tại sau mỗi giao dịch
-    realized_pnl_list = []
-    position_state_list = []
-    current_qty_list = []  # lưu lại số lượng hiện tại của vị thế sau mỗi giao dịch
+        # ===== MỞ HOẶC TĂNG VỊ THẾ (reduceOnly_bool = False) =====
+        if not reduce_only[i]:
+            if pos_qty[k] == 0:
+                pos_side[k] = current_side
+                pos_qty[k] = q
+                pos_avg[k] = p
+            elif pos_side[k] == current_side:
+                total_cost = pos_avg[k] * pos_qty[k] + p * q
+                pos_qty[k] += q
+                pos_avg[k] = total_cost / pos_qty[k]
+            else:
+                current_qty = pos_qty[k]
+                closed_qty = q if current_qty >= q else current_qty
+                if pos_side[k] == 1:
+                    row_pnl = (p - pos_avg[k]) * closed_qty
+                else:
+                    row_pnl = (pos_avg[k] - p) * closed_qty
+                if current_qty > q:
+                    pos_qty[k] -= q
+                elif current_qty == q:
+                    pos_side[k] = 0
+                    pos_qty[k] = 0.0
+                    pos_avg[k] = 0.0
+                else:
+                    # Đóng toàn bộ vị thế cũ, mở vị thế mới với phần dư
+                    pos_side[k] = current_side
+                    pos_qty[k] = q - closed_qty
+                    pos_avg[k] = p
 
-    for row in df.iter_rows(named=True):
-        ticker = row["ticker"]
-        is_buyer = row["isBuyer"]             # True/False
-        reduce_only = row["reduceOnly_bool"]    # True/False
-        price = row["averagePrice"]             # float
-        qty = row["filledAmount"]               # float
+        # ===== ĐÓNG HOẶC GIẢM VỊ THẾ (reduceOnly_bool = True) =====
+        elif pos_qty[k] != 0 and ((pos_side[k] == 1 and not buyer) or (pos_side[k] == -1 and buyer)):
+            if pos_side[k] == 1:
+                row_pnl = (p - pos_avg[k]) * (q if pos_qty[k] >= q else pos_qty[k])
+            else:
+                row_pnl = (pos_avg[k] - p) * (q if pos_qty[k] >= q else pos_qty[k])
+            if pos_qty[k] > q:
+                pos_qty[k] -= q
+            else:
+                pos_side[k] = 0
+                pos_qty[k] = 0.0
+                pos_avg[k] = 0.0
 
-        # Nếu ticker chưa có vị thế, khởi tạo
-        if ticker not in positions:
-            positions[ticker] = {"side": None, "quantity": 0.0, "avg_price": 0.0}
-        pos = positions[ticker]
-        row_pnl = 0.0  # PnL của giao dịch hiện tại
+        pnl_out[i] = row_pnl
+        side_out[i] = pos_side[k]
+        qty_out[i] = pos_qty[k]
+        avg_out[i] = pos_avg[k]
 
-        # Xác định side của giao dịch hiện tại: "long" nếu mua, "short" nếu bán
-        current_side = "long" if is_buyer else "short"
+try:
+    from numba import njit
+    _compiled_kernel = njit(_average_cost_kernel)
+except ImportError:
+    _compiled_kernel = None
 
-        # ===== TRƯỜNG HỢP MỞ HOẶC TĂNG VỊ THẾ (reduceOnly_bool = False) =====
-        if not reduce_only:
-            # Nếu chưa có vị thế, mở mới
-            if pos["quantity"] == 0:
-                pos["side"] = current_side
-                pos["quantity"] = qty
-                pos["avg_price"] = price
-            else:
-                # Nếu cùng side, tăng vị thế (tính trung bình giá)
-                if pos["side"] == current_side:
-                    total_cost = pos["avg_price"] * pos["quantity"] + price * qty
-                    pos["quantity"] += qty
-                    pos["avg_price"] = total_cost / pos["quantity"]
-                else:
-                    # Nếu khác side, đóng một phần hoặc toàn bộ vị thế hiện tại
-                    current_qty = pos["quantity"]
-                    if current_qty > qty:
-                        row_pnl = (price - pos["avg_price"]) * qty if pos["side"] == "long" else (pos["avg_price"] - price) * qty
-                        pos["quantity"] -= qty
-                    elif current_qty == qty:
-                        row_pnl = (price - pos["avg_price"]) * qty if pos["side"] == "long" else (pos["avg_price"] - price) * qty
-                        pos["side"] = None
-                        pos["quantity"] = 0.0
-                        pos["avg_price"] = 0.0
-                    else:  # current_qty < qty
-                        closed_qty = current_qty
-                        row_pnl = (price - pos["avg_price"]) * closed_qty if pos["side"] == "long" else (pos["avg_price"] - price) * closed_qty
-                        # Đóng toàn bộ vị thế cũ
-                        pos["side"] = None
-                        pos["quantity"] = 0.0
-                        pos["avg_price"] = 0.0
-                        # Mở vị thế mới với phần dư
-                        leftover_qty = qty - closed_qty
-                        pos["side"] = current_side
-                        pos["quantity"] = leftover_qty
-                        pos["avg_price"] = price
+def format_position_state(reduce_only: np.ndarray, side: np.ndarray, qty: np.ndarray, avg_price: np.ndarray) -> list:
+    """
+    Tạo chuỗi log trạng thái vị thế ("Open-long, qty=1.0000, avg=100.00") từ các mảng kết quả.
+    Chỉ gọi khi cần log; định dạng giống f-string cũ.
+    """
+    side_names = {0: None, 1: "long", -1: "short"}
+    return [
+        f"{'Close' if r else 'Open'}-{side_names[s]}, qty={q:.4f}, avg={a:.2f}"
+        for r, s, q, a in zip(reduce_only.tolist(), side.tolist(), qty.tolist(), avg_price.tolist())
+    ]
 
-        # ===== TRƯỜNG HỢP ĐÓNG HOẶC GIẢM VỊ THẾ (reduceOnly_bool = True) =====
-        else:
-            if pos["quantity"] == 0:
-                pass  # Không có vị thế để đóng
-            else:
-                if pos["side"] == "long" and not is_buyer:
-                    if pos["quantity"] > qty:
-                        row_pnl = (price - pos["avg_price"]) * qty
-                        pos["quantity"] -= qty
-                    elif pos["quantity"] == qty:
-                        row_pnl = (price - pos["avg_price"]) * qty
-                        pos["side"] = None
-                        pos["quantity"] = 0.0
-                        pos["avg_price"] = 0.0
-                    else:
-                        closed_qty = pos["quantity"]
-                        row_pnl = (price - pos["avg_price"]) * closed_qty
-                        pos["side"] = None
-                        pos["quantity"] = 0.0
-                        pos["avg_price"] = 0.0
-                elif pos["side"] == "short" and is_buyer:
-                    if pos["quantity"] > qty:
-                        row_pnl = (pos["avg_price"] - price) * qty
-                        pos["quantity"] -= qty
-                    elif pos["quantity"] == qty:
-                        row_pnl = (pos["avg_price"] - price) * qty
-                        pos["side"] = None
-                        pos["quantity"] = 0.0
-                        pos["avg_price"] = 0.0
-                    else:
-                        closed_qty = pos["quantity"]
-                        row_pnl = (pos["avg_price"] - price) * closed_qty
-                        pos["side"] = None
-                        pos["quantity"] = 0.0
-                        pos["avg_price"] = 0.0
-                else:
-                    # Lệnh đóng không khớp với side hiện tại, bỏ qua
-                    pass
+# --- Hàm tính PnL theo phương pháp Average Cost với log trạng thái vị thế ---
+def compute_pnl_average_cost_with_log(df: pl.DataFrame, with_log: bool = True) -> pl.DataFrame:
+    """
+    Tính PnL dựa trên phương pháp trung bình giá (average cost) cho mỗi ticker.
+    Sau mỗi giao dịch, log lại trạng thái vị thế, trạng thái lệnh (Open/Close)
+    và ghi nhận số lượng hiện tại (current_qty) của vị thế.
+    Các cột được chuyển sang mảng NumPy và chạy qua _average_cost_kernel (numba nếu có);
+    cột position_state chỉ được tạo khi with_log=True.
+    """
+    # Sắp xếp theo thời gian (chuỗi time có định dạng chuẩn lexicographically)
+    df = df.sort(by="time")
+
+    # Mã hoá ticker thành số nguyên 0..n_tickers-1 để làm chỉ số cho mảng trạng thái
+    codes = (df["ticker"].rank("dense") - 1).cast(pl.Int64).to_numpy()
+    is_buyer = df["isBuyer"].cast(pl.Boolean).to_numpy()
+    reduce_only = df["reduceOnly_bool"].to_numpy()
+    price = df["averagePrice"].cast(pl.Float64).to_numpy()
+    qty = df["filledAmount"].cast(pl.Float64).to_numpy()
+    n = df.height
+    n_tickers = int(codes.max()) + 1 if n else 0
 
-        realized_pnl_list.append(row_pnl)
-        order_status = "Close" if reduce_only else "Open"
-        position_log_str = f"{order_status}-{pos['side']}, qty={pos['quantity']:.4f}, avg={pos['avg_price']:.2f}"
-        position_state_list.append(position_log_str)
-        current_qty_list.append(pos["quantity"])
+    if _compiled_kernel is not None:
+        pnl, side = np.empty(n), np.empty(n, dtype=np.int8)
+        current_qty, avg_price = np.empty(n), np.empty(n)
+        _compiled_kernel(codes, is_buyer, reduce_only, price, qty, n_tickers, pnl, side, current_qty, avg_price)
+    else:
+        pnl, side, current_qty, avg_price = [0.0] * n, [0] * n, [0.0] * n, [0.0] * n
+        _average_cost_kernel(codes.tolist(), is_buyer.tolist(), reduce_only.tolist(), price.tolist(), qty.tolist(),
+                             n_tickers, pnl, side, current_qty, avg_price)
+        pnl, side = np.array(pnl, dtype=np.float64), np.array(side, dtype=np.int8)
+        current_qty, avg_price = np.array(current_qty, dtype=np.float64), np.array(avg_price, dtype=np.float64)
 
     # Thêm các cột computed vào DataFrame
-    df = df.with_columns([
-        pl.Series(name="realizedPnL", values=realized_pnl_list),
-        pl.Series(name="position_state", values=position_state_list),
-        pl.Series(name="current_qty", values=current_qty_list)
-    ])
+    columns = [pl.Series(name="realizedPnL", values=pnl)]
+    if with_log:
+        columns.append(pl.Series(name="position_state",
+                                 values=format_position_state(reduce_only, side, current_qty, avg_price)))
+    columns.append(pl.Series(name="current_qty", values=current_qty))
+    df = df.with_columns(columns)
     df = df.with_columns(
         pl.col("realizedPnL").cum_sum().alias("cumulative_pnl")
     )
@@ -161,20 +162,23 @@ def compute_basic_metrics_from_df(df: pl.DataFrame, account: str) -> dict:
     start_time = df["time_dt"].min()
     end_time = df["time_dt"].max()
     
-    # Tính tổng thời gian giữ lệnh và lưu lại từng khoảng thời gian giữ lệnh
-    time_list = df["time_dt"].to_list()
-    qty_list = df["current_qty"].to_list()
-    holding_intervals = []
-    for i in range(len(df) - 1):
-        if qty_list[i] > 0:
-            delta = (time_list[i+1] - time_list[i]).total_seconds()
-            holding_intervals.append(delta)
-    
-    total_holding_seconds = sum(holding_intervals)
+    # Tính các khoảng thời gian giữ lệnh bằng shift: khoảng từ giao dịch i đến i+1
+    # được tính nếu sau giao dịch i vẫn còn vị thế mở (current_qty > 0)
+    holding_intervals = (
+        df.select(
+            ((pl.col("time_dt").shift(-1) - pl.col("time_dt")).dt.total_microseconds() / 1e6).alias("delta"),
+            pl.col("current_qty")
+        )
+        .filter((pl.col("current_qty") > 0) & pl.col("delta").is_not_null())
+        ["delta"]
+    )
+    n_intervals = holding_intervals.len()
+
+    total_holding_seconds = holding_intervals.sum() if n_intervals else 0
     holding_times = total_holding_seconds / 3600.0  # Tổng thời gian giữ lệnh tính bằng giờ
     
     # Tính thời gian giữ lệnh trung bình cho mỗi khoảng (nếu có khoảng giữ lệnh nào)
-    average_holding_time_minutes = (sum(holding_intervals) / len(holding_intervals)) / 60.0 if holding_intervals else 0.0
+    average_holding_time_minutes = (total_holding_seconds / n_intervals) / 60.0 if n_intervals else 0.0
 
     trades_per_hour = total_trades / holding_times if holding_times > 0 else None
 
@@ -191,11 +195,12 @@ def compute_basic_metrics_from_df(df: pl.DataFrame, account: str) -> dict:
     return metrics
 
 # --- Hàm xử lý một file CSV của một account ---
-def process_csv_file(file_path: str) -> (pl.DataFrame, dict):
+def process_csv_file(file_path: str, with_log: bool = False) -> (pl.DataFrame, dict):
     """
     Đọc file CSV, xử lý dữ liệu (lọc, trích xuất reduceOnly, tính PnL & log vị thế),
     thêm cột account và tính các chỉ số cơ bản.
     Nếu file không chứa dữ liệu, file sẽ bị xóa tự động.
+    Cột position_state chỉ được tạo khi with_log=True.
     Trả về:
       - df_with_pnl: DataFrame đã tính PnL
       - metrics: dict chứa các chỉ số cơ bản của tài khoản
@@ -240,7 +245,7 @@ def process_csv_file(file_path: str) -> (pl.DataFrame, dict):
     ])
 
     # Tính PnL và log trạng thái vị thế
-    df_with_pnl = compute_pnl_average_cost_with_log(df)
+    df_with_pnl = compute_pnl_average_cost_with_log(df, with_log=with_log)
 
     # Thêm cột account dựa trên tên file
     account_name = os.path.basename(file_path)
@@ -250,8 +255,36 @@ def process_csv_file(file_path: str) -> (pl.DataFrame, dict):
     metrics = compute_basic_metrics_from_df(df_with_pnl, account_name)
     return df_with_pnl, metrics
 
+# --- Xử lý một account trong process con, chỉ trả về một dòng kết quả nhỏ ---
+def analyze_account(file_path: str) -> dict:
+    """
+    Chạy process_csv_file cho một file và trả về dict gồm account, cumulative_pnl và các chỉ số cơ bản.
+    Chỉ dòng kết quả được gửi về process chính (không gửi cả DataFrame).
+    """
+    df_with_pnl, metrics = process_csv_file(file_path)
+    # Lấy cumulative_pnl của giao dịch cuối cùng của account
+    final_cum_pnl = df_with_pnl["cumulative_pnl"][-1]
+    return {"account": os.path.basename(file_path), "cumulative_pnl": final_cum_pnl, **metrics}
+
+def run_accounts(csv_files: list, max_workers: int = None) -> pl.DataFrame:
+    """
+    Phân phối các file account cho ProcessPoolExecutor và gom kết quả (theo thứ tự hoàn thành)
+    vào một bảng duy nhất.
+    """
+    rows = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(analyze_account, file_path): file_path for file_path in csv_files}
+        for i, future in enumerate(as_completed(futures), 1):
+            file_path = futures[future]
+            try:
+                rows.append(future.result())
+                print(f"Đã xử lý file ({i}/{len(csv_files)}): {file_path}")
+            except Exception as e:
+                print(f"❌ Lỗi khi xử lý file {file_path}: {e}")
+    return pl.DataFrame(rows)
+
 # --- Main: Xử lý tất cả các file CSV trong thư mục và tổng hợp kết quả ---
-def main():
+def main(max_workers: int = None):
     current_dir = os.getcwd()
     folder_path = os.path.join(current_dir, "reverse-engineer-foundation")
     csv_files = glob.glob(os.path.join(folder_path, "*.csv"))
@@ -259,44 +292,17 @@ def main():
     if not csv_files:
         raise FileNotFoundError(f"Không tìm thấy file CSV nào trong thư mục: {folder_path}")
     
-    account_pnl_list = []
-    all_metrics = []
-    
-    for file_path in csv_files:
-        print(f"Đang xử lý file: {file_path}")
-        try:
-            df_with_pnl, metrics = process_csv_file(file_path)
-            
-            # Lấy cumulative_pnl của giao dịch cuối cùng của account
-            final_cum_pnl = df_with_pnl["cumulative_pnl"].to_list()[-1]
-            account_pnl_list.append({"account": os.path.basename(file_path), "cumulative_pnl": final_cum_pnl})
-            all_metrics.append(metrics)
-            
-            # print(df_with_pnl.select([
-            #     "time",
-            #     "ticker",
-            #     "isBuyer",
-            #     "reduceOnly_bool",
-            #     "averagePrice",
-            #     "filledAmount",
-            #     "realizedPnL",
-            #     "cumulative_pnl",
-            #     "position_state"
-            # ]))
-
-        except Exception as e:
-            print(f"❌ Lỗi khi xử lý file {file_path}: {e}")
-    
-    # Tạo DataFrame kết quả cho PnL và các chỉ số cơ bản
-    result_df = pl.DataFrame(account_pnl_list)  # Chứa cột "account" và "cumulative_pnl"
-    metrics_df = pl.DataFrame(all_metrics)      # Chứa cột "account" và các chỉ số khác
+    # Xử lý song song các account; mỗi dòng chứa "account", "cumulative_pnl" và các chỉ số khác
+    combined_df = run_accounts(csv_files, max_workers)
+    if combined_df.is_empty():
+        print("Không có account nào được xử lý thành công.")
+        return
 
-    # Gộp hai DataFrame dựa trên cột "account"
-    combined_df = result_df.join(metrics_df, on="account", how="inner").sort("cumulative_pnl")
+    combined_df = combined_df.sort("cumulative_pnl")
     print(combined_df)
 
     # Tính tổng PnL của tất cả các account
-    total_pnl = result_df["cumulative_pnl"].sum()
+    total_pnl = combined_df["cumulative_pnl"].sum()
     print("Tổng PnL của tất cả các account:", total_pnl)
 
 if __name__ == "__main__":
@@ -2,9 +2,14 @@ import config
 import pandas as pd
 from sqlalchemy import Table, MetaData, select
 from sqlalchemy.orm import sessionmaker
-from pypfopt import expected_returns, CovarianceShrinkage, EfficientFrontier
+from frontier_engine import FrontierEngine
+from asset_screener import AssetScreener, HOURS_PER_YEAR, rank_assets
 
-def fetch_ticker_data(start_date="2020-09-01"):
+def fetch_ticker_data(start_date="2020-09-01", max_assets=None, min_quote_volume_30d=0.0):
+    """
+    max_assets: lọc trước trên ticker_stats (thống kê toàn bộ lịch sử đến hiện tại) — dùng cho chọn danh mục
+    hiện tại; backtest rolling nên để None và sàng lọc từng cửa sổ bằng screen_window để tránh look-ahead.
+    """
     engine = config.create_database_engine()
     Session = sessionmaker(bind=engine)
     session = Session()
@@ -26,6 +31,13 @@ def fetch_ticker_data(start_date="2020-09-01"):
     result = session.execute(query)
     tickers_list = [row[0] for row in result]
 
+    # Sàng lọc trước trên bảng ticker_stats để chỉ tải giá của các ticker được chọn
+    if max_assets is not None:
+        screener = AssetScreener(engine)
+        screener.update(session)
+        tickers_list = screener.screen(session, max_assets, min_quote_volume_30d=min_quote_volume_30d,
+                                       min_bars=720, by_name=True, candidates=tickers_list)
+
     # Lấy dữ liệu open_time, close cho mỗi ticker
     data_frames = []
     for ticker in tickers_list:
@@ -63,27 +75,33 @@ def create_rolling_windows(df, window_size=720, step_size=24):
     for end_idx in range(window_size, total_rows + 1, step_size):
         yield df.iloc[:end_idx]
 
-def optimize_portfolio(df_filtered, target_return=0.2, min_weight=0.05):
-    mu = expected_returns.mean_historical_return(df_filtered)
-    S = CovarianceShrinkage(df_filtered).ledoit_wolf()
+def max_assets_for(min_weight):
+    """Số tài sản tối đa để Σw = 1 còn thỏa w >= min_weight (None nếu không có cận dưới)."""
+    if min_weight <= 0:
+        return None
+    return int(1 / min_weight + 1e-9)
 
-    # 1. Portfolio có tỷ lệ Sharpe cao nhất
-    ef_sharpe = EfficientFrontier(mu, S)
-    ef_sharpe.add_constraint(lambda w: w >= min_weight)  # Ràng buộc tối thiểu
-    ef_sharpe.max_sharpe()
-    weights_sharpe = ef_sharpe.clean_weights()
-    performance_sharpe = ef_sharpe.portfolio_performance(verbose=False)
-
-    # 2. Portfolio tối ưu
-    ef_optimal = EfficientFrontier(mu, S)
-    ef_optimal.add_constraint(lambda w: w >= min_weight)  # Ràng buộc tối thiểu
-    ef_optimal.efficient_return(target_return=target_return)
-    weights_optimal = ef_optimal.clean_weights()
-    performance_optimal = ef_optimal.portfolio_performance(verbose=False)
+def screen_window(window_df, max_assets, frequency=HOURS_PER_YEAR, keep=("usdt",)):
+    """
+    Giữ max_assets ticker có Sharpe cao nhất tính chỉ trên dữ liệu của cửa sổ (không nhìn trước),
+    cùng các cột trong `keep`. Ticker có giá 0 (chưa có dữ liệu, fillna(0)) trong cửa sổ bị loại.
+    """
+    complete = (window_df > 0).all()
+    tickers = [column for column in window_df.columns if column not in keep and complete[column]]
+    selected = rank_assets(window_df[tickers].to_numpy(), tickers, max_assets, periods_per_year=frequency)
+    return window_df[selected + [column for column in keep if column in window_df.columns]]
+
+def optimize_portfolio(df_filtered, target_return=0.2, min_weight=0.05, engine=None, risk_free_rate=0.0,
+                       frequency=HOURS_PER_YEAR):
+    # Dùng lại engine giữa các cửa sổ rolling: bài toán QP đã biên dịch giữ nguyên, chỉ cập nhật μ/Σ;
+    # chỉ giải hai danh mục cần dùng (không dựng cả đường biên)
+    if engine is None:
+        engine = FrontierEngine(min_weight=min_weight, risk_free_rate=risk_free_rate, frequency=frequency)
+    engine.update(df_filtered)
 
     return {
-        "sharpe": (weights_sharpe, performance_sharpe),
-        "optimal": (weights_optimal, performance_optimal)
+        "sharpe": engine.max_sharpe(),
+        "optimal": engine.efficient_return(target_return)
     }
 
 if __name__ == "__main__":
@@ -91,10 +109,18 @@ if __name__ == "__main__":
     start_date = "2025-01-01"
     min_weight = 0.05
     target_return = 0.2
+    risk_free_rate = 0.0
+    # Nến 1h: cùng một hệ số năm hóa cho sàng lọc và tối ưu
+    frequency = HOURS_PER_YEAR
+    # Mỗi cửa sổ chỉ giữ max_assets ticker tốt nhất theo dữ liệu của chính cửa sổ đó (cộng cột usdt),
+    # giới hạn để max_assets + 1 tài sản vẫn thỏa min_weight
+    max_assets = max_assets_for(min_weight) - 1
 
     df = fetch_ticker_data(start_date)
 
     rolling_results = []
+    engine = FrontierEngine(min_weight=min_weight, risk_free_rate=risk_free_rate, frequency=frequency)
     for window_df in create_rolling_windows(df):    
-        results = optimize_portfolio(window_df, target_return, min_weight)
+        window_df = screen_window(window_df, max_assets, frequency)
+        results = optimize_portfolio(window_df, target_return, min_weight, engine, risk_free_rate, frequency)
         print(results)
@@ -8,6 +8,8 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy import Table, Column, MetaData, DateTime, Float, Integer, String, Date, inspect, insert, select, text
 import traceback
 import concurrent.futures
+from kline_store import prune_files
+from kline_merge import merge_klines
 
 # Khai báo metadata
 metadata = MetaData()
@@ -157,13 +159,19 @@ def process_ticker(ticker, last_updated_date=None):
         print(f"Không có file CSV nào cho {ticker}")
         return
 
-    data = pd.concat([read_csv_file(file) for file in all_files], ignore_index=True)
-    if data.empty:
+    # Chỉ đọc các file (theo ngày/tháng trong tên file) có dữ liệu từ last_updated_date trở đi
+    if last_updated_date:
+        all_files = prune_files(all_files, start=last_updated_date)
+        if not all_files:
+            print(f"Không có dữ liệu mới cho {ticker} sau ngày {last_updated_date}")
+            return
+
+    # Merge theo open_time (file sau thắng khi trùng nến) thay vì để INSERT IGNORE loại trùng lặp
+    data = merge_klines([read_csv_file(file) for file in sorted(all_files)])
+    if data is None or data.empty:
         print(f"Không có dữ liệu hợp lệ cho {ticker}")
         return
 
-    data.sort_values(by='open_time', inplace=True)
-
     if last_updated_date:
         data = data[data['open_time'] >= pd.to_datetime(last_updated_date)]
 
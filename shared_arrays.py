@@ -0,0 +1,197 @@
+import os
+import json
+import uuid
+import numpy as np
+from multiprocessing import shared_memory
+
+OHLCV_COLUMNS = ["open_time", "open", "high", "low", "close", "volume"]
+
+def frame_columns(df, columns=None):
+    """
+    dict cột -> mảng NumPy liên tục từ DataFrame pandas hoặc polars.
+    Cột thời gian được lưu dạng datetime64[ms].
+    """
+    columns = list(columns) if columns is not None else list(df.columns)
+    arrays = {}
+    for column in columns:
+        values = df[column].to_numpy()
+        if np.issubdtype(values.dtype, np.datetime64):
+            values = values.astype("datetime64[ms]")
+        arrays[column] = np.ascontiguousarray(values)
+    return arrays
+
+# ---------------------------------------------------------------------------
+# ATTACH (dùng trong process con)
+# ---------------------------------------------------------------------------
+# Block shared memory đã mở trong process hiện tại: giữ tham chiếu để buffer còn hợp lệ
+# và để các task sau trong cùng worker không phải mở lại
+_attached_blocks = {}
+
+def attach(entry, columns=None):
+    """
+    Mở các cột của một symbol từ entry trong index (không copy dữ liệu).
+
+    Args:
+        entry (dict): index[symbol] của SharedArrayStore hoặc SharedMemoryStore
+        columns (list): chỉ mở một số cột
+
+    Returns:
+        dict: cột -> ndarray chỉ đọc
+    """
+    columns = list(columns) if columns is not None else list(entry["columns"])
+    if entry["backend"] == "npy":
+        return {column: np.load(os.path.join(entry["path"], f"{column}.npy"), mmap_mode="r") for column in columns}
+
+    block = _attached_blocks.get(entry["name"])
+    if block is None:
+        block = shared_memory.SharedMemory(name=entry["name"])
+        _attached_blocks[entry["name"]] = block
+    arrays = {}
+    for column in columns:
+        dtype, offset = entry["columns"][column]
+        array = np.ndarray((entry["rows"],), dtype=np.dtype(dtype), buffer=block.buf, offset=offset)
+        array.flags.writeable = False
+        arrays[column] = array
+    return arrays
+
+# ---------------------------------------------------------------------------
+# BACKEND .npy (LƯU TRÊN ĐĨA, DÙNG LẠI GIỮA CÁC LẦN CHẠY)
+# ---------------------------------------------------------------------------
+class SharedArrayStore:
+    """
+    Mỗi symbol là một thư mục {base_dir}/{symbol}/ chứa một file .npy cho mỗi cột, cùng index.json nhỏ
+    (số dòng, dtype, khoảng thời gian, chữ ký nguồn dữ liệu). Worker mở bằng np.load(mmap_mode="r"):
+    các trang dữ liệu được chia sẻ qua page cache của hệ điều hành, không pickle, không nhân bản bộ nhớ.
+
+    write() chỉ ghi file dữ liệu nên có thể gọi song song từ nhiều worker (mỗi worker một symbol);
+    index.json chỉ được cập nhật bởi process chính qua publish().
+    """
+    def __init__(self, base_dir="./shared_arrays"):
+        self.base_dir = os.path.abspath(base_dir)
+        self.index_path = os.path.join(self.base_dir, "index.json")
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    @property
+    def index(self):
+        try:
+            with open(self.index_path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def symbols(self):
+        return sorted(self.index)
+
+    def entry(self, symbol):
+        return self.index.get(symbol)
+
+    def write(self, symbol, arrays, source=None):
+        """
+        Ghi các cột của một symbol (thay thế dữ liệu cũ), trả về entry để publish.
+
+        Args:
+            arrays (dict): cột -> mảng 1 chiều cùng độ dài
+            source: chữ ký dữ liệu nguồn (để biết khi nào cần ghi lại)
+        """
+        lengths = {len(values) for values in arrays.values()}
+        if len(lengths) != 1:
+            raise ValueError(f"{symbol}: các cột có độ dài khác nhau {sorted(lengths)}")
+
+        path = os.path.join(self.base_dir, symbol)
+        os.makedirs(path, exist_ok=True)
+        columns = {}
+        for column, values in arrays.items():
+            values = np.ascontiguousarray(values)
+            tmp_path = os.path.join(path, f"{column}.tmp.npy")
+            np.save(tmp_path, values)
+            os.replace(tmp_path, os.path.join(path, f"{column}.npy"))
+            columns[column] = values.dtype.str
+
+        entry = {"backend": "npy", "path": path, "rows": lengths.pop(), "columns": columns, "source": source}
+        if "open_time" in arrays and entry["rows"]:
+            entry["start"] = str(arrays["open_time"][0])
+            entry["end"] = str(arrays["open_time"][-1])
+        return entry
+
+    def publish(self, entries):
+        """Cập nhật index.json với dict symbol -> entry."""
+        index = self.index
+        index.update(entries)
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=4)
+        os.replace(tmp_path, self.index_path)
+
+    def put(self, symbol, arrays, source=None):
+        entry = self.write(symbol, arrays, source)
+        self.publish({symbol: entry})
+        return entry
+
+    def attach(self, symbol, columns=None):
+        entry = self.entry(symbol)
+        if entry is None:
+            raise KeyError(f"{symbol} chưa có trong {self.base_dir}")
+        return attach(entry, columns)
+
+# ---------------------------------------------------------------------------
+# BACKEND SHARED MEMORY (CHỈ TỒN TẠI TRONG MỘT LẦN CHẠY)
+# ---------------------------------------------------------------------------
+class SharedMemoryStore:
+    """
+    Mỗi symbol là một block multiprocessing.shared_memory chứa tất cả các cột liền nhau.
+    index (dict nhỏ, pickle rẻ) được truyền cho worker, worker gọi attach(index[symbol]).
+    Process tạo store chịu trách nhiệm giải phóng: dùng `with SharedMemoryStore() as store:` hoặc close().
+    """
+    ALIGNMENT = 64
+
+    def __init__(self, prefix=None):
+        self.prefix = prefix or f"sa_{uuid.uuid4().hex[:8]}"
+        self.index = {}
+        self._blocks = {}
+
+    def put(self, symbol, arrays):
+        lengths = {len(values) for values in arrays.values()}
+        if len(lengths) != 1:
+            raise ValueError(f"{symbol}: các cột có độ dài khác nhau {sorted(lengths)}")
+        rows = lengths.pop()
+
+        layout, size = {}, 0
+        for column, values in arrays.items():
+            layout[column] = (np.asarray(values).dtype.str, size)
+            size += -(-np.asarray(values).nbytes // self.ALIGNMENT) * self.ALIGNMENT
+
+        if symbol in self._blocks:
+            self.remove(symbol)
+        block = shared_memory.SharedMemory(name=f"{self.prefix}_{symbol}", create=True, size=max(size, 1))
+        for column, values in arrays.items():
+            dtype, offset = layout[column]
+            np.ndarray((rows,), dtype=np.dtype(dtype), buffer=block.buf, offset=offset)[:] = values
+
+        self._blocks[symbol] = block
+        self.index[symbol] = {"backend": "shm", "name": block.name, "rows": rows, "columns": layout}
+        return self.index[symbol]
+
+    def attach(self, symbol, columns=None):
+        return attach(self.index[symbol], columns)
+
+    def remove(self, symbol):
+        block = self._blocks.pop(symbol)
+        self.index.pop(symbol, None)
+        attached = _attached_blocks.pop(block.name, None)
+        if attached is not None:
+            try:
+                attached.close()
+            except BufferError:
+                pass  # còn mảng đang tham chiếu; vùng nhớ được giải phóng khi chúng bị thu hồi
+        block.close()
+        block.unlink()
+
+    def close(self):
+        for symbol in list(self._blocks):
+            self.remove(symbol)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
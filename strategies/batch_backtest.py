@@ -0,0 +1,352 @@
+import os
+import sys
+import pickle
+import hashlib
+import numpy as np
+import pandas as pd
+import warnings
+import concurrent.futures
+from indicators import Indicators
+from binance_data_handle import BinanceDataHandler
+from multiprocessing import freeze_support
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared_arrays import SharedArrayStore, attach, frame_columns
+warnings.filterwarnings('ignore')
+
+# Tham số mặc định giống MainStrategy / Indicators
+DEFAULT_PARAMS = {
+    'trend_threshold': 0.6,  # trend_values <= ngưỡng: pha mean reversion
+    'rsi_lower': 30,
+    'rsi_upper': 70,
+    'tp_mult': 2.0,          # TP = thresh_std * tp_mult
+    'sl_mult': 1.0,          # SL = -thresh_std * sl_mult
+    'warmup': 100,           # số phiên đầu bị reset vị thế
+    'pnl_factor': 0.96,
+}
+
+# Cột giá đưa vào SharedArrayStore (tên cột theo BinanceDataHandler)
+PRICE_COLUMNS = ['open_time', 'Open', 'High', 'Low', 'Close', 'volume']
+
+# Các mảng chỉ báo thô được cache (không phụ thuộc tham số chiến lược)
+INDICATOR_ARRAYS = ['low', 'high', 'close', 'returns', 'bbl', 'bbu', 'rsi', 'trend_values', 'thresh_std']
+
+# --- Kernel chiến lược: vòng lặp của MainStrategy.run_strategy trên mảng NumPy, biên dịch bằng numba nếu có ---
+def _bb_rsi_kernel(low, high, close, bbl, bbu, thresh, trend, neutral, tp, sl, pos, entry_price, entries):
+    """
+    Cùng logic vào/thoát lệnh với MainStrategy.run_strategy (vị thế phụ thuộc đường đi nên phải lặp),
+    nhưng trên mảng kiểu cố định thay vì .loc/.iloc của pandas.
+    entries: +1 / -1 tại phiên mở long / short.
+    """
+    pos[0] = 0
+    entry_price[0] = np.nan
+    entries[0] = 0
+    for i in range(1, len(close)):
+        p = pos[i - 1]
+        e = entry_price[i - 1]
+        entries[i] = 0
+
+        if trend[i] and neutral[i] and np.isnan(e):
+            if low[i - 1] * (1 - thresh[i - 1]) < bbl[i]:
+                p = 1
+                e = close[i]
+                entries[i] = 1
+            elif high[i - 1] * (1 + thresh[i - 1]) > bbu[i]:
+                p = -1
+                e = close[i]
+                entries[i] = -1
+
+        # Take Profit / Stop Loss
+        if p == 1:
+            if close[i] >= e * (1 + tp[i]) or close[i] <= e * (1 + sl[i]):
+                p = 0
+                e = np.nan
+        elif p == -1:
+            if close[i] <= e * (1 - tp[i]) or close[i] >= e * (1 - sl[i]):
+                p = 0
+                e = np.nan
+
+        pos[i] = p
+        entry_price[i] = e
+
+try:
+    from numba import njit
+    _compiled_kernel = njit(_bb_rsi_kernel)
+except ImportError:
+    _compiled_kernel = None
+
+# ---------------------------------------------------------------------------
+# CACHE CHỈ BÁO
+# ---------------------------------------------------------------------------
+class IndicatorCache:
+    """
+    Mảng chỉ báo của mỗi (symbol, khung thời gian) lưu pickle trong {cache_dir}/{symbol}_{freq}.pkl,
+    kèm hash của dữ liệu giá: chạy lại với tham số khác không phải tính lại chỉ báo,
+    dữ liệu đổi (thêm nến mới) thì tính lại.
+    """
+    def __init__(self, cache_dir="./indicator_cache"):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, symbol, data_frequency):
+        return os.path.join(self.cache_dir, f"{symbol}_{data_frequency}.pkl")
+
+    @staticmethod
+    def data_hash(prices):
+        digest = hashlib.sha1()
+        digest.update(np.asarray(prices['open_time']).astype('datetime64[ms]').astype(np.int64).tobytes())
+        for column in ['Open', 'High', 'Low', 'Close']:
+            digest.update(np.ascontiguousarray(prices[column], dtype=np.float64).tobytes())
+        return digest.hexdigest()
+
+    def get(self, symbol, data_frequency, prices):
+        """prices: dict cột -> mảng (open_time, Open, High, Low, Close), ví dụ mảng attach từ SharedArrayStore."""
+        digest = self.data_hash(prices)
+        path = self._path(symbol, data_frequency)
+        try:
+            with open(path, "rb") as f:
+                cached = pickle.load(f)
+            if cached['hash'] == digest:
+                return cached['arrays']
+        except (FileNotFoundError, pickle.UnpicklingError, EOFError, KeyError):
+            pass
+
+        ind = Indicators(pd.DataFrame({column: np.asarray(values) for column, values in prices.items()}))
+        ind.compute_indicators()
+        arrays = {name: np.asarray(getattr(ind, name), dtype=np.float64) for name in INDICATOR_ARRAYS}
+
+        with open(f"{path}.tmp", "wb") as f:
+            pickle.dump({'hash': digest, 'arrays': arrays}, f)
+        os.replace(f"{path}.tmp", path)
+        return arrays
+
+# ---------------------------------------------------------------------------
+# CHẠY CHIẾN LƯỢC + CHỈ SỐ
+# ---------------------------------------------------------------------------
+def run_strategy(arrays, params=None):
+    """
+    Returns:
+        dict: pos, entry_price, entries, pnl (lợi nhuận chưa hiện thực từng phiên)
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    n = len(arrays['close'])
+    with np.errstate(invalid='ignore'):
+        trend = arrays['trend_values'] <= params['trend_threshold']
+        neutral = (arrays['rsi'] >= params['rsi_lower']) & (arrays['rsi'] <= params['rsi_upper'])
+    thresh = arrays['thresh_std']
+
+    pos = np.zeros(n, dtype=np.int64)
+    entry_price = np.full(n, np.nan)
+    entries = np.zeros(n, dtype=np.int64)
+    if n:
+        kernel = _compiled_kernel if _compiled_kernel is not None else _bb_rsi_kernel
+        kernel(arrays['low'], arrays['high'], arrays['close'], arrays['bbl'], arrays['bbu'], thresh,
+               trend, neutral, thresh * params['tp_mult'], -thresh * params['sl_mult'], pos, entry_price, entries)
+
+    pos[:params['warmup']] = 0
+    entries[:params['warmup']] = 0
+    return {
+        'pos': pos,
+        'entry_price': entry_price,
+        'entries': entries,
+        'pnl': pos * arrays['returns'] * params['pnl_factor'],
+    }
+
+def summarize(returns, pnl, pos, entries):
+    """Các chỉ số của MainStrategy.print_summary (Sharpe nhân sqrt(số phiên), drawdown theo %) và số lệnh."""
+    def sharpe(x):
+        std = np.nanstd(x, ddof=1)
+        return np.nanmean(x) / std * np.sqrt(len(x)) if std > 0 else np.nan
+
+    equity = np.nancumsum(pnl) * 100
+    peak = np.maximum.accumulate(equity)
+    underwater = np.r_[False, equity[1:] < peak[1:]]
+    # Chuỗi phiên liên tiếp dưới đỉnh dài nhất
+    run_ids = np.cumsum(~underwater)
+    longest = int(np.bincount(run_ids[underwater]).max()) if underwater.any() else 0
+
+    return {
+        'bars': len(returns),
+        'sharpe_ticker': sharpe(returns),
+        'sum_returns': np.nansum(returns),
+        'sharpe_strategy': sharpe(pnl),
+        'sum_pnl_pct': np.nansum(pnl) * 100,
+        'max_drawdown_pct': float((equity - peak).min()) if len(equity) else 0.0,
+        'longest_drawdown_bars': longest,
+        'trades': int(np.count_nonzero(entries)),
+        'long_trades': int(np.count_nonzero(entries == 1)),
+        'short_trades': int(np.count_nonzero(entries == -1)),
+        'exposure': float(np.mean(pos != 0)) if len(pos) else 0.0,
+    }
+
+# ---------------------------------------------------------------------------
+# MỘT SYMBOL (chạy trong process con)
+# ---------------------------------------------------------------------------
+def store_key(symbol, data_frequency):
+    return f"{symbol}_{data_frequency}"
+
+def source_signature(base_path, symbol, data_frequency):
+    """Hash của danh sách file CSV (tên, kích thước, thời gian sửa): đổi khi có file mới hoặc file bị ghi lại."""
+    digest = hashlib.sha1()
+    for period in ["daily", "monthly"]:
+        directory = os.path.join(base_path, f"spot/{period}/klines/{symbol}/{data_frequency}")
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.csv'):
+                stat = os.stat(os.path.join(directory, name))
+                digest.update(f"{period}/{name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+def materialize_symbol(symbol, data_frequency, base_path, store_dir, signature):
+    """Đọc CSV một lần và ghi các cột giá vào SharedArrayStore; trả về entry cho index."""
+    handler = BinanceDataHandler(symbol, data_frequency)
+    handler.base_path = base_path
+    data = handler.load_data()
+    if data is None or len(data) == 0:
+        return None
+    data = data.drop_duplicates(subset='open_time').reset_index(drop=True)
+    return SharedArrayStore(store_dir).write(
+        store_key(symbol, data_frequency), frame_columns(data, PRICE_COLUMNS), source=signature
+    )
+
+def backtest_symbol(symbol, data_frequency, entry, cache_dir, param_sets, max_bars=None):
+    """Attach mảng giá (không copy), lấy chỉ báo từ cache (hoặc tính), chạy chiến lược cho từng bộ tham số."""
+    prices = attach(entry, PRICE_COLUMNS)
+    if max_bars is not None:
+        prices = {column: values[:max_bars] for column, values in prices.items()}
+
+    arrays = IndicatorCache(cache_dir).get(symbol, data_frequency, prices)
+    rows = []
+    for run_id, params in enumerate(param_sets):
+        result = run_strategy(arrays, params)
+        rows.append({
+            'symbol': symbol,
+            'run': run_id,
+            **{**DEFAULT_PARAMS, **params},
+            **summarize(arrays['returns'], result['pnl'], result['pos'], result['entries']),
+        })
+    return rows
+
+# ---------------------------------------------------------------------------
+# CHẠY TOÀN BỘ UNIVERSE
+# ---------------------------------------------------------------------------
+def list_symbols(base_path, data_frequency):
+    """Các symbol có dữ liệu klines (daily hoặc monthly) ở khung thời gian đã cho."""
+    symbols = set()
+    for period in ["daily", "monthly"]:
+        klines_dir = os.path.join(base_path, f"spot/{period}/klines")
+        if not os.path.isdir(klines_dir):
+            continue
+        for symbol in os.listdir(klines_dir):
+            if os.path.isdir(os.path.join(klines_dir, symbol, data_frequency)):
+                symbols.add(symbol)
+    return sorted(symbols)
+
+def prepare_store(symbols, data_frequency, base_path, store_dir, executor):
+    """
+    Đưa dữ liệu giá của các symbol vào SharedArrayStore; chỉ đọc lại CSV của symbol có file nguồn thay đổi.
+
+    Returns:
+        dict: symbol -> entry
+    """
+    store = SharedArrayStore(store_dir)
+    index = store.index
+    signatures = {symbol: source_signature(base_path, symbol, data_frequency) for symbol in symbols}
+    stale = [
+        symbol for symbol in symbols
+        if index.get(store_key(symbol, data_frequency), {}).get('source') != signatures[symbol]
+    ]
+
+    if stale:
+        print(f"Đọc CSV cho {len(stale)}/{len(symbols)} symbol")
+        futures = {
+            executor.submit(materialize_symbol, symbol, data_frequency, base_path, store_dir, signatures[symbol]): symbol
+            for symbol in stale
+        }
+        updated = {}
+        for future in concurrent.futures.as_completed(futures):
+            symbol = futures[future]
+            try:
+                entry = future.result()
+            except Exception as e:
+                print(f"❌ Lỗi khi đọc dữ liệu {symbol}: {e}")
+                continue
+            if entry is not None:
+                updated[store_key(symbol, data_frequency)] = entry
+        store.publish(updated)
+        index.update(updated)
+
+    return {symbol: index[store_key(symbol, data_frequency)] for symbol in symbols
+            if store_key(symbol, data_frequency) in index}
+
+def batch_backtest(data_frequency="15m", symbols=None, param_sets=None, base_path=None,
+                   cache_dir="./indicator_cache", store_dir="./shared_arrays", max_bars=None, max_workers=None):
+    """
+    Chạy BB_RSI cho mọi symbol song song (mỗi symbol một task trong process pool), không vẽ biểu đồ.
+    Giá được đọc từ CSV một lần vào SharedArrayStore; worker chỉ nhận entry của index (vài trăm byte)
+    và attach mảng memmap theo tên symbol thay vì nhận DataFrame qua pickle.
+
+    Args:
+        param_sets (list): danh sách dict tham số (ghi đè DEFAULT_PARAMS); mặc định một bộ mặc định
+
+    Returns:
+        pd.DataFrame: một dòng cho mỗi (symbol, bộ tham số), sắp xếp theo sharpe_strategy giảm dần
+    """
+    base_path = base_path or os.getcwd()
+    symbols = symbols or list_symbols(base_path, data_frequency)
+    param_sets = param_sets or [{}]
+    if not symbols:
+        print(f"❗ Không tìm thấy symbol nào có dữ liệu {data_frequency} trong {base_path}")
+        return pd.DataFrame()
+
+    rows = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        entries = prepare_store(symbols, data_frequency, base_path, store_dir, executor)
+        futures = {
+            executor.submit(backtest_symbol, symbol, data_frequency, entry, cache_dir, param_sets, max_bars): symbol
+            for symbol, entry in entries.items()
+        }
+        for future in concurrent.futures.as_completed(futures):
+            symbol = futures[future]
+            try:
+                rows.extend(future.result())
+            except Exception as e:
+                print(f"❌ Lỗi khi backtest {symbol}: {e}")
+
+    if not rows:
+        return pd.DataFrame()
+    return pd.DataFrame(rows).sort_values(['run', 'sharpe_strategy'], ascending=[True, False]).reset_index(drop=True)
+
+def print_report(report):
+    """Tóm tắt cho từng bộ tham số trên toàn universe."""
+    if report.empty:
+        print("Không có kết quả")
+        return
+    summary = report.groupby('run').agg(
+        symbols=('symbol', 'count'),
+        mean_sharpe=('sharpe_strategy', 'mean'),
+        median_sharpe=('sharpe_strategy', 'median'),
+        mean_pnl_pct=('sum_pnl_pct', 'mean'),
+        worst_drawdown_pct=('max_drawdown_pct', 'min'),
+        total_trades=('trades', 'sum'),
+        profitable_share=('sum_pnl_pct', lambda x: (x > 0).mean()),
+    )
+    print(summary.to_string())
+    columns = ['symbol', 'run', 'sharpe_strategy', 'sum_pnl_pct', 'max_drawdown_pct',
+               'longest_drawdown_bars', 'trades', 'long_trades', 'short_trades']
+    print(report[columns].head(20).to_string(index=False))
+
+if __name__ == '__main__':
+    freeze_support()
+
+    data_frequency = "15m"
+    param_sets = [
+        {},
+        {'trend_threshold': 0.5},
+        {'tp_mult': 3.0, 'sl_mult': 1.5},
+    ]
+
+    report = batch_backtest(data_frequency, param_sets=param_sets)
+    print_report(report)
+    if not report.empty:
+        report.to_csv(f"bb_rsi_batch_{data_frequency}.csv", index=False)
@@ -1,7 +1,12 @@
 import os
+import sys
 import pandas as pd
 from datetime import datetime
-from binance_historical_data import BinanceDataDumper
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from binance_metadata_cache import BinanceMetadataCache, get_data_dumper
+from kline_store import prune_files
+from kline_cache import to_datetime
+from kline_merge import merge_klines
 
 class BinanceDataHandler:
     def __init__(self, ticker, data_frequency="1h"):
@@ -23,14 +28,17 @@ class BinanceDataHandler:
         return pd.to_datetime(timestamp, unit=unit, errors='coerce')
 
     def download_data(self, date_start, date_end):
-        data_dumper = BinanceDataDumper(
-            path_dir_where_to_dump=".",
-            asset_class="spot",
-            data_type="klines",
-            data_frequency=self.data_frequency,
-        )
+        data_dumper = get_data_dumper("spot", "klines", self.data_frequency)
         date_start = datetime.strptime(date_start, "%Y-%m-%d").date()
         date_end = datetime.strptime(date_end, "%Y-%m-%d").date()
+
+        # Không tải khoảng trước ngày có dữ liệu đầu tiên (ngày này lấy từ cache metadata)
+        first_date = BinanceMetadataCache().first_date(self.ticker, self.data_frequency)
+        if first_date is not None and first_date > date_start:
+            date_start = first_date
+        if date_start > date_end:
+            print(f"❗ {self.ticker} chỉ có dữ liệu từ {first_date}")
+            return
         data_dumper.dump_data(
             tickers=self.ticker,
             date_start=date_start,
@@ -59,17 +67,28 @@ class BinanceDataHandler:
             print(f"❌ Lỗi khi đọc thư mục {directory}: {str(e)}")
             return []
 
-    def load_data(self):
+    def load_data(self, start=None, end=None):
+        """
+        Đọc nến trong khoảng [start, end) (mặc định toàn bộ); file ngày/tháng nằm ngoài khoảng
+        không được đọc (xét theo tên file). File tháng và file ngày chồng nhau được merge theo
+        open_time (file ngày thắng), nên mỗi nến chỉ xuất hiện một lần.
+        """
         daily_path = os.path.join(self.base_path, f"spot/daily/klines/{self.ticker}/{self.data_frequency}")
         monthly_path = os.path.join(self.base_path, f"spot/monthly/klines/{self.ticker}/{self.data_frequency}")
-        daily_files = self.get_csv_files(daily_path)
-        monthly_files = self.get_csv_files(monthly_path)
-        all_files = daily_files + monthly_files
+        daily_files = prune_files(self.get_csv_files(daily_path), start, end)
+        monthly_files = prune_files(self.get_csv_files(monthly_path), start, end)
+        all_files = sorted(monthly_files) + sorted(daily_files)
         if not all_files:
             print(f"❗ Không có file CSV nào cho {self.ticker}")
             return None
-        data = pd.concat([self.read_csv_file(file) for file in all_files], ignore_index=True)
-        data.sort_values(by='open_time', inplace=True)
+        data = merge_klines([self.read_csv_file(file) for file in all_files])
+        if data is None:
+            print(f"❗ Không có dữ liệu nến cho {self.ticker}")
+            return None
+        if start is not None:
+            data = data[data['open_time'] >= pd.Timestamp(to_datetime(start))]
+        if end is not None:
+            data = data[data['open_time'] < pd.Timestamp(to_datetime(end))]
         return data
 
 # --- Sử dụng class ---
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+from price_cache import PriceCache, PRICE_COLUMNS
+
+class StubFetcher:
+    """Offline fetcher: one row per business day in [start, end) for every requested ticker."""
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, tickers, start, end):
+        self.calls.append((sorted(tickers), start, end))
+        index = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1), name="Date")
+        values = np.arange(len(index), dtype=float)
+        return {ticker: pd.DataFrame({column: values for column in PRICE_COLUMNS}, index=index)
+                for ticker in tickers}
+
+def test_second_get_is_served_from_cache(tmp_path):
+    fetcher = StubFetcher()
+    cache = PriceCache(tmp_path, fetcher=fetcher)
+    first = cache.get(["AAPL"], start="2024-01-01", end="2024-02-01")
+    assert len(fetcher.calls) == 1
+
+    second = PriceCache(tmp_path, fetcher=fetcher).get(["AAPL"], start="2024-01-01", end="2024-02-01")
+    assert len(fetcher.calls) == 1
+    pd.testing.assert_frame_equal(first["AAPL"], second["AAPL"], check_freq=False)
+
+def test_growing_window_fetches_only_missing_slices(tmp_path):
+    fetcher = StubFetcher()
+    cache = PriceCache(tmp_path, fetcher=fetcher)
+    cache.get(["AAPL"], start="2024-01-01", end="2024-02-01")
+    data = cache.get(["AAPL"], start="2023-12-01", end="2024-03-01")
+
+    assert fetcher.calls[1:] == [
+        (["AAPL"], "2023-12-01", "2024-01-01"),
+        (["AAPL"], "2024-02-01", "2024-03-01"),
+    ]
+    assert data["AAPL"].index.min() == pd.Timestamp("2023-12-01")
+    assert data["AAPL"].index.max() == pd.Timestamp("2024-02-29")
+
+def test_tickers_missing_the_same_range_are_batched(tmp_path):
+    fetcher = StubFetcher()
+    cache = PriceCache(tmp_path, fetcher=fetcher)
+    data = cache.get(["AAPL", "MSFT", "NVDA"], start="2024-01-01", end="2024-02-01")
+
+    assert fetcher.calls == [(["AAPL", "MSFT", "NVDA"], "2024-01-01", "2024-02-01")]
+    assert sorted(data) == ["AAPL", "MSFT", "NVDA"]
+
+def test_empty_range_is_recorded_as_covered(tmp_path):
+    fetcher = StubFetcher()
+    cache = PriceCache(tmp_path, fetcher=fetcher)
+    # Saturday to Monday: the fetch succeeds without rows
+    cache.get(["AAPL"], start="2024-01-06", end="2024-01-08")
+    cache.get(["AAPL"], start="2024-01-06", end="2024-01-08")
+    assert len(fetcher.calls) == 1
+
+def test_failed_fetch_is_retried(tmp_path):
+    calls = []
+
+    def failing(tickers, start, end):
+        calls.append((tickers, start, end))
+        raise ConnectionError("offline")
+
+    cache = PriceCache(tmp_path, fetcher=failing)
+    cache.get(["AAPL"], start="2024-01-01", end="2024-02-01")
+    cache.get(["AAPL"], start="2024-01-01", end="2024-02-01")
+    assert len(calls) == 2
+
+def test_ticker_missing_from_result_is_retried(tmp_path):
+    stub = StubFetcher()
+
+    def omit_msft(tickers, start, end):
+        fetched = stub(tickers, start, end)
+        if len(stub.calls) == 1:
+            fetched.pop("MSFT")
+        return fetched
+
+    cache = PriceCache(tmp_path, fetcher=omit_msft)
+    data = cache.get(["AAPL", "MSFT"], start="2024-01-01", end="2024-02-01")
+    assert sorted(data) == ["AAPL"]
+
+    data = cache.get(["AAPL", "MSFT"], start="2024-01-01", end="2024-02-01")
+    assert stub.calls[1] == (["MSFT"], "2024-01-01", "2024-02-01")
+    assert sorted(data) == ["AAPL", "MSFT"]
+
+def test_empty_result_on_trading_days_is_retried(tmp_path):
+    calls = []
+
+    def empty(tickers, start, end):
+        calls.append((tickers, start, end))
+        return {ticker: pd.DataFrame(columns=PRICE_COLUMNS) for ticker in tickers}
+
+    cache = PriceCache(tmp_path, fetcher=empty)
+    cache.get(["AAPL"], start="2024-01-01", end="2024-02-01")
+    cache.get(["AAPL"], start="2024-01-01", end="2024-02-01")
+    assert len(calls) == 2
@@ -0,0 +1,282 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+# Vị trí cột trong file CSV của Binance (spot và futures)
+TRADE_LAYOUTS = {
+    "aggTrades": {"price": 1, "qty": 2, "time": 5, "is_buyer_maker": 6},
+    "trades": {"price": 1, "qty": 2, "time": 4, "is_buyer_maker": 5},
+}
+COLUMN_DTYPES = {"time": np.int64, "price": np.float64, "qty": np.float64, "is_buyer_maker": np.bool_}
+
+# ---------------------------------------------------------------------------
+# KHO TRADE DẠNG CỘT (MEMMAP)
+# ---------------------------------------------------------------------------
+class TradeStore:
+    """
+    Trade của mỗi symbol lưu theo cột: {base_dir}/{symbol}/{column}.bin (mảng nhị phân thô) + meta.json.
+
+    Ghi: CSV được đọc theo chunk và nối vào cuối từng file cột, bộ nhớ chỉ cần một chunk.
+    Đọc: mỗi cột là np.memmap, iter_chunks trả về các view liên tiếp nên có thể duyệt hàng trăm
+    triệu trade mà không nạp toàn bộ vào RAM.
+    """
+    def __init__(self, base_dir="./trade_store"):
+        self.base_dir = base_dir
+
+    def _dir(self, symbol):
+        return os.path.join(self.base_dir, symbol)
+
+    def _meta_path(self, symbol):
+        return os.path.join(self._dir(symbol), "meta.json")
+
+    def meta(self, symbol):
+        try:
+            with open(self._meta_path(symbol), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"rows": 0, "last_time": None, "files": []}
+
+    def _save_meta(self, symbol, meta):
+        tmp_path = f"{self._meta_path(symbol)}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f, indent=4)
+        os.replace(tmp_path, self._meta_path(symbol))
+
+    def ingest_csv(self, symbol, csv_files, kind="aggTrades", chunk_size=5_000_000):
+        """
+        Nối các file CSV (đã sắp xếp theo thời gian) vào kho; file đã nạp trước đó được bỏ qua.
+
+        Returns:
+            int: số trade mới
+        """
+        layout = TRADE_LAYOUTS[kind]
+        os.makedirs(self._dir(symbol), exist_ok=True)
+        meta = self.meta(symbol)
+        added = 0
+
+        for csv_file in sorted(csv_files):
+            name = os.path.basename(csv_file)
+            if name in meta["files"]:
+                continue
+            with open(csv_file, "r") as f:
+                has_header = not f.readline()[:1].isdigit()
+
+            # Cắt bỏ phần ghi dở của lần nạp bị gián đoạn trước đó (meta chỉ được lưu sau mỗi file)
+            outputs = {}
+            for column, dtype in COLUMN_DTYPES.items():
+                outputs[column] = open(os.path.join(self._dir(symbol), f"{column}.bin"), "ab")
+                outputs[column].truncate(meta["rows"] * np.dtype(dtype).itemsize)
+            try:
+                reader = pd.read_csv(csv_file, header=None, skiprows=1 if has_header else 0,
+                                     usecols=list(layout.values()), chunksize=chunk_size)
+                for chunk in reader:
+                    columns = {column: chunk[position].to_numpy() for column, position in layout.items()}
+
+                    time = columns["time"].astype(np.int64)
+                    time = np.where(time >= 10**15, time // 1000, time)  # microsecond (từ 2025) -> millisecond
+                    if meta["last_time"] is not None and len(time) and time[0] < meta["last_time"]:
+                        print(f"⚠️  {name}: trade không theo thứ tự thời gian ({time[0]} < {meta['last_time']})")
+                    columns["time"] = time
+                    if columns["is_buyer_maker"].dtype == object:
+                        columns["is_buyer_maker"] = columns["is_buyer_maker"].astype(str) == "True"
+
+                    for column, dtype in COLUMN_DTYPES.items():
+                        outputs[column].write(np.ascontiguousarray(columns[column], dtype=dtype).tobytes())
+                    meta["rows"] += len(time)
+                    if len(time):
+                        meta["last_time"] = int(time[-1])
+                    added += len(time)
+            finally:
+                for output in outputs.values():
+                    output.close()
+            meta["files"].append(name)
+            self._save_meta(symbol, meta)
+            print(f"{symbol}: đã nạp {name}, tổng {meta['rows']:,} trade")
+        return added
+
+    def open(self, symbol):
+        """dict cột -> np.memmap (chỉ đọc)."""
+        rows = self.meta(symbol)["rows"]
+        if rows == 0:
+            return None
+        return {
+            column: np.memmap(os.path.join(self._dir(symbol), f"{column}.bin"), dtype=dtype, mode="r", shape=(rows,))
+            for column, dtype in COLUMN_DTYPES.items()
+        }
+
+    def iter_chunks(self, symbol, chunk_size=5_000_000, start=None, end=None):
+        """Duyệt trade theo chunk (view trên memmap), giới hạn [start, end) theo thời gian ms."""
+        columns = self.open(symbol)
+        if columns is None:
+            return
+        first = 0 if start is None else int(np.searchsorted(columns["time"], start, side="left"))
+        last = len(columns["time"]) if end is None else int(np.searchsorted(columns["time"], end, side="left"))
+        for offset in range(first, last, chunk_size):
+            stop = min(offset + chunk_size, last)
+            yield offset, {column: values[offset:stop] for column, values in columns.items()}
+
+# ---------------------------------------------------------------------------
+# GỘP TRADE THÀNH NẾN
+# ---------------------------------------------------------------------------
+def aggregate_bars(ticks, bar_ms):
+    """Nến thời gian từ trade (vector hóa bằng reduceat); time là thời điểm mở nến."""
+    bar_ids = ticks["time"] // bar_ms
+    starts = np.flatnonzero(np.r_[True, bar_ids[1:] != bar_ids[:-1]])
+    ends = np.r_[starts[1:], len(bar_ids)]
+    price, qty = ticks["price"], ticks["qty"]
+    return {
+        "time": bar_ids[starts] * bar_ms,
+        "open": price[starts],
+        "high": np.maximum.reduceat(price, starts),
+        "low": np.minimum.reduceat(price, starts),
+        "close": price[ends - 1],
+        "volume": np.add.reduceat(qty, starts),
+        "taker_buy_volume": np.add.reduceat(np.where(ticks["is_buyer_maker"], 0.0, qty), starts),
+        "trades": ends - starts,
+        "last_time": ticks["time"][ends - 1],
+    }
+
+# ---------------------------------------------------------------------------
+# CHIẾN LƯỢC
+# ---------------------------------------------------------------------------
+class Strategy:
+    """
+    Callback vector hóa: nhận cả một chunk nến (on_bars) hoặc trade (on_ticks) dạng dict mảng NumPy
+    và trả về vị thế mục tiêu cho từng phần tử. Trạng thái giữa các chunk do strategy tự giữ.
+    """
+    mode = "bars"
+
+    def on_bars(self, bars):
+        raise NotImplementedError
+
+    def on_ticks(self, ticks):
+        raise NotImplementedError
+
+class MovingAverageCross(Strategy):
+    """Ví dụ: long khi MA nhanh > MA chậm trên giá đóng cửa nến, đứng ngoài khi ngược lại."""
+    def __init__(self, fast=20, slow=50, size=1.0):
+        self.fast = fast
+        self.slow = slow
+        self.size = size
+        self.history = np.empty(0)
+
+    def on_bars(self, bars):
+        closes = np.concatenate([self.history, bars["close"]])
+        cumsum = np.r_[0.0, np.cumsum(closes)]
+        index = np.arange(len(self.history), len(closes)) + 1
+        fast = (cumsum[index] - cumsum[np.maximum(index - self.fast, 0)]) / np.minimum(index, self.fast)
+        slow = (cumsum[index] - cumsum[np.maximum(index - self.slow, 0)]) / np.minimum(index, self.slow)
+        self.history = closes[-self.slow:]
+        return np.where((index >= self.slow) & (fast > slow), self.size, 0.0)
+
+# ---------------------------------------------------------------------------
+# BACKTEST
+# ---------------------------------------------------------------------------
+class TickBacktester:
+    """
+    Backtest trên dữ liệu trade: lệnh sinh ra tại thời điểm t (đóng nến hoặc tại trade) được khớp
+    ở trade đầu tiên có time >= t + latency_ms (searchsorted trên cột time memmap), giá khớp cộng trượt giá
+    theo chiều lệnh và trả phí theo tỷ lệ giá trị giao dịch.
+    """
+    def __init__(self, store, latency_ms=0, fee_rate=0.001, slippage_bps=0.0, bar_ms=60_000, chunk_size=5_000_000):
+        self.store = store
+        self.latency_ms = latency_ms
+        self.fee_rate = fee_rate
+        self.slippage = slippage_bps / 10_000
+        self.bar_ms = bar_ms
+        self.chunk_size = chunk_size
+
+    def _fills(self, all_time, all_price, order_times, sizes):
+        """Trade khớp: trade đầu tiên sau order_time + latency; lệnh không còn trade nào phía sau thì bỏ."""
+        index = np.searchsorted(all_time, order_times + self.latency_ms, side="left")
+        filled = index < len(all_time)
+        index, sizes = index[filled], sizes[filled]
+        price = all_price[index] * (1 + self.slippage * np.sign(sizes))
+        return all_time[index], sizes, price, np.abs(sizes) * price * self.fee_rate
+
+    def _orders(self, targets, order_times, all_time, all_price, fills):
+        """Lệnh = thay đổi vị thế mục tiêu; khớp toàn bộ lệnh của chunk cùng lúc."""
+        targets = np.asarray(targets, dtype=float)
+        if not len(targets):
+            return
+        changes = np.diff(targets, prepend=self._position)
+        orders = np.flatnonzero(changes)
+        if len(orders):
+            fills.append(self._fills(all_time, all_price, order_times[orders], changes[orders]))
+        self._position = targets[-1]
+
+    def _on_bars(self, strategy, ticks, all_time, all_price, fills, marks):
+        bars = aggregate_bars(ticks, self.bar_ms)
+        marks.append((bars["last_time"], bars["close"], bars["time"]))
+        # Lệnh đặt khi nến đóng
+        self._orders(strategy.on_bars(bars), bars["time"] + self.bar_ms, all_time, all_price, fills)
+
+    def run(self, symbol, strategy, start=None, end=None):
+        """
+        Returns:
+            dict: fills (DataFrame), equity (DataFrame theo nến), summary
+        """
+        columns = self.store.open(symbol)
+        if columns is None:
+            print(f"Không có dữ liệu trade cho {symbol}")
+            return None
+        all_time, all_price = columns["time"], columns["price"]
+
+        self._position = 0.0
+        fills, marks = [], []
+        carry = None
+        processed = 0
+        for _, ticks in self.store.iter_chunks(symbol, self.chunk_size, start, end):
+            processed += len(ticks["time"])
+            if strategy.mode == "ticks":
+                bars = aggregate_bars(ticks, self.bar_ms)
+                marks.append((bars["last_time"], bars["close"], bars["time"]))
+                self._orders(strategy.on_ticks(ticks), ticks["time"], all_time, all_price, fills)
+                continue
+
+            if carry is not None:
+                ticks = {column: np.concatenate([carry[column], ticks[column]]) for column in ticks}
+            # Nến cuối có thể còn trade ở chunk sau: giữ lại đến chunk kế tiếp
+            cut = int(np.searchsorted(ticks["time"], ticks["time"][-1] // self.bar_ms * self.bar_ms))
+            carry = {column: values[cut:] for column, values in ticks.items()}
+            if cut:
+                self._on_bars(strategy, {column: values[:cut] for column, values in ticks.items()},
+                              all_time, all_price, fills, marks)
+
+        if carry is not None and len(carry["time"]):
+            self._on_bars(strategy, carry, all_time, all_price, fills, marks)
+        if not marks:
+            print(f"Không có trade nào của {symbol} trong khoảng thời gian đã chọn")
+            return None
+
+        fill_time, fill_size, fill_price, fill_fee = (
+            (np.concatenate([f[i] for f in fills]) for i in range(4)) if fills
+            else (np.empty(0, np.int64), np.empty(0), np.empty(0), np.empty(0))
+        )
+        mark_time = np.concatenate([m[0] for m in marks])
+        mark_price = np.concatenate([m[1] for m in marks])
+        bar_time = np.concatenate([m[2] for m in marks])
+
+        # Equity tại mỗi lần đóng nến: tiền mặt + vị thế * giá, chỉ tính các lệnh đã khớp trước thời điểm đó
+        cash_flow = np.r_[0.0, np.cumsum(-fill_size * fill_price - fill_fee)]
+        position_path = np.r_[0.0, np.cumsum(fill_size)]
+        filled = np.searchsorted(fill_time, mark_time, side="right")
+        equity = cash_flow[filled] + position_path[filled] * mark_price
+
+        peak = np.maximum.accumulate(equity) if len(equity) else equity
+        summary = {
+            "symbol": symbol,
+            "trades_processed": processed,
+            "fills": len(fill_time),
+            "fees": float(fill_fee.sum()),
+            "final_position": float(position_path[-1]),
+            "pnl": float(equity[-1]) if len(equity) else 0.0,
+            "max_drawdown": float((equity - peak).min()) if len(equity) else 0.0,
+        }
+        return {
+            "fills": pd.DataFrame({"time": pd.to_datetime(fill_time, unit="ms"), "size": fill_size,
+                                   "price": fill_price, "fee": fill_fee}),
+            "equity": pd.DataFrame({"time": pd.to_datetime(bar_time, unit="ms"), "close": mark_price, "equity": equity}),
+            "summary": summary,
+        }
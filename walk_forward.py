@@ -0,0 +1,131 @@
+import numpy as np
+import polars as pl
+import concurrent.futures
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix, mean_absolute_error
+from feature_pipeline import walk_forward_splits
+
+# ---------------------------------------------------------------------------
+# MỘT FOLD (chạy trong process con)
+# ---------------------------------------------------------------------------
+def run_fold(fold, model_factory, X_train, y_train, X_test):
+    """Train một model mới trên đoạn train và dự đoán đoạn test ngay sau đó."""
+    model = model_factory()
+    model.fit(X_train, y_train)
+    return fold, model.predict(X_test)
+
+# ---------------------------------------------------------------------------
+# CHỈ SỐ ĐÁNH GIÁ
+# ---------------------------------------------------------------------------
+def classification_metrics(y_true, y_pred):
+    return {
+        'n': len(y_true),
+        'accuracy': accuracy_score(y_true, y_pred),
+        'precision': precision_score(y_true, y_pred, zero_division=0),
+        'recall': recall_score(y_true, y_pred, zero_division=0),
+        'f1': f1_score(y_true, y_pred, zero_division=0),
+    }
+
+def regression_metrics(y_true, y_pred):
+    return {
+        'n': len(y_true),
+        'mae': mean_absolute_error(y_true, y_pred),
+        'hit_rate': float(np.mean(np.sign(y_true) == np.sign(y_pred))),
+    }
+
+def equity_curve(positions, forward_returns, fee=0.0):
+    """
+    Equity của chiến lược giữ `positions` trong kỳ kế tiếp; phí tính trên thay đổi vị thế.
+
+    Returns:
+        tuple: (lợi suất từng kỳ, equity tích lũy bắt đầu từ 1)
+    """
+    turnover = np.abs(np.diff(positions, prepend=0))
+    strategy_returns = positions * forward_returns - fee * turnover
+    return strategy_returns, np.cumprod(1 + strategy_returns)
+
+# ---------------------------------------------------------------------------
+# WALK-FORWARD HARNESS
+# ---------------------------------------------------------------------------
+class WalkForward:
+    """
+    Đánh giá walk-forward: các fold (train mở rộng hoặc trượt, test ngay sau) được train song song
+    trên process pool, kết quả ghép thành chuỗi dự đoán out-of-sample liên tục.
+
+    model_factory phải pickle được (một class như LogisticRegression, hoặc functools.partial).
+    gap mặc định 1 = tầm nhìn của target kỳ kế tiếp: nhãn của dòng train cuối không chồng lên đoạn test.
+    """
+    def __init__(self, model_factory, n_splits=5, min_train=None, test_size=None, expanding=True, gap=1,
+                 task="classification", max_workers=None):
+        if task not in ("classification", "regression"):
+            raise ValueError("task must be 'classification' or 'regression'")
+        self.model_factory = model_factory
+        self.n_splits = n_splits
+        self.min_train = min_train
+        self.test_size = test_size
+        self.expanding = expanding
+        self.gap = gap
+        self.task = task
+        self.max_workers = max_workers
+
+    def positions(self, predictions, long_short=False):
+        """Lớp 1 (hoặc dự đoán > 0) là mua; lớp còn lại đứng ngoài, hoặc bán nếu long_short."""
+        up = predictions > 0 if self.task == "regression" else predictions == 1
+        return np.where(up, 1.0, -1.0 if long_short else 0.0)
+
+    def run(self, X, y, forward_returns=None, dates=None, long_short=False, fee=0.0):
+        """
+        Args:
+            X (ndarray): (n, k) đặc trưng theo thứ tự thời gian
+            y (ndarray): (n,) target
+            forward_returns (ndarray): lợi suất kỳ kế tiếp của từng dòng, để dựng equity curve
+            dates (ndarray): thời gian của từng dòng
+
+        Returns:
+            dict: predictions (pl.DataFrame), metrics (tổng), fold_metrics (list), equity (pl.DataFrame hoặc None)
+        """
+        X = np.asarray(X)
+        y = np.asarray(y)
+        splits = list(walk_forward_splits(len(y), self.n_splits, self.test_size, self.min_train,
+                                          self.expanding, self.gap))
+
+        fold_predictions = {}
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(run_fold, fold, self.model_factory, X[train_idx], y[train_idx], X[test_idx])
+                for fold, (train_idx, test_idx) in enumerate(splits)
+            ]
+            for future in concurrent.futures.as_completed(futures):
+                fold, predictions = future.result()
+                fold_predictions[fold] = predictions
+
+        test_idx = np.concatenate([test for _, test in splits])
+        folds = np.concatenate([np.full(len(test), fold) for fold, (_, test) in enumerate(splits)])
+        predictions = np.concatenate([fold_predictions[fold] for fold in range(len(splits))])
+        y_test = y[test_idx]
+
+        score = classification_metrics if self.task == "classification" else regression_metrics
+        fold_metrics = [
+            {'fold': fold, 'train_size': len(train), 'test_start': int(test[0]), **score(y[test], fold_predictions[fold])}
+            for fold, (train, test) in enumerate(splits)
+        ]
+        metrics = score(y_test, predictions)
+        if self.task == "classification":
+            metrics['confusion_matrix'] = confusion_matrix(y_test, predictions)
+
+        columns = {'row': test_idx, 'fold': folds, 'y': y_test, 'prediction': predictions}
+        if dates is not None:
+            columns = {'date': np.asarray(dates)[test_idx], **columns}
+        result = {'predictions': pl.DataFrame(columns), 'metrics': metrics, 'fold_metrics': fold_metrics, 'equity': None}
+
+        if forward_returns is not None:
+            returns = np.asarray(forward_returns, dtype=float)[test_idx]
+            strategy_returns, equity = equity_curve(self.positions(predictions, long_short), returns, fee)
+            _, buy_hold = equity_curve(np.ones(len(returns)), returns)
+            result['equity'] = result['predictions'].with_columns([
+                pl.Series('strategy_return', strategy_returns),
+                pl.Series('equity', equity),
+                pl.Series('buy_hold', buy_hold),
+            ])
+            metrics['total_return'] = float(equity[-1] - 1)
+            metrics['buy_hold_return'] = float(buy_hold[-1] - 1)
+        return result